@@ -1,12 +1,25 @@
 import pandas as pd
-import mplfinance as mpf
+import argparse
+import json
 import os
 import time
-from iqoptionapi.stable_api import IQ_Option
+from datetime import datetime
 from dotenv import load_dotenv
 import importlib
 import sys
 
+from utils.backtest_cache import BacktestCache, backtest_key
+from utils.backtest_engine import DEFAULT_LOOKBACK, DEFAULT_START, run_incremental, run_vectorized
+from utils.candle_store import CandleStore
+from utils.chart_renderer import DEFAULT_MAX_CANDLES, plot_kwargs, render_chart_async, wait_for_charts
+from utils.historical_data import load_historical_data
+from utils.history_downloader import MAX_CANDLES_PER_REQUEST, HistoryDownloader
+from utils.lookback import strategy_lookback
+from utils.outcomes import score_signals
+from utils.risk_engine import format_risk, pnl_from_signals, simulate_risk
+from utils.session_simulator import simulate_signals
+from utils.strategy_base import load_strategy
+
 # --- Cargar configuración ---
 load_dotenv()
 from utils.config_manager import get_settings
@@ -15,186 +28,249 @@ EMAIL = os.getenv("EMAIL")
 PASSWORD = os.getenv("PASSWORD")
 PAIR = settings.get("PAIR")
 CANDLE_DURATION = settings.get("CANDLE_DURATION")
+DURATION = settings.get("DURATION")
+AMOUNT = settings.get("AMOUNT")
+PAYOUT = settings.get("PAYOUT")
+DRAW_RULE = settings.get("DRAW_RULE")
+STOP_WIN = settings.get("STOP_WIN")
+STOP_LOSS = settings.get("STOP_LOSS")
+END_HOUR = settings.get("END_HOUR")
 NUM_CANDLES = 1000
 FORCE_DOWNLOAD = False # ✅ Poner en True para forzar la descarga de nuevos datos
+USE_CACHE = True # ✅ Reutiliza el resultado si los datos, la estrategia y los parámetros no cambiaron
+REPORT_DIR = "reports"
+
+
+def connect_api():
+    """Conecta a IQ Option (solo se llama si hay que descargar velas)."""
+    from iqoptionapi.stable_api import IQ_Option
+
+    print("Conectando a IQ Option...")
+    api = IQ_Option(EMAIL, PASSWORD)
+    try:
+        api.connect()
+    except Exception as e:
+        print(f"❌ Falló la conexión inicial a IQ Option. Causa probable: Problema de red o credenciales incorrectas.")
+        print(f"   Error original: {e}")
+        exit()
+
+    if not api.check_connect():
+        print("❌ No se pudo verificar la conexión a IQ Option. Revisa tus credenciales y conexión a internet.")
+        exit()
+    return api
 
 
 def fetch_historical_data(api, pair, duration, num_candles):
-    """Obtiene datos históricos y los guarda en un CSV para reutilizarlos."""
-    data_dir = "historical_data"
-    os.makedirs(data_dir, exist_ok=True)
- 
-    file_path = os.path.join(data_dir, f"{pair}_{duration}s_{num_candles}c.csv")
+    """
+    Obtiene datos históricos desde el almacén columnar y solo descarga si faltan velas.
+    Las velas descargadas se añaden al almacén (sin duplicados) para reutilizarlas.
+    """
+    store = CandleStore()
+    historical_df = load_historical_data(pair, duration, num_candles, store=store)
 
-    if os.path.exists(file_path) and not FORCE_DOWNLOAD:
-        print(f"Cargando datos desde {file_path}...")
-        df = pd.read_csv(file_path, index_col='time', parse_dates=True)
-        return df
+    if historical_df is not None and len(historical_df) >= num_candles and not FORCE_DOWNLOAD:
+        print(f"Cargando {len(historical_df)} velas desde {store.dataset_dir(pair, duration)}...")
+        return historical_df
 
     print("Descargando nuevos datos históricos...")
-    end_time = time.time()
-    candles = api.get_candles(pair, duration, num_candles, end_time)
-
-    df = pd.DataFrame(candles)
-    df.rename(columns={
-        "open": "open",
-        "max": "high",
-        "min": "low",
-        "close": "close",
-        "volume": "volume"
-    }, inplace=True)
-    df["time"] = pd.to_datetime(df["from"], unit="s")
-    df.set_index('time', inplace=True)
-
-    df.to_csv(file_path)
-    print(f"Datos guardados en {file_path}")
-    return df
-
-
-def run_backtest(strategy_func, df_with_indicators):
-    """Ejecuta la simulación de la estrategia sobre los datos históricos."""
-    signals = []
-    wins = 0
-    losses = 0
-
+    end_time = int(api.get_server_timestamp() or time.time())
+    before = store.count(pair, duration)
+    if num_candles > MAX_CANDLES_PER_REQUEST:
+        # Más de una página: descarga paginada hacia atrás
+        HistoryDownloader(api, store=store).download(pair, duration, end_time - num_candles * duration, end_time)
+    else:
+        # La vela en curso llega parcial: no se guarda ni se evalúa como cerrada
+        candles = api.get_candles(pair, duration, num_candles, end_time) or []
+        store.append(pair, duration, [c for c in candles if c["from"] + duration <= end_time])
+
+    added = store.count(pair, duration) - before
+    print(f"{added} velas nuevas guardadas en {store.dataset_dir(pair, duration)}")
+    return store.load(pair, duration, last_n=num_candles)
+
+
+def run_backtest(strategy, df_with_indicators, vectorized_func=None, start=DEFAULT_START, lookback=DEFAULT_LOOKBACK):
+    """
+    Ejecuta la simulación de la estrategia sobre los datos históricos desde la vela
+    `start` (las anteriores solo sirven de calentamiento de los indicadores).
+    Si la estrategia tiene modo vectorizado se evalúa todo el histórico de una vez;
+    si no, `strategy` (Strategy o función) recibe en cada paso las últimas `lookback`
+    velas (ver utils/lookback.py).
+    Cada operación se resuelve a su vencimiento real (DURATION o la duración que
+    indique la señal) aplicando el payout configurado.
+
+    Returns:
+        tuple: (señales con 'result' y 'pnl', resumen de resultados).
+    """
     # The add_indicators function for each strategy is now responsible for handling NaNs.
-    # This ensures the main dataframe remains consistent for comparison.
-    df = df_with_indicators.copy()
-    last_signal = None  # ✅ Evita señales duplicadas consecutivas
-
-    # Empezamos desde un índice seguro para tener suficientes datos previos
-    # Iteramos hasta la penúltima vela, ya que necesitamos la siguiente para determinar el resultado.
-    for i in range(60, len(df) - 1):
-        # La estrategia analiza los datos HASTA la vela 'i' (inclusive)
-        subset = df.iloc[:i+1].copy()
-        current_candle_time = df.index[i]
-        signal = strategy_func(subset, last_signal, current_hour=current_candle_time.hour)
-
-        if signal:
-            direction = signal.get("direction")
-            if not direction:
-                continue
-
-            entry_price = df['close'].iloc[i]
-            outcome_price = df['close'].iloc[i + 1] # El resultado se ve en la vela siguiente
-
-            # Resultado simple basado en la vela siguiente
-            is_win = (signal == "BUY" and outcome_price > entry_price) or \
-                     (signal == "SELL" and outcome_price < entry_price)
-
-            if is_win:
-                wins += 1
-            else:
-                losses += 1
-
-            signals.append({
-                'time': current_candle_time,
-                'signal': direction.upper(),
-                'price': entry_price
-            })
-            last_signal = direction  # ✅ Actualiza el último tipo de señal
-
-    return signals, wins, losses
-
-
-def plot_results(df, signals, strategy_name):
-    """Grafica los resultados del backtest, incluso si no hay señales."""
-    df = df.copy()
-    df['buy_signal'] = float('nan')
-    df['sell_signal'] = float('nan')
-
-    for s in signals:
-        if s['signal'] == 'BUY':
-            df.loc[s['time'], 'buy_signal'] = s['price'] * 0.99
-        elif s['signal'] == 'SELL':
-            df.loc[s['time'], 'sell_signal'] = s['price'] * 1.01
-
-    df_plot = df.iloc[59:].copy()
-
-    # --- Indicadores principales ---
-    add_plots = []
-    if {'bb_high', 'bb_low'}.issubset(df_plot.columns):
-        add_plots.append(mpf.make_addplot(df_plot[['bb_high', 'bb_low']], alpha=0.4))
-    if 'ema200' in df_plot.columns:
-        add_plots.append(mpf.make_addplot(df_plot['ema200'], color='purple', width=1.0))
-    if 'ema20' in df_plot.columns:
-        add_plots.append(mpf.make_addplot(df_plot['ema20'], color='orange', width=0.7))
-
-    # --- Añadir señales si existen ---
-    if not df_plot['buy_signal'].isnull().all():
-        add_plots.append(mpf.make_addplot(
-            df_plot['buy_signal'], type='scatter', marker='^', color='g', markersize=100))
-    if not df_plot['sell_signal'].isnull().all():
-        add_plots.append(mpf.make_addplot(
-            df_plot['sell_signal'], type='scatter', marker='v', color='r', markersize=100))
+    # Los indicadores se calculan una sola vez; el motor incremental entrega a la
+    # estrategia una ventana de velas en lugar de copiar todo el prefijo en cada paso.
+    df = df_with_indicators
+    if vectorized_func is not None:
+        signals = run_vectorized(vectorized_func, df, start=start)
+    else:
+        signals = run_incremental(strategy, df, start=start, lookback=lookback)
+
+    summary = score_signals(
+        signals, df, duration=DURATION, payout=PAYOUT, amount=AMOUNT,
+        draw_rule=DRAW_RULE, candle_duration=CANDLE_DURATION,
+    )
+    return signals, summary
+
+
+def plot_results(df, signals, strategy_name, max_candles=DEFAULT_MAX_CANDLES):
+    """Grafica los resultados del backtest en una ventana, incluso si no hay señales."""
+    import mplfinance as mpf
 
     if not signals:
         print("\n⚠️  No se detectaron oportunidades claras con la estrategia actual.")
         print("📉 Se muestra el gráfico con los indicadores para análisis visual.\n")
 
-    mpf.plot(
-        df_plot,
-        type='candle',
-        style='yahoo',
-        title=f'Backtest de la Estrategia: {strategy_name} en {PAIR}',
-        ylabel='Precio',
-        addplot=add_plots,
-        figsize=(15, 7),
-        datetime_format='%Y-%m-%d %H:%M',  # Formato explícito para fecha y hora
-        xrotation=45,                     # Rota las etiquetas para que no se solapen
-        show_nontrading=False             # Oculta los huecos de tiempo sin datos (fines de semana)
+    df_plot, kwargs = plot_kwargs(df, signals, f'Backtest de la Estrategia: {strategy_name} en {PAIR}', max_candles)
+    mpf.plot(df_plot, **kwargs)
+
+
+def save_results(signals, summary, sessions, risk, strategy_key, strategy_name, output_dir=REPORT_DIR):
+    """
+    Guarda el resultado del backtest: resumen en JSON y operaciones en CSV.
+    Devuelve la ruta base (sin extensión) de los archivos.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base_path = os.path.join(output_dir, f"backtest_{strategy_key}_{PAIR}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+    report = {
+        "strategy_key": strategy_key,
+        "strategy": strategy_name,
+        "pair": PAIR,
+        "settings": {"CANDLE_DURATION": CANDLE_DURATION, "DURATION": DURATION, "AMOUNT": AMOUNT, "PAYOUT": PAYOUT,
+                     "DRAW_RULE": DRAW_RULE, "STOP_WIN": STOP_WIN, "STOP_LOSS": STOP_LOSS, "END_HOUR": END_HOUR},
+        "summary": summary,
+        "sessions": sessions["summary"] if sessions else None,
+        "risk": risk,
+    }
+    with open(base_path + ".json", "w") as f:
+        json.dump(report, f, indent=4, default=str)
+
+    trades = pd.DataFrame(
+        [{k: v for k, v in s.items() if k != 'raw'} for s in signals],
+        columns=['time', 'signal', 'price', 'position', 'exit_price', 'result', 'pnl'],
     )
+    trades.to_csv(base_path + ".csv", index=False)
+    return base_path
 
 
 if __name__ == "__main__":
     from utils.strategy_selector import AVAILABLE_STRATEGIES
-    
-    if len(sys.argv) < 2:
-        print("Error: Debes proporcionar la clave de la estrategia para el backtest.")
-        print("Uso: python backtest.py <strategy_key>")
-        exit()
 
-    strategy_key = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Backtest de una estrategia sobre el histórico de PAIR.")
+    parser.add_argument("strategy_key", help="Clave de la estrategia (ver utils/strategy_selector.py).")
+    parser.add_argument("--headless", action="store_true",
+                        help="Sin ventanas ni mplfinance: guarda el resultado en JSON/CSV.")
+    parser.add_argument("--png", action="store_true", help="Dibuja el gráfico en un PNG en segundo plano.")
+    parser.add_argument("--max-candles", type=int, default=DEFAULT_MAX_CANDLES,
+                        help="Velas máximas del gráfico; los históricos largos se agregan.")
+    parser.add_argument("--output-dir", default=REPORT_DIR, help="Carpeta de resultados (por defecto reports/).")
+    args = parser.parse_args()
+
+    strategy_key = args.strategy_key
     strategy_info = AVAILABLE_STRATEGIES.get(strategy_key)
-    strategy_module_path = strategy_info["module"]
+    if strategy_info is None:
+        print(f"Error: La estrategia '{strategy_key}' no existe.")
+        exit()
     strategy_name = strategy_info["name"]
-    
+
     print(f"\nUsando estrategia: {strategy_name}")
-    
+
     # Importar dinámicamente la función add_indicators del módulo de la estrategia
     strategy_module = importlib.import_module(strategy_info["module"])
     add_indicators = getattr(strategy_module, 'add_indicators')
-    selected_strategy = getattr(strategy_module, strategy_info["function"])
-    
-    print("Conectando a IQ Option...")
-    API = IQ_Option(EMAIL, PASSWORD)
-    try:
-        API.connect()
-    except Exception as e:
-        print(f"❌ Falló la conexión inicial a IQ Option. Causa probable: Problema de red o credenciales incorrectas.")
-        print(f"   Error original: {e}")
-        exit()
-
-    if not API.check_connect():
-        print("❌ No se pudo verificar la conexión a IQ Option. Revisa tus credenciales y conexión a internet.")
-        exit()
-    historical_df = fetch_historical_data(API, PAIR, CANDLE_DURATION, NUM_CANDLES)
+    selected_strategy = load_strategy(strategy_key, base_duration=CANDLE_DURATION)
+    vectorized_strategy = getattr(strategy_module, strategy_info["vectorized"]) if "vectorized" in strategy_info else None
+
+    # Se evalúan NUM_CANDLES velas; antes se cargan las de calentamiento que necesita
+    # la estrategia (utils/lookback.py) para que sus indicadores ya sean estables
+    warmup = strategy_lookback(strategy_module, CANDLE_DURATION)
+    window = selected_strategy.window
+    num_candles = NUM_CANDLES + warmup
+    print(f"📏 Calentamiento: {warmup} velas | ventana de la estrategia: {window} velas")
+
+    # Solo se conecta a IQ Option si el almacén no tiene suficientes velas
+    historical_df = load_historical_data(PAIR, CANDLE_DURATION, num_candles)
+    if FORCE_DOWNLOAD or historical_df is None or len(historical_df) < num_candles:
+        API = connect_api()
+        historical_df = fetch_historical_data(API, PAIR, CANDLE_DURATION, num_candles)
+        API.close()
+    else:
+        print(f"Cargando {len(historical_df)} velas del almacén local...")
 
     print("Calculando indicadores...")
     df_with_indicators = add_indicators(historical_df.copy())
 
     print("Ejecutando backtest...")
-    signals, wins, losses = run_backtest(selected_strategy, df_with_indicators)
 
-    total_trades = wins + losses
-    win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
+    start = min(warmup, max(len(df_with_indicators) - NUM_CANDLES, DEFAULT_START))
+    # add_indicators descarta las primeras velas (NaN): también cuentan como calentamiento
+    dropped = len(historical_df) - len(df_with_indicators)
+    if start + dropped < warmup:
+        print(f"⚠️ Solo hay {len(df_with_indicators)} velas: se evalúa desde la vela {start} con indicadores aún sin estabilizar.")
+
+    def compute():
+        return run_backtest(selected_strategy, df_with_indicators, vectorized_strategy, start=start, lookback=window)
+
+    if USE_CACHE:
+        outcome_params = {"CANDLE_DURATION": CANDLE_DURATION, "DURATION": DURATION, "AMOUNT": AMOUNT, "PAYOUT": PAYOUT,
+                          "DRAW_RULE": DRAW_RULE, "START": start, "LOOKBACK": window}
+        cache_key = backtest_key(df_with_indicators, strategy_module, outcome_params)
+        (signals, summary), cache_hit = BacktestCache().get_or_compute(cache_key, compute)
+        if cache_hit:
+            print("⚡ Resultado recuperado de la caché de backtests.")
+    else:
+        signals, summary = compute()
 
     print("\n--- 📊 Resultados del Backtest ---")
     print(f"Estrategia: {strategy_name}")
-    print(f"Total de Operaciones: {total_trades}")
-    print(f"Aciertos (Wins): {wins}")
-    print(f"Fallos (Losses): {losses}")
-    print(f"Tasa de Éxito: {win_rate:.2f}%")
+    print(f"Total de Operaciones: {summary['trades']}")
+    print(f"Aciertos (Wins): {summary['wins']}")
+    print(f"Fallos (Losses): {summary['losses']}")
+    print(f"Empates (Draws): {summary['draws']}")
+    print(f"Tasa de Éxito: {summary['win_rate']:.2f}%")
+    print(f"P&L (payout {PAYOUT:.0%}, {AMOUNT} por operación): {summary['pnl']:+.2f}")
+    if summary['unresolved']:
+        print(f"Sin vencimiento en el histórico: {summary['unresolved']}")
     print("----------------------------------")
 
-    plot_results(df_with_indicators, signals, strategy_name)
+    sessions = simulate_signals(signals, STOP_WIN, STOP_LOSS, END_HOUR)
+    if sessions:
+        days = sessions["summary"]
+        print(f"\n--- 📅 Sesiones diarias (Stop Win {STOP_WIN}, Stop Loss {STOP_LOSS}, hasta las {END_HOUR}h) ---")
+        print(f"Días operados: {days['days']} | 🏁 Stop Win: {days['stop_win_days']} | 🏳️ Stop Loss: {days['stop_loss_days']} | 🕒 Hora límite: {days['end_hour_days']}")
+        print(f"P&L de las sesiones: {days['pnl']:+.2f} (media diaria {days['avg_daily_pnl']:+.2f})")
+        print(f"Drawdown máximo: {days['max_drawdown']:.2f} (en un día: {days['max_daily_drawdown']:.2f})")
+        print(f"Operaciones no ejecutadas por stop: {days['skipped_trades']}")
+        print("----------------------------------")
+
+    risk = None
+    trade_pnl = pnl_from_signals(signals)
+    if len(trade_pnl):
+        risk = simulate_risk(trade_pnl, STOP_WIN, STOP_LOSS, amount=AMOUNT)
+        print(format_risk(risk))
+
+    chart = None
+    if args.png:
+        # El PNG se dibuja en otro proceso mientras se guardan los resultados
+        chart_path = os.path.join(args.output_dir, f"backtest_{strategy_key}_{PAIR}.png")
+        os.makedirs(args.output_dir, exist_ok=True)
+        chart = render_chart_async(df_with_indicators, signals, chart_path,
+                                   f'Backtest de la Estrategia: {strategy_name} en {PAIR}', args.max_candles)
+
+    if args.headless:
+        base_path = save_results(signals, summary, sessions, risk, strategy_key, strategy_name, args.output_dir)
+        print(f"💾 Resultados guardados en {base_path}.json y {base_path}.csv")
+    else:
+        plot_results(df_with_indicators, signals, strategy_name, args.max_candles)
+
+    if chart is not None:
+        try:
+            print(f"🖼️ Gráfico guardado en {chart.result()}")
+        except Exception as e:
+            print(f"⚠️ No se pudo generar el gráfico: {e}")
+        wait_for_charts()
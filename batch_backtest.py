@@ -0,0 +1,204 @@
+# batch_backtest.py
+"""
+Backtest en lote: todas las estrategias de AVAILABLE_STRATEGIES contra todos los pares
+de currencies.txt, repartidos por par en un pool de procesos (uno por núcleo). Dentro
+de cada par, los indicadores comunes se calculan una sola vez (utils/indicator_planner.py).
+
+Uso: python batch_backtest.py [--strategies 1,4,8] [--pairs EURUSD-OTC,GBPUSD] [--workers N]
+"""
+import argparse
+import importlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from utils.backtest_cache import BacktestCache, backtest_key
+from utils.backtest_engine import run_incremental, run_vectorized
+from utils.config_manager import get_currency_pairs, get_settings
+from utils.historical_data import load_historical_data
+from utils.indicator_planner import IndicatorPlan
+from utils.outcomes import score_signals
+from utils.session_simulator import simulate_signals
+from utils.strategy_base import load_strategy
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+REPORT_DIR = "reports"
+SUMMARY_COLUMNS = [
+    "strategy_key", "strategy", "pair", "status", "candles",
+    "trades", "wins", "losses", "draws", "win_rate", "pnl", "pnl_per_trade",
+    "days", "stop_win_days", "stop_loss_days", "session_pnl", "max_drawdown",
+]
+MIN_CANDLES = 100  # Por debajo de esto el backtest no es representativo
+
+
+def hourly_stats(signals: list) -> dict:
+    """Operaciones y tasa de acierto por hora de la vela de entrada."""
+    stats = {}
+    for s in signals:
+        if s['result'] is None:  # Sin vencimiento dentro del histórico
+            continue
+        hour = s['time'].hour
+        trades, wins = stats.get(hour, (0, 0))
+        stats[hour] = (trades + 1, wins + (s['result'] == "win"))
+
+    columns = {}
+    for hour in range(24):
+        trades, wins = stats.get(hour, (0, 0))
+        columns[f"h{hour:02d}_trades"] = trades
+        columns[f"h{hour:02d}_win_rate"] = round(wins / trades * 100, 2) if trades else None
+    return columns
+
+
+def run_strategy(strategy_key: str, df: pd.DataFrame, duration: int, outcome_options: dict = None,
+                 session_options: dict = None) -> dict:
+    """Backtest de una estrategia sobre `df` (con sus indicadores ya calculados por el plan)."""
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+    df = module.add_indicators(df)
+    if "vectorized" in strategy_info:
+        signals = run_vectorized(getattr(module, strategy_info["vectorized"]), df)
+    else:
+        strategy = load_strategy(strategy_key, base_duration=duration)
+        signals = run_incremental(strategy, df, lookback=strategy.window)
+    summary = score_signals(signals, df, candle_duration=duration, **(outcome_options or {}))
+    summary.pop("unresolved")
+    sessions = simulate_signals(signals, **session_options) if session_options else None
+    if sessions:
+        days = sessions["summary"]
+        summary.update({
+            "days": days["days"],
+            "stop_win_days": days["stop_win_days"],
+            "stop_loss_days": days["stop_loss_days"],
+            "session_pnl": days["pnl"],
+            "max_drawdown": days["max_drawdown"],
+        })
+    return {**summary, **hourly_stats(signals)}
+
+
+def run_job(strategy_keys: list, pair: str, duration: int, outcome_options: dict = None,
+            session_options: dict = None, use_cache: bool = True) -> list:
+    """
+    Ejecuta los backtests de un par (todas las estrategias pedidas) dentro de un proceso
+    del pool. Los indicadores se calculan una sola vez para todas las estrategias con
+    IndicatorPlan. `outcome_options` se pasa a score_signals (duration, payout, amount,
+    draw_rule) y `session_options` a simulate_signals (stop_win, stop_loss, end_hour).
+    Con `use_cache` cada fila se reutiliza si datos, estrategia y parámetros no cambiaron.
+    """
+    logging.getLogger("TradingBot").setLevel(logging.WARNING)
+
+    rows = {key: {"strategy_key": key, "strategy": AVAILABLE_STRATEGIES[key]["name"], "pair": pair} for key in strategy_keys}
+    start = time.perf_counter()
+    try:
+        historical_df = load_historical_data(pair, duration)
+        if historical_df is None or len(historical_df) < MIN_CANDLES:
+            for row in rows.values():
+                row["status"] = "sin_datos"
+            return list(rows.values())
+
+        cache = BacktestCache() if use_cache else None
+        cache_keys, pending = {}, []
+        for key in strategy_keys:
+            if cache is not None:
+                module = importlib.import_module(AVAILABLE_STRATEGIES[key]["module"])
+                cache_keys[key] = backtest_key(historical_df, module, {"duration": duration, **(outcome_options or {}), **(session_options or {})})
+                cached = cache.get(cache_keys[key])
+                if cached is not None:
+                    rows[key].update({**cached, "status": "ok (caché)"})
+                    continue
+            pending.append(key)
+
+        plan = IndicatorPlan.for_strategies(pending)
+        computed = plan.compute(historical_df)
+        for key in pending:
+            row = rows[key]
+            try:
+                row.update({
+                    "status": "ok",
+                    "candles": len(historical_df),
+                    **run_strategy(key, plan.view(historical_df, computed, key), duration, outcome_options, session_options),
+                })
+                if cache is not None:
+                    cache.put(cache_keys[key], {k: v for k, v in row.items() if k not in ("strategy_key", "strategy", "pair", "status")})
+            except Exception as e:
+                row["status"] = f"error: {e}"
+    except Exception as e:
+        for row in rows.values():
+            row.setdefault("status", f"error: {e}")
+    finally:
+        seconds = round((time.perf_counter() - start) / max(len(rows), 1), 3)
+        for row in rows.values():
+            row["seconds"] = seconds
+    return list(rows.values())
+
+
+def run_batch(strategy_keys: list, pairs: list, duration: int, workers: int = None,
+              outcome_options: dict = None, session_options: dict = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Reparte los pares en un pool de procesos (cada tarea ejecuta todas las estrategias
+    de un par compartiendo indicadores) y devuelve la matriz de resultados.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = len(strategy_keys) * len(pairs)
+    print(f"🚀 {total} backtests ({len(strategy_keys)} estrategias × {len(pairs)} pares) en {workers} procesos...")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_job, strategy_keys, pair, duration, outcome_options, session_options, use_cache) for pair in pairs]
+        for future in as_completed(futures):
+            for row in future.result():
+                rows.append(row)
+                print(f"  [{len(rows)}/{total}] {row['strategy']} | {row['pair']}: {row['status']}")
+
+    hour_columns = [f"h{hour:02d}_{stat}" for hour in range(24) for stat in ("trades", "win_rate")]
+    results = pd.DataFrame(rows).reindex(columns=SUMMARY_COLUMNS + hour_columns + ["seconds"])
+    for column in ["candles", "trades", "wins", "losses", "draws", "days", "stop_win_days", "stop_loss_days"] + hour_columns[::2]:
+        results[column] = results[column].astype("Int64")
+    return results.sort_values(["strategy_key", "pair"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Backtest de todas las estrategias sobre todos los pares.")
+    parser.add_argument("--strategies", help="Claves separadas por comas (por defecto todas).")
+    parser.add_argument("--pairs", help="Pares separados por comas (por defecto currencies.txt).")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos a usar (por defecto, núcleos de la máquina).")
+    parser.add_argument("--no-cache", action="store_true", help="Recalcular aunque el resultado esté en caché.")
+    args = parser.parse_args()
+
+    strategy_keys = args.strategies.split(",") if args.strategies else list(AVAILABLE_STRATEGIES)
+    pairs = args.pairs.split(",") if args.pairs else get_currency_pairs()
+    if not pairs:
+        print("❌ No hay pares configurados en currencies.txt.")
+        exit()
+
+    start = time.perf_counter()
+    outcome_options = {
+        "duration": settings.get("DURATION"),
+        "payout": settings.get("PAYOUT"),
+        "amount": settings.get("AMOUNT"),
+        "draw_rule": settings.get("DRAW_RULE"),
+    }
+    session_options = {
+        "stop_win": settings.get("STOP_WIN"),
+        "stop_loss": settings.get("STOP_LOSS"),
+        "end_hour": settings.get("END_HOUR"),
+    }
+    results = run_batch(strategy_keys, pairs, settings.get("CANDLE_DURATION"), args.workers, outcome_options, session_options, not args.no_cache)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output_path = os.path.join(REPORT_DIR, f"backtest_matrix_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    results.to_csv(output_path, index=False)
+
+    ok = results[results["status"].str.startswith("ok")]
+    if not ok.empty:
+        print("\n--- 📊 Tasa de Éxito (%) por estrategia y par ---")
+        print(ok.pivot(index="strategy", columns="pair", values="win_rate").to_string())
+        print("\n--- 💰 P&L por estrategia y par ---")
+        print(ok.pivot(index="strategy", columns="pair", values="pnl").to_string())
+    print(f"\n✅ {len(ok)}/{len(results)} backtests completados en {time.perf_counter() - start:.1f}s")
+    print(f"💾 Resultados guardados en {output_path}")
@@ -0,0 +1,112 @@
+# benchmark_async_runtime.py
+"""
+Runtime asyncio (utils/async_runtime.py) sobre la API simulada (utils/fake_iq_api.py).
+
+Ejecuta N pares × M estrategias durante varias velas con un reloj virtual: cada
+espera del planificador avanza el reloj de FakeIQOption en lugar de dormir, así que
+la prueba tarda lo que tarda el trabajo real por vela. Comprueba que cada par recibe
+todas sus velas cerradas, que no se pierde ningún cierre y que la latencia de
+decisión (despertar → todas las estrategias evaluadas y compras enviadas) queda por
+debajo de MAX_LATENCY_MS en un solo núcleo. Cada compra tarda BUY_LATENCY segundos
+reales y, como en vivo, las compras van de una en una (`thread_safe_api=False`): la
+latencia de órdenes (hasta que el broker confirma todas las de la vela) se informa
+aparte y crece con las señales por vela. Con --parallel-buys la API simulada, que es
+segura entre hilos, compra en paralelo.
+
+Con --scan mide el modo escáner (utils/opportunity_scanner.py): además, la duración
+de cada escaneo frente a su presupuesto.
+
+Uso: python benchmark_async_runtime.py [claves_estrategias] [num_pares] [num_velas] [--scan] [--parallel-buys]
+     python benchmark_async_runtime.py 1,5 30 60
+     python benchmark_async_runtime.py 1,3,4,5 30 60 --scan
+"""
+import asyncio
+import importlib
+import logging
+import sys
+import time
+
+from utils.async_runtime import AsyncTradingRuntime
+from utils.candle_clock import CandleClock
+from utils.config_manager import get_currency_pairs
+from utils.fake_iq_api import DEFAULT_NOW, FakeIQOption
+from utils.opportunity_scanner import ScannerRuntime
+from utils.order_manager import OrderManager
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+DEFAULT_STRATEGIES = "1,5"
+DEFAULT_PAIRS = 30
+DEFAULT_CANDLES = 60
+MAX_LATENCY_MS = 1000
+BUY_LATENCY = 0.3  # segundos de ida y vuelta de cada compra (como el broker real)
+
+
+def pair_names(count: int) -> list:
+    """Pares de currencies.txt, completados con nombres sintéticos hasta `count`."""
+    pairs = get_currency_pairs()[:count]
+    return pairs + [f"SIM{i:02d}-OTC" for i in range(count - len(pairs))]
+
+
+async def run_benchmark(strategy_keys: list, num_pairs: int, num_candles: int, scan_mode: bool = False,
+                        parallel_buys: bool = False) -> bool:
+    api = FakeIQOption(now=DEFAULT_NOW + 17, buy_latency=BUY_LATENCY)  # a mitad de vela: cada despertar cierra una
+
+    async def virtual_sleep(seconds: float):
+        api.advance(seconds)
+        await asyncio.sleep(0)
+
+    clock = CandleClock(60, server_time=api.get_server_timestamp, local_time=lambda: api.now)
+    orders = OrderManager(api, max_open=10, max_per_pair=1, clock=lambda: api.now,
+                          sleep=lambda s: time.sleep(0.001), trade_logger=lambda trade: None,
+                          thread_safe_api=parallel_buys)
+    runtime_class = ScannerRuntime if scan_mode else AsyncTradingRuntime
+    runtime = runtime_class(api, pair_names(num_pairs), strategy_keys, amount=1.0, duration=1,
+                                  orders=orders, clock=clock, sleep=virtual_sleep, thread_safe_api=parallel_buys)
+    received = {}
+    runtime.market.on_candle_closed(lambda pair, bar: received.__setitem__(pair, received.get(pair, 0) + 1))
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    await runtime.run(max_candles=num_candles)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+    history_requests = runtime.market.history_requests
+    while orders.open_count:  # deja vencer las operaciones abiertas
+        api.advance(1)
+        await asyncio.sleep(0.001)
+    runtime.close()
+    stats = runtime.stats()
+
+    complete = all(received.get(pair, 0) == num_candles for pair in runtime.pairs)
+    ok = complete and stats["clock_missed"] == 0 and stats["latency_p95_ms"] < MAX_LATENCY_MS
+    if scan_mode:
+        scan = runtime.scanner.stats()
+        ok = ok and scan["overruns"] == 0
+    print(f"\n{'✅' if ok else '❌'} {num_pairs} pares × {len(strategy_keys)} estrategias, {num_candles} velas "
+          f"({elapsed:.1f}s reales, {cpu / num_candles * 1e3:.0f}ms de CPU por vela)")
+    print(f"   Latencia de decisión: media {stats['latency_mean_ms']:.1f}ms, p95 {stats['latency_p95_ms']:.1f}ms, "
+          f"máx {stats['latency_max_ms']:.1f}ms (límite {MAX_LATENCY_MS}ms)")
+    print(f"   Órdenes confirmadas ({'en paralelo' if parallel_buys else 'de una en una'}): "
+          f"media {stats['orders_mean_ms']:.1f}ms, p95 {stats['orders_p95_ms']:.1f}ms, máx {stats['orders_max_ms']:.1f}ms")
+    print(f"   Velas recibidas por par: {min(received.values(), default=0)}–{max(received.values(), default=0)} | "
+          f"cierres perdidos: {stats['clock_missed']} | peticiones de histórico: {history_requests} | "
+          f"operaciones: {len(api.orders)}")
+    if scan_mode:
+        print(f"   Escaneo: media {scan['scan_mean_ms']:.1f}ms (apilado {scan['stack_mean_ms']:.1f}ms), "
+              f"p95 {scan['scan_p95_ms']:.1f}ms, máx {scan['scan_max_ms']:.1f}ms | "
+              f"presupuestos superados: {scan['overruns']} | {scan['found']} oportunidades, {scan['routed']} enrutadas")
+    return ok
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    keys = (args[0] if len(args) > 0 else DEFAULT_STRATEGIES).split(",")
+    num_pairs = int(args[1]) if len(args) > 1 else DEFAULT_PAIRS
+    num_candles = int(args[2]) if len(args) > 2 else DEFAULT_CANDLES
+
+    for key in keys:  # importa las estrategias antes de silenciar el logger (setup_logger reinicia el nivel)
+        importlib.import_module(AVAILABLE_STRATEGIES[key]["module"])
+    logging.getLogger("TradingBot").setLevel(logging.WARNING)
+    ok = asyncio.run(run_benchmark(keys, num_pairs, num_candles, scan_mode="--scan" in sys.argv,
+                                   parallel_buys="--parallel-buys" in sys.argv))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,96 @@
+# benchmark_cross_section.py
+"""
+Escaneo de muchos pares en la misma vela con las dos formas de evaluar:
+
+- par a par: la función vela a vela de la estrategia sobre el DataFrame de cada par
+- transversal: utils/cross_section.scan_pairs, todos los pares en arrays pares × velas
+
+Los pares se generan a partir de un histórico (desplazado en el tiempo y escalado para
+que cada par tenga velas distintas). En cada vela se comprueba que las dos formas dan
+la misma señal en todos los pares, y se mide el coste de escanear 1 y N pares.
+
+Uso: python benchmark_cross_section.py [strategy_key] [num_pares] [ruta_csv]
+"""
+import importlib
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.backtest_engine import normalize_signal
+from utils.cross_section import scan_pairs
+from utils.lookback import strategy_lookback
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+DEFAULT_DATA_FILE = "historical_data/AUDCAD_60s_1000c.csv"
+DEFAULT_PAIRS = 30
+STEPS = 50  # velas evaluadas (las últimas del histórico)
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+
+def synthetic_pairs(df: pd.DataFrame, count: int) -> dict:
+    """`count` pares a partir de `df`: velas rotadas en el tiempo y precios escalados."""
+    pairs = {}
+    for i in range(count):
+        values = np.roll(df[PRICE_COLUMNS].to_numpy(), -37 * i, axis=0) * (1 + 0.05 * i)
+        pairs[f"PAIR{i:02d}"] = pd.DataFrame(values, index=df.index, columns=PRICE_COLUMNS)
+    return pairs
+
+
+def benchmark_strategy(strategy_key: str, frames: dict) -> bool:
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+    strategy_func = getattr(module, strategy_info["function"])
+    window = strategy_lookback(module)
+    index = next(iter(frames.values())).index
+    first = next(iter(frames))
+
+    last_signals = {pair: None for pair in frames}
+    per_pair_time = stacked_time = single_time = 0.0
+    mismatches = signals = 0
+    for t in range(len(index) - STEPS, len(index)):
+        windows = {pair: df.iloc[t + 1 - window:t + 1] for pair, df in frames.items()}
+        hour = index[t].hour
+
+        start = time.perf_counter()
+        expected = {pair: strategy_func(w, last_signals[pair], current_hour=hour) for pair, w in windows.items()}
+        per_pair_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = scan_pairs(strategy_key, windows, last_signals=last_signals, current_hour=hour)
+        stacked_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        scan_pairs(strategy_key, {first: windows[first]}, last_signals=last_signals, current_hour=hour)
+        single_time += time.perf_counter() - start
+
+        for pair in frames:
+            direction, value = normalize_signal(expected[pair])
+            mismatches += direction != normalize_signal(actual[pair])[0]
+            signals += direction is not None
+            if value is not None:
+                last_signals[pair] = value
+
+    status = "✅" if mismatches == 0 else f"❌ ({mismatches} distintas)"
+    print(f"{status} {strategy_info['name']:<30} {per_pair_time / STEPS * 1e3:>9.2f}ms {stacked_time / STEPS * 1e3:>9.2f}ms "
+          f"{single_time / STEPS * 1e3:>9.2f}ms {per_pair_time / stacked_time:>7.1f}x  ({signals} señales)")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    keys = [sys.argv[1]] if len(sys.argv) > 1 else [k for k, info in AVAILABLE_STRATEGIES.items() if "cross_section" in info]
+    num_pairs = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PAIRS
+    data_file = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_DATA_FILE
+
+    print(f"Cargando datos desde {data_file}...")
+    historical_df = pd.read_csv(data_file, index_col='time', parse_dates=True)
+    frames = synthetic_pairs(historical_df, num_pairs)
+    for key in keys:  # importa las estrategias antes de silenciar el logger (setup_logger reinicia el nivel)
+        importlib.import_module(AVAILABLE_STRATEGIES[key]["module"])
+    logging.getLogger("TradingBot").setLevel(logging.WARNING)
+
+    print(f"\n  {'Estrategia':<30} {f'{num_pairs} pares':>11} {'transversal':>11} {'1 par':>11} {'Mejora':>8}")
+    results = [benchmark_strategy(key, frames) for key in keys]
+    sys.exit(0 if all(results) else 1)
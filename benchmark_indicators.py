@@ -0,0 +1,132 @@
+# benchmark_indicators.py
+"""
+Compara los kernels de utils/indicator_kernels.py con las implementaciones de `ta` /
+pandas que usaban antes las estrategias: primero comprueba que los valores coinciden
+y después mide el tiempo de cada indicador con 1k, 100k y 1M velas.
+
+Uso: python benchmark_indicators.py [tamaños...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import indicator_kernels as kernels
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+TOLERANCE = 1e-9  # error relativo admitido (las medias móviles de pandas acumulan ~1e-11)
+
+
+# ----------------- IMPLEMENTACIONES DE REFERENCIA -----------------
+def reference_rsi(close: pd.Series, window: int = 14) -> pd.Series:
+    from ta.momentum import RSIIndicator
+    return RSIIndicator(close=close, window=window).rsi()
+
+
+def reference_ema(close: pd.Series, window: int) -> pd.Series:
+    return close.ewm(span=window, adjust=False).mean()
+
+
+def reference_bollinger_bands(close: pd.Series, window: int = 20, std_dev: int = 2):
+    from ta.volatility import BollingerBands
+    indicator_bb = BollingerBands(close=close, window=window, window_dev=std_dev)
+    return indicator_bb.bollinger_hband(), indicator_bb.bollinger_lband()
+
+
+def reference_atr(df: pd.DataFrame, window: int = 14) -> pd.Series:
+    high_low = df['high'] - df['low']
+    high_close = (df['high'] - df['close'].shift()).abs()
+    low_close = (df['low'] - df['close'].shift()).abs()
+    true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    return true_range.rolling(window=window, min_periods=1).mean()
+
+
+# ----------------- CASOS -----------------
+def make_candles(n: int, seed: int = 42) -> pd.DataFrame:
+    """Velas sintéticas tipo forex (paseo aleatorio alrededor de 1.0)."""
+    rng = np.random.default_rng(seed)
+    close = 1.0 + np.cumsum(rng.normal(0, 2e-4, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 1e-4, n))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+    })
+
+
+def cases(df: pd.DataFrame):
+    """(nombre, referencia, kernel) para cada indicador que usan las estrategias."""
+    close = df['close']
+    high, low, close_array = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
+    return [
+        ("RSI(14)", lambda: reference_rsi(close, 14), lambda: kernels.rsi(close_array, 14)),
+        ("EMA(20)", lambda: reference_ema(close, 20), lambda: kernels.ema(close_array, 20)),
+        ("EMA(200)", lambda: reference_ema(close, 200), lambda: kernels.ema(close_array, 200)),
+        ("BB(20, 2)", lambda: reference_bollinger_bands(close, 20, 2), lambda: kernels.bollinger_bands(close_array, 20, 2)),
+        ("ATR(14)", lambda: reference_atr(df, 14), lambda: kernels.atr(high, low, close_array, 14)),
+    ]
+
+
+def max_relative_error(expected, actual) -> float:
+    """Error relativo máximo; los NaN deben coincidir en posición."""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        return float("inf")
+    mask = ~np.isnan(expected)
+    if not mask.any():
+        return 0.0
+    return float(np.max(np.abs(expected[mask] - actual[mask]) / np.maximum(np.abs(expected[mask]), 1.0)))
+
+
+def timed(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_equivalence(df: pd.DataFrame) -> bool:
+    ok = True
+    for name, reference, kernel in cases(df):
+        expected, actual = reference(), kernel()
+        if isinstance(expected, tuple):
+            error = max(max_relative_error(e, a) for e, a in zip(expected, actual))
+        else:
+            error = max_relative_error(expected, actual)
+        status = "✅" if error <= TOLERANCE else "❌"
+        ok &= error <= TOLERANCE
+        print(f"{status} {name:<10} error relativo máximo {error:.2e}")
+    return ok
+
+
+def benchmark(sizes) -> None:
+    print(f"\n{'Velas':>10} {'Indicador':<10} {'ta/pandas':>12} {'NumPy':>12} {'Mejora':>8}")
+    for n in sizes:
+        df = make_candles(n)
+        repeat = 20 if n <= 10_000 else 3
+        for name, reference, kernel in cases(df):
+            reference_time = timed(reference, repeat)
+            kernel_time = timed(kernel, repeat)
+            print(f"{n:>10,} {name:<10} {reference_time * 1000:>10.2f}ms {kernel_time * 1000:>10.2f}ms "
+                  f"{reference_time / kernel_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    try:
+        import ta  # noqa: F401
+    except ImportError:
+        print("❌ La comparación necesita el paquete `ta` (pip install ta).")
+        sys.exit(1)
+
+    print("Comprobando equivalencia numérica con `ta` / pandas...")
+    equivalent = check_equivalence(make_candles(max(sizes)))
+    benchmark(sizes)
+    sys.exit(0 if equivalent else 1)
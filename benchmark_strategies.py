@@ -0,0 +1,77 @@
+# benchmark_strategies.py
+"""
+Latencia por llamada de cada estrategia vela a vela con dos formas de leer las
+últimas filas del DataFrame:
+
+- pandas: `df.iloc[-1]` / `df.iloc[-2]` (Series por fila, como antes)
+- BarView: `last_bars(df)` de utils/bar_view.py (un array por llamada, floats de Python)
+
+Cada estrategia recibe las mismas ventanas del histórico (con los indicadores ya
+calculados, como en el bucle en vivo) y se comprueba que ambas formas dan la misma
+señal en todas las velas.
+
+Uso: python benchmark_strategies.py [strategy_key] [ruta_csv]
+"""
+import importlib
+import logging
+import sys
+import time
+
+import pandas as pd
+
+from utils.backtest_engine import normalize_signal
+from utils.bar_view import SeriesBars, last_bars
+from utils.indicator_planner import IndicatorPlan
+from utils.lookback import strategy_window
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+DEFAULT_DATA_FILE = "historical_data/AUDCAD_60s_1000c.csv"
+REPEAT = 3  # se toma la mejor de varias pasadas
+
+
+def run_calls(strategy_func, windows: list) -> tuple:
+    """Evalúa la estrategia en cada ventana; devuelve (direcciones, mejor tiempo por llamada)."""
+    best = float("inf")
+    signals = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        signals = [normalize_signal(strategy_func(window, None, current_hour=hour))[0] for window, hour in windows]
+        best = min(best, (time.perf_counter() - start) / len(windows))
+    return signals, best
+
+
+def benchmark_strategy(strategy_key: str, df: pd.DataFrame) -> bool:
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+    strategy_func = getattr(module, strategy_info["function"])
+    df = module.add_indicators(df)
+    lookback = strategy_window(module)
+    windows = [(df.iloc[i + 1 - lookback:i + 1], df.index[i].hour) for i in range(lookback, len(df) - 1)]
+
+    try:
+        module.last_bars = SeriesBars
+        expected, pandas_time = run_calls(strategy_func, windows)
+    finally:
+        module.last_bars = last_bars
+    actual, view_time = run_calls(strategy_func, windows)
+
+    same = expected == actual
+    status = "✅" if same else "❌"
+    print(f"{status} {strategy_info['name']:<30} {pandas_time * 1e6:>9.1f}µs {view_time * 1e6:>9.1f}µs "
+          f"{pandas_time / view_time:>7.2f}x")
+    return same
+
+
+if __name__ == "__main__":
+    keys = [sys.argv[1]] if len(sys.argv) > 1 else list(AVAILABLE_STRATEGIES)
+    data_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DATA_FILE
+
+    print(f"Cargando datos desde {data_file}...")
+    historical_df = pd.read_csv(data_file, index_col='time', parse_dates=True)
+    frames = IndicatorPlan.for_strategies(keys).frames(historical_df)
+    # Después de importar las estrategias (setup_logger reinicia el nivel): solo avisos
+    logging.getLogger("TradingBot").setLevel(logging.WARNING)
+
+    print(f"\n  {'Estrategia':<30} {'pandas':>11} {'BarView':>11} {'Mejora':>8}")
+    results = [benchmark_strategy(key, frames[key]) for key in keys]
+    sys.exit(0 if all(results) else 1)
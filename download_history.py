@@ -0,0 +1,57 @@
+# download_history.py
+"""
+Descarga histórico de velas (más de 1000) para uno o varios pares y lo guarda en el
+almacén columnar. Si una descarga se interrumpe, volver a ejecutar el mismo comando
+la retoma.
+
+Uso: python download_history.py [--days 30] [--pairs EURUSD-OTC,GBPUSD | --all] [--workers 4]
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from utils.config_manager import get_currency_pairs, get_settings
+from utils.history_downloader import HistoryDownloader, RateLimiter
+
+if __name__ == "__main__":
+    load_dotenv()
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Descarga paginada de histórico de velas.")
+    parser.add_argument("--days", type=float, default=7, help="Días de histórico hacia atrás (por defecto 7).")
+    parser.add_argument("--pairs", help="Pares separados por comas (por defecto el PAIR de settings.json).")
+    parser.add_argument("--all", action="store_true", help="Descargar todos los pares de currencies.txt.")
+    parser.add_argument("--workers", type=int, default=4, help="Pares descargados en paralelo.")
+    parser.add_argument("--rate", type=float, default=5, help="Peticiones por segundo como máximo.")
+    args = parser.parse_args()
+
+    if args.all:
+        pairs = get_currency_pairs()
+    elif args.pairs:
+        pairs = args.pairs.split(",")
+    else:
+        pairs = [settings.get("PAIR")]
+
+    from iqoptionapi.stable_api import IQ_Option
+
+    print("Conectando a IQ Option...")
+    API = IQ_Option(os.getenv("EMAIL"), os.getenv("PASSWORD"))
+    API.connect()
+    if not API.check_connect():
+        print("❌ No se pudo verificar la conexión a IQ Option. Revisa tus credenciales y conexión a internet.")
+        exit()
+
+    end_time = int(time.time())
+    start_time = end_time - int(args.days * 24 * 3600)
+    downloader = HistoryDownloader(API, rate_limiter=RateLimiter(args.rate, 1.0))
+    summaries = downloader.download_many(pairs, settings.get("CANDLE_DURATION"), start_time, end_time, args.workers)
+
+    print("\n--- ⬇️ Resumen de la descarga ---")
+    for pair, summary in summaries.items():
+        if "error" in summary:
+            print(f"❌ {pair}: {summary['error']} (vuelve a ejecutar para retomar)")
+        else:
+            print(f"✅ {pair}: {summary['added']} velas nuevas, {summary['stored']} guardadas")
+    API.close()
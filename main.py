@@ -7,11 +7,16 @@ import sys
 import importlib
 from dotenv import load_dotenv
 
-from utils.helpers import get_candle_dataframe, is_market_open, signal_to_direction
+from utils.backtest_engine import normalize_signal
+from utils.history_downloader import MAX_CANDLES_PER_REQUEST
+from utils.candle_clock import CandleClock
 from utils.logger import setup_logger
+from utils.lookback import strategy_lookback
+from utils.market_data import MarketData
+from utils.order_manager import OrderManager
 from utils.config_manager import get_settings, restore_last_config
+from utils.strategy_base import load_strategy
 from utils.strategy_selector import AVAILABLE_STRATEGIES
-from utils.trade_logger import log_trade
 
 # --- Cargar configuración ---
 load_dotenv()
@@ -27,14 +32,13 @@ if len(sys.argv) < 2:
 strategy_key = sys.argv[1]
 strategy_info = AVAILABLE_STRATEGIES.get(strategy_key)
 module = importlib.import_module(strategy_info["module"])
-selected_strategy = getattr(module, strategy_info["function"])
 strategy_name = strategy_info["name"]
 
 # ✅ Logger
 logger = setup_logger()
 logger.info(f"🚀 Iniciando bot con estrategia: {strategy_name}")
 
-END_HOUR = 20
+END_HOUR = settings.get('END_HOUR', 20)
 REPORT_DIR = "reports"
 
 os.makedirs(REPORT_DIR, exist_ok=True)
@@ -66,23 +70,80 @@ logger.info(f"💰 Saldo inicial: {initial_balance}")
 logger.info(f"🎯 Stop Win en: {target_win}")
 logger.info(f"🛑 Stop Loss en: {target_loss}")
 
-last_signal = None
-
 # Extraer variables de settings
 PAIR = settings.get('PAIR')
 AMOUNT = settings.get('AMOUNT')
 DURATION = settings.get('DURATION')
 CANDLE_DURATION = settings.get('CANDLE_DURATION')
-NUM_CANDLES = settings.get('NUM_CANDLES')
+# ✅ Velas justas para la estrategia: filas que exige más calentamiento de sus indicadores
+NUM_CANDLES = strategy_lookback(module, CANDLE_DURATION)
+if NUM_CANDLES > MAX_CANDLES_PER_REQUEST:
+    logger.warning(f"⚠️ La estrategia necesita {NUM_CANDLES} velas; get_candles solo devuelve {MAX_CANDLES_PER_REQUEST}.")
+    NUM_CANDLES = MAX_CANDLES_PER_REQUEST
+logger.info(f"📏 Velas por consulta: {NUM_CANDLES}")
+CANDLE_OFFSET = settings.get('CANDLE_OFFSET_MS') / 1000
+STATS_EVERY = 60  # velas entre resúmenes del planificador
 last_order_time = 0
 
+# ✅ Planificador alineado al cierre de vela con la hora del servidor (utils/candle_clock.py)
+clock = CandleClock(CANDLE_DURATION, offset=CANDLE_OFFSET, server_time=API.get_server_timestamp)
+
+# ✅ Operaciones resueltas en segundo plano (utils/order_manager.py): el bucle sigue
+# evaluando velas durante el vencimiento, con límites de exposición
+orders = OrderManager(
+    API,
+    max_open=settings.get('MAX_OPEN_POSITIONS'),
+    max_per_pair=settings.get('MAX_POSITIONS_PER_PAIR'),
+    max_exposure=settings.get('MAX_EXPOSURE'),
+)
+
+# ✅ Velas por stream (utils/market_data.py): una carga inicial con get_candles y después
+# lecturas locales del stream en un buffer circular; solo se piden velas si hay un hueco.
+# Con el reloj del planificador, la vela se da por cerrada en cuanto se despierta.
+market = MarketData(API, NUM_CANDLES, duration=CANDLE_DURATION, dtype=settings.get('CANDLE_DTYPE'),
+                    close_grace=CANDLE_OFFSET, clock=clock.now)
+candle_buffer = market.subscribe(PAIR)
+
+# ✅ Estrategia con estado (utils/strategy_base.py): mantiene sus indicadores y velas de
+# 5m/15m/1h vela a vela (O(1)) y recuerda la última operación entre vueltas
+strategy = load_strategy(strategy_key, history=NUM_CANDLES, base_duration=CANDLE_DURATION, dtype=settings.get('CANDLE_DTYPE'))
+if len(candle_buffer):
+    strategy.warmup(candle_buffer.to_frame())
+else:
+    logger.warning("⚠️ No se recibieron velas de histórico. Se esperará a las del stream.")
+
 try:
     while True:
+        tick = clock.wait()
+        if clock.ticks % STATS_EVERY == 0:
+            clock.log_stats()
         now = datetime.now()
         current_hour = now.hour
 
-        # ✅ Validación de stop win/stop loss
-        current_balance = API.get_balance()
+        if current_hour >= END_HOUR:
+            logger.info("🕒 Hora límite alcanzada. Cerrando bot...")
+            break
+
+        # ✅ Vela recién cerrada (lectura local del stream, sin peticiones)
+        closed_bars = [bar for pair, bar in market.poll() if pair == PAIR]
+        if not closed_bars:
+            logger.warning(f"⚠️ Sin vela cerrada para {PAIR} en el cierre {tick.boundary}. Esperando la siguiente...")
+            continue
+
+        # Toda vela leída del stream entra en la estrategia aunque esta vuelta no se evalúe:
+        # si no, su buffer e indicadores se saltarían velas
+        if not strategy.ready:
+            # Solo velas cerradas: el buffer ya trae la vela en curso, posterior a closed_bars
+            history = candle_buffer.to_frame()
+            strategy.warmup(history[history['from'] <= closed_bars[-1].time])
+        for bar in closed_bars:
+            strategy.update(bar)
+
+        for position in orders.settled():
+            strategy.on_trade_result(position.trade())
+
+        # ✅ Validación de stop win/stop loss (el importe de las operaciones abiertas sigue siendo nuestro)
+        current_balance = API.get_balance() + orders.exposure
         if current_balance >= target_win:
             logger.info(f"🏁 Stop Win alcanzado ({current_balance} >= {target_win}). Cerrando bot...")
             break
@@ -90,80 +151,48 @@ try:
             logger.info(f"🏳️ Stop Loss alcanzado ({current_balance} <= {target_loss}). Cerrando bot...")
             break
 
-        if current_hour >= END_HOUR:
-            logger.info("🕒 Hora límite alcanzada. Cerrando bot...")
-            break
-
-        if not is_market_open(API, PAIR):
-            logger.warning(f"⚠️ Mercado cerrado para {PAIR}. Reintentando en 60s...")
-            time.sleep(60)
-            continue
-
-        df = get_candle_dataframe(API, PAIR, CANDLE_DURATION, NUM_CANDLES) # Usa variables de settings
-        if df is None or df.empty:
-            logger.warning("⚠️ No se recibieron datos de velas. Reintentando en 30s...")
-            time.sleep(30)
+        # Mercado abierto si el stream trae la vela que acaba de cerrar (sin pedir velas)
+        if closed_bars[-1].time < tick.boundary - CANDLE_DURATION:
+            logger.warning(f"⚠️ Mercado cerrado para {PAIR}. Reintentando en la próxima vela...")
             continue
 
-        df = df.copy()
-
-        # ✅ Evaluar estrategia seleccionada
+        # ✅ Evaluar estrategia seleccionada con la vela recién cerrada (ya incorporada: on_candle la sustituye)
         try:
-            signal_res = selected_strategy(df, last_signal, current_hour=current_hour)
+            signal_res = strategy.on_candle(closed_bars[-1], current_hour=current_hour)
         except Exception as e:
             logger.error(f"❌ Error en la estrategia: {e}")
             signal_res = None
 
-        if signal_res:
-            direction = signal_res.get("direction")
+        # "BUY" / "SELL" (estrategias clásicas) o dict con "direction" (BOT)
+        direction, _ = normalize_signal(signal_res)
+        if direction:
             current_time = time.time()
 
             # Evitar spam de entradas repetidas
-            if signal_res == last_signal and (current_time - last_order_time) < (CANDLE_DURATION + 10):
+            if signal_res == strategy.last_signal and (current_time - last_order_time) < (CANDLE_DURATION + 10):
                 logger.debug("🚫 Señal repetida recientemente. Esperando siguiente vela...")
-                time.sleep(CANDLE_DURATION)
                 continue
 
             logger.info(f"📊 Señal detectada: {direction.upper()}")
 
             try:
-                status, order_id = API.buy(AMOUNT, PAIR, direction, DURATION)
-
-                if status:
-                    last_signal = signal_res
+                position = orders.open(PAIR, direction, AMOUNT, DURATION, signal=signal_res)
+                if position:
                     last_order_time = current_time
-                    logger.info(f"✅ Orden ejecutada | ID: {order_id}")
-                    time.sleep(DURATION * 60 + 5)
-
-                    profit = API.check_win_v3(order_id)
-                    if profit > 0:
-                        result = "win"
-                        logger.info(f"🏆 Operación GANADA | Profit: +{profit:.2f}")
-                    elif profit < 0:
-                        result = "loss"
-                        logger.info(f"💀 Operación PERDIDA | Pérdida: {profit:.2f}")
-                    else:
-                        result = "draw"
-                        logger.warning(f"⚠️ Resultado neutro | Profit: {profit:.2f}")
-                    
-                    # Loguear el resultado de la operación
-                    trade_log_data = {**signal_res, "result": result}
-                    log_trade(trade_log_data)
-                else:
-                    logger.warning("❌ Falló la ejecución de la orden incluso después del intento doble")
-
+                    strategy.on_order_opened({"signal": signal_res, "entry_time": position.entry_time})
             except Exception as e:
                 logger.error(f"⚠️ Error al ejecutar orden: {e}")
         else:
             logger.debug("🔍 No se generó señal en esta vela")
 
-        time.sleep(CANDLE_DURATION)
-
 except KeyboardInterrupt:
     logger.info("🛑 Interrupción manual.")
 
 finally:
     logger.info("👋 Cerrando bot.")
+    clock.log_stats()
+    orders.close()
+    market.close()
     API.close()
     # Solo ejecutar el optimizador si la estrategia es la auto-ajustable
     if "bot" in strategy_name.lower():
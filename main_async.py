@@ -0,0 +1,106 @@
+# main_async.py
+"""
+Bot multi-par: varias estrategias sobre todos los pares de currencies.txt con una
+sola conexión (utils/async_runtime.py).
+
+Con --scan opera en modo escáner (utils/opportunity_scanner.py): evalúa todos los
+pares en cada vela y solo opera las SCANNER_TOP_K mejores señales.
+
+Uso: python main_async.py <strategy_keys> [pares] [--scan]
+     python main_async.py 1,5
+     python main_async.py 5 EURUSD-OTC,GBPUSD-OTC
+     python main_async.py 1,3,5 --scan
+"""
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+from iqoptionapi.stable_api import IQ_Option
+
+from utils.async_runtime import AsyncTradingRuntime
+from utils.candle_clock import CandleClock
+from utils.config_manager import get_currency_pairs, get_settings
+from utils.logger import setup_logger
+from utils.opportunity_scanner import ScannerRuntime
+from utils.order_manager import OrderManager
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+# --- Cargar configuración ---
+load_dotenv()
+settings = get_settings()
+EMAIL = os.getenv("EMAIL")
+PASSWORD = os.getenv("PASSWORD")
+
+args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+scan_mode = "--scan" in sys.argv
+if not args:
+    print("Error: Debes proporcionar las claves de las estrategias a ejecutar.")
+    print("Uso: python main_async.py <strategy_keys> [pares] [--scan]")
+    exit()
+
+strategy_keys = args[0].split(",")
+unknown = [key for key in strategy_keys if key not in AVAILABLE_STRATEGIES]
+if unknown:
+    print(f"Error: estrategias desconocidas: {', '.join(unknown)}")
+    exit()
+pairs = args[1].split(",") if len(args) > 1 else get_currency_pairs()
+
+logger = setup_logger()
+mode = "escáner" if scan_mode else "multi-par"
+logger.info(f"🚀 Iniciando bot {mode}: {len(pairs)} pares × estrategias {', '.join(strategy_keys)}")
+
+# --- Conexión (compartida por todos los pares) ---
+logger.info("🔌 Conectando a IQ Option...")
+API = IQ_Option(EMAIL, PASSWORD)
+try:
+    API.connect()
+except Exception as e:
+    logger.error(f"❌ Falló la conexión inicial a IQ Option: {e}")
+    exit()
+
+if not API.check_connect():
+    logger.error("❌ No se pudo verificar la conexión a IQ Option. Revisa tus credenciales y conexión a internet.")
+    exit()
+API.change_balance(settings['BALANCE_MODE'])
+logger.info(f"✅ Conectado en modo {settings['BALANCE_MODE']}")
+
+initial_balance = API.get_balance()
+CANDLE_DURATION = settings.get('CANDLE_DURATION')
+
+options = {}
+if scan_mode:
+    options = {
+        "top_k": settings.get('SCANNER_TOP_K'),
+        "budget_ms": settings.get('SCAN_BUDGET_MS'),
+        "default_payout": settings.get('PAYOUT'),
+    }
+runtime = (ScannerRuntime if scan_mode else AsyncTradingRuntime)(
+    API,
+    pairs,
+    strategy_keys,
+    amount=settings.get('AMOUNT'),
+    duration=settings.get('DURATION'),
+    candle_duration=CANDLE_DURATION,
+    dtype=settings.get('CANDLE_DTYPE'),
+    orders=OrderManager(
+        API,
+        max_open=settings.get('MAX_OPEN_POSITIONS'),
+        max_per_pair=settings.get('MAX_POSITIONS_PER_PAIR'),
+        max_exposure=settings.get('MAX_EXPOSURE'),
+    ),
+    clock=CandleClock(CANDLE_DURATION, offset=settings.get('CANDLE_OFFSET_MS') / 1000, server_time=API.get_server_timestamp),
+    max_workers=settings.get('API_WORKERS'),
+    stop_win=initial_balance + settings.get('STOP_WIN', 10),
+    stop_loss=initial_balance - settings.get('STOP_LOSS', 10),
+    end_hour=settings.get('END_HOUR', 20),
+    **options,
+)
+
+try:
+    asyncio.run(runtime.run())
+except KeyboardInterrupt:
+    logger.info("🛑 Interrupción manual.")
+finally:
+    logger.info("👋 Cerrando bot.")
+    runtime.close()
+    API.close()
@@ -6,6 +6,9 @@ import json
 import shutil
 from datetime import datetime
 
+from utils.config_manager import get_settings
+from utils.risk_engine import format_risk, pnl_from_results, simulate_risk
+
 TRADE_LOG_FILE = "trade_history.csv"
 STRATEGY_DIR = "strategies/bot"
 CONFIG_FILENAME = "self_adjusting_v1_config.json"
@@ -55,6 +58,13 @@ def update_history_summary(params: dict, winrate: float, total_trades: int):
         json.dump(summary, f, indent=4)
     print(f"🧠 Memoria evolutiva actualizada en '{HISTORY_SUMMARY_FILE}'")
 
+def applicable_trades(df: pd.DataFrame, new_params: dict) -> pd.DataFrame:
+    """Trades del historial que también se habrían abierto con los nuevos parámetros."""
+    wide_enough = df['bb_width'] > new_params.get('MIN_BB_WIDTH', 0)
+    puts = (df['direction'] == 'put') & (df['rsi'] > new_params.get('RSI_OVERBOUGHT', 70))
+    calls = (df['direction'] == 'call') & (df['rsi'] < new_params.get('RSI_OVERSOLD', 30))
+    return df[(puts | calls) & wide_enough]
+
 def simulate_new_params(df: pd.DataFrame, new_params: dict) -> float:
     """
     Simula el rendimiento de los nuevos parámetros sobre el historial de trades.
@@ -63,27 +73,26 @@ def simulate_new_params(df: pd.DataFrame, new_params: dict) -> float:
     if df.empty:
         return 0.0
 
-    wins = 0
-    applicable_trades = 0
-
-    for _, trade in df.iterrows():
-        # Simulación de PUT
-        if trade['direction'] == 'put':
-            if trade['rsi'] > new_params.get('RSI_OVERBOUGHT', 70) and trade['bb_width'] > new_params.get('MIN_BB_WIDTH', 0):
-                applicable_trades += 1
-                if trade['result'] == 'win':
-                    wins += 1
-        # Simulación de CALL
-        elif trade['direction'] == 'call':
-            if trade['rsi'] < new_params.get('RSI_OVERSOLD', 30) and trade['bb_width'] > new_params.get('MIN_BB_WIDTH', 0):
-                applicable_trades += 1
-                if trade['result'] == 'win':
-                    wins += 1
-
-    if applicable_trades == 0:
+    trades = applicable_trades(df, new_params)
+    if trades.empty:
         return 0.0
 
-    return wins / applicable_trades
+    return (trades['result'] == 'win').mean()
+
+def simulate_session_risk(trades: pd.DataFrame, settings: dict, n_trades: int):
+    """
+    Monte Carlo sobre los resultados de `trades`: probabilidad de tocar STOP_LOSS
+    antes que STOP_WIN con el AMOUNT y PAYOUT configurados. None si no hay trades.
+
+    `n_trades` fija la longitud de la sesión: de `trades` solo se remuestrea la
+    distribución de P&L, así que un filtro que descarta operaciones no parece menos
+    arriesgado solo por jugar sesiones más cortas.
+    """
+    if trades.empty:
+        return None
+    pnl = pnl_from_results(trades['result'], settings['AMOUNT'], settings['PAYOUT'])
+    return simulate_risk(pnl, settings['STOP_WIN'], settings['STOP_LOSS'], amount=settings['AMOUNT'],
+                         n_trades=n_trades, seed=0)
 
 def analyze_trades():
     """
@@ -170,12 +179,23 @@ def analyze_trades():
         projected_winrate = simulate_new_params(last_50_trades, new_params)
 
         print(f"\nValidando mejora: Winrate actual (últimas 50) = {last_winrate:.2%}, Proyectado = {projected_winrate:.2%}")
-        if projected_winrate > last_winrate:
+
+        # C. Validación de riesgo: la sesión no debe volverse más propensa a tocar el Stop Loss
+        settings = get_settings()
+        session_trades = len(last_50_trades)
+        current_risk = simulate_session_risk(last_50_trades, settings, session_trades)
+        projected_risk = simulate_session_risk(applicable_trades(last_50_trades, new_params), settings, session_trades)
+        lower_risk = projected_risk is not None and projected_risk['p_stop_loss_first'] <= current_risk['p_stop_loss_first']
+        if projected_risk is not None:
+            print(f"   Riesgo actual:     {format_risk(current_risk)}")
+            print(f"   Riesgo proyectado: {format_risk(projected_risk)}")
+
+        if projected_winrate > last_winrate and lower_risk:
             update_config_file(new_params)
             # B. Guardar en memoria evolutiva
             update_history_summary(new_params, projected_winrate, len(df))
         else:
-            print("⚠️ No se aplica el cambio: la proyección no muestra una mejora significativa.")
+            print("⚠️ No se aplica el cambio: la proyección no muestra una mejora significativa o aumenta el riesgo de Stop Loss.")
     else:
         print("\n💡 PRÓXIMOS PASOS:")
         print("1. Revisa las sugerencias de arriba.")
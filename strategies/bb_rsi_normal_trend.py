@@ -1,7 +1,11 @@
-from typing import Optional
+from typing import Dict, Optional
+import numpy as np
 import pandas as pd
-from utils.indicators import calculate_rsi, calculate_bollinger_bands, calculate_ema, calculate_atr
+from utils import indicator_kernels as kernels
 from utils.logger import setup_logger
+from utils.cross_section import body_columns
+from utils.rules import Rule, RuleResult, RuleSet, col
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, select_codes, signal_frame
 
 logger = setup_logger()
 
@@ -27,25 +31,98 @@ RSI_PULLBACK_SELL = 52      # ✅ NUEVO: Nivel de RSI para detectar fin de rebot
 RSI_BULL_ZONE = 50
 RSI_BEAR_ZONE = 50
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_high", "bb_low")),
+    ("ema", {"window": 200}, ("ema200",)),
+    ("ema", {"window": 20}, ("ema20",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = 60
+
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_high' not in df.columns or 'bb_low' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], window=20)
+        bb_high, bb_low = kernels.bollinger_bands(close, window=20)
         df['bb_high'] = bb_high
         df['bb_low'] = bb_low
     if 'ema200' not in df.columns:
-        df['ema200'] = calculate_ema(df['close'], window=200)
+        df['ema200'] = kernels.ema(close, window=200)
     if 'ema20' not in df.columns: # Añadimos EMA20 para la confirmación de Bollinger
-        df['ema20'] = calculate_ema(df['close'], window=20)
+        df['ema20'] = kernels.ema(close, window=20)
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
 
     df['body'] = (df['close'] - df['open']).abs()
     df['avg_body'] = df['body'].rolling(20, min_periods=1).mean()
     return df
 
+def _build_rules() -> RuleSet:
+    """Score de compra/venta como reglas (mismas en vivo y en backtest, ver utils/rules.py)."""
+    close, open_, rsi = col('close'), col('open'), col('rsi')
+    rsi_prev = rsi.prev()
+
+    # ----------- Tendencia con EMA ---------
+    ema_margin = col('ema200') * EMA_NEUTRAL_MARGIN_PCT
+    bullish_trend = close > col('ema200') + ema_margin
+    bearish_trend = close < col('ema200') - ema_margin
+
+    # ----------- Tamaño de vela ----------
+    body_ratio = col('body') / (col('avg_body') + 1e-12)
+
+    return RuleSet(
+        groups={
+            "buy": [
+                # Entrada por Retroceso (Pullback) - ALTA PROBABILIDAD
+                Rule("pullback_buy", bullish_trend & (rsi_prev < RSI_PULLBACK_BUY) & (rsi >= RSI_PULLBACK_BUY),
+                     SCORE_PULLBACK_ENTRY, reason=f"pullback_buy(rsi_cross_{RSI_PULLBACK_BUY})"),
+                # Continuación de Tendencia y Momentum
+                Rule("trend_momentum", bullish_trend & (rsi > rsi_prev), SCORE_TREND_MOMENTUM, report=False),
+                Rule("rsi_bull_zone", rsi > RSI_BULL_ZONE, SCORE_RSI_ZONE, reason="rsi_in_bull_zone({rsi:.1f})"),
+                Rule("close_above_ema20", close > col('ema20'), SCORE_BB_CONFIRMATION),
+                Rule("bull_body", (close > open_) & (body_ratio >= BODY_RATIO_THRESHOLD),
+                     SCORE_BODY_CONFIRMATION, reason="bull_body({body_ratio:.2f})"),
+            ],
+            "sell": [
+                Rule("pullback_sell", bearish_trend & (rsi_prev > RSI_PULLBACK_SELL) & (rsi <= RSI_PULLBACK_SELL),
+                     SCORE_PULLBACK_ENTRY, reason=f"pullback_sell(rsi_cross_{RSI_PULLBACK_SELL})"),
+                Rule("trend_momentum", bearish_trend & (rsi < rsi_prev), SCORE_TREND_MOMENTUM, report=False),
+                Rule("rsi_bear_zone", rsi < RSI_BEAR_ZONE, SCORE_RSI_ZONE, reason="rsi_in_bear_zone({rsi:.1f})"),
+                Rule("close_below_ema20", close < col('ema20'), SCORE_BB_CONFIRMATION),
+                Rule("bear_body", (close < open_) & (body_ratio >= BODY_RATIO_THRESHOLD),
+                     SCORE_BODY_CONFIRMATION, reason="bear_body({body_ratio:.2f})"),
+            ],
+        },
+        values={
+            "bb_width": (col('bb_high') - col('bb_low')) / (close + 1e-12),
+            "rsi": rsi,
+            "body_ratio": body_ratio,
+        },
+    )
+
+
+RULES = _build_rules()
+
+
+def _decide(rules: RuleResult, allowed: np.ndarray, last_signal) -> np.ndarray:
+    """Código de señal de cada vela (o de cada par) según el score y `last_signal`."""
+    score_buy = rules.score("buy")
+    score_sell = rules.score("sell")
+    wants_buy = allowed & (score_buy > score_sell) & (score_buy >= MIN_SCORE_TO_ENTER)
+    wants_sell = allowed & (score_sell > score_buy) & (score_sell >= MIN_SCORE_TO_ENTER)
+    return select_codes(
+        [wants_buy & (last_signal != "BUY"), wants_sell & (last_signal != "SELL")],
+        [BUY, SELL],
+    )
+
+
 def bb_rsi_normal_trend(df: pd.DataFrame, last_signal: Optional[str] = None, current_hour: Optional[int] = None) -> Optional[str]:
     """
     Estrategia enfocada en mercados normales:
@@ -54,14 +131,13 @@ def bb_rsi_normal_trend(df: pd.DataFrame, last_signal: Optional[str] = None, cur
     - Sin fallback agresivo
     """
     df = add_indicators(df).dropna()
-    if len(df) < 60:
+    if len(df) < MIN_ROWS:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    rules = RULES.evaluate_last(df)
 
     # ----------- Filtros básicos ----------- 
-    bb_width = (last['bb_high'] - last['bb_low']) / (last['close'] + 1e-12)
+    bb_width = rules['bb_width'][-1]
     if bb_width < MIN_BB_WIDTH:
         logger.debug(f"BB width demasiado estrecho: {bb_width:.5f}")
         return None
@@ -70,71 +146,61 @@ def bb_rsi_normal_trend(df: pd.DataFrame, last_signal: Optional[str] = None, cur
         logger.debug(f"Fuera de horario de trading: {current_hour}h")
         return None
 
-    # ----------- Tendencia con EMA ---------
-    ema_margin = last['ema200'] * EMA_NEUTRAL_MARGIN_PCT
-    bullish_trend = last['close'] > last['ema200'] + ema_margin
-    bearish_trend = last['close'] < last['ema200'] - ema_margin
-
-    # ----------- RSI Momentum -------------
-    rsi_up = last['rsi'] > prev['rsi']
-    rsi_down = last['rsi'] < prev['rsi']
-
     # ----------- Score ----------
-    score_buy = 0.0
-    score_sell = 0.0
-    reasons_buy, reasons_sell = [], []
-
-    # --- Condición 1: Entrada por Retroceso (Pullback) - ALTA PROBABILIDAD ---
-    rsi_cross_up_pullback = prev['rsi'] < RSI_PULLBACK_BUY and last['rsi'] >= RSI_PULLBACK_BUY
-    if bullish_trend and rsi_cross_up_pullback:
-        score_buy += SCORE_PULLBACK_ENTRY
-        reasons_buy.append(f"pullback_buy(rsi_cross_{RSI_PULLBACK_BUY})")
-
-    rsi_cross_down_pullback = prev['rsi'] > RSI_PULLBACK_SELL and last['rsi'] <= RSI_PULLBACK_SELL
-    if bearish_trend and rsi_cross_down_pullback:
-        score_sell += SCORE_PULLBACK_ENTRY
-        reasons_sell.append(f"pullback_sell(rsi_cross_{RSI_PULLBACK_SELL})")
-
-    # --- Condición 2: Continuación de Tendencia y Momentum ---
-    if bullish_trend and rsi_up:
-        score_buy += SCORE_TREND_MOMENTUM
-    if bearish_trend and rsi_down:
-        score_sell += SCORE_TREND_MOMENTUM
-
-    # Confirmación de zona RSI (Lógica mejorada)
-    if last['rsi'] > RSI_BULL_ZONE:
-        score_buy += SCORE_RSI_ZONE
-        reasons_buy.append(f"rsi_in_bull_zone({last['rsi']:.1f})")
-    if last['rsi'] < RSI_BEAR_ZONE:
-        score_sell += SCORE_RSI_ZONE
-        reasons_sell.append(f"rsi_in_bear_zone({last['rsi']:.1f})")
-
-    # Confirmación Bollinger (Lógica mejorada usando EMA20)
-    if last['close'] > last['ema20']:
-        score_buy += SCORE_BB_CONFIRMATION
-        reasons_buy.append("close_above_ema20")
-    if last['close'] < last['ema20']:
-        score_sell += SCORE_BB_CONFIRMATION
-        reasons_sell.append("close_below_ema20")
-
-    # Tamaño de vela
-    body_ratio = last['body'] / (last['avg_body'] + 1e-12)
-    if last['close'] > last['open'] and body_ratio >= BODY_RATIO_THRESHOLD:
-        score_buy += SCORE_BODY_CONFIRMATION
-        reasons_buy.append(f"bull_body({body_ratio:.2f})")
-    elif last['close'] < last['open'] and body_ratio >= BODY_RATIO_THRESHOLD:
-        score_sell += SCORE_BODY_CONFIRMATION
-        reasons_sell.append(f"bear_body({body_ratio:.2f})")
+    score_buy = rules.score("buy")[-1]
+    score_sell = rules.score("sell")[-1]
 
     # ----------- Decisión ----------
     if score_buy > score_sell and score_buy >= MIN_SCORE_TO_ENTER:
         if last_signal != "BUY":
-            logger.info(f"✅ SIGNAL: BUY | score={score_buy:.2f} | reasons={reasons_buy}")
+            logger.info(f"✅ SIGNAL: BUY | score={score_buy:.2f} | reasons={rules.reasons('buy', -1)}")
             return "BUY"
     elif score_sell > score_buy and score_sell >= MIN_SCORE_TO_ENTER:
         if last_signal != "SELL":
-            logger.info(f"✅ SIGNAL: SELL | score={score_sell:.2f} | reasons={reasons_sell}")
+            logger.info(f"✅ SIGNAL: SELL | score={score_sell:.2f} | reasons={rules.reasons('sell', -1)}")
             return "SELL"
 
     # No hay señal
     return None
+
+def bb_rsi_normal_trend_vectorized(df: pd.DataFrame, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    """
+    Modo vectorizado de bb_rsi_normal_trend: mismo score, calculado para todas las velas.
+    """
+    d = add_indicators(df).dropna()
+    n = len(d)
+    pos = np.arange(n)
+    hours = bar_times(d).hour.to_numpy()
+    rules = RULES.evaluate(d)
+
+    allowed = (pos >= 59) & (rules['bb_width'] >= MIN_BB_WIDTH)
+    allowed &= (TRADING_START_HOUR <= hours) & (hours < TRADING_END_HOUR)
+
+    candidates = {last_signal: _decide(rules, allowed, last_signal) for last_signal in (None, "BUY", "SELL")}
+    codes = resolve_signals(candidates, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return rules.reasons("buy" if code == BUY else "sell", i)
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
+
+def bb_rsi_normal_trend_cross_section(
+    columns: Dict[str, np.ndarray],
+    last_signals: np.ndarray,
+    current_hour: Optional[int] = None
+) -> np.ndarray:
+    """
+    Modo transversal (utils/cross_section.py): señal de la última vela de cada par,
+    con las columnas como arrays pares × velas.
+    """
+    rules = RULES.evaluate_arrays(body_columns(columns), last=True).last()
+    allowed = rules['bb_width'] >= MIN_BB_WIDTH
+    if current_hour is not None and not (TRADING_START_HOUR <= current_hour < TRADING_END_HOUR):
+        allowed = np.zeros_like(allowed)
+    return _decide(rules, allowed, last_signals)
+
+
+def bb_rsi_normal_trend_strength(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Score de compra y de venta de la última vela de cada par, en unidades de MIN_SCORE_TO_ENTER."""
+    rules = RULES.evaluate_arrays(body_columns(columns), last=True).last()
+    return {"BUY": rules.score("buy") / MIN_SCORE_TO_ENTER, "SELL": rules.score("sell") / MIN_SCORE_TO_ENTER}
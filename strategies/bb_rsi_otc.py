@@ -1,8 +1,12 @@
 # strategies/bb_rsi_otc_trend.py
 from typing import Optional, Dict, Any
+import numpy as np
 import pandas as pd
-from utils.indicators import calculate_rsi, calculate_bollinger_bands, calculate_ema, calculate_atr
+from utils import indicator_kernels as kernels
 from utils.logger import setup_logger
+from utils.cross_section import body_columns
+from utils.rules import Rule, RuleResult, RuleSet, col, maximum
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, select_codes, signal_frame
 
 logger = setup_logger()
 
@@ -26,23 +30,118 @@ ATR_STRONG_BODY_MULTIPLIER = 0.9
 RSI_NEUTRAL_LOW = 48
 RSI_NEUTRAL_HIGH = 52
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_high", "bb_low")),
+    ("ema", {"window": 200}, ("ema200",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = 60
+
 # ----------------- FUNCIONES -----------------
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_high' not in df.columns or 'bb_low' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], window=20)
+        bb_high, bb_low = kernels.bollinger_bands(close, window=20)
         df['bb_high'] = bb_high
         df['bb_low'] = bb_low
     if 'ema200' not in df.columns:
-        df['ema200'] = calculate_ema(df['close'], window=200)
+        df['ema200'] = kernels.ema(close, window=200)
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
     df['body'] = (df['close'] - df['open']).abs()
     df['avg_body'] = df['body'].rolling(20, min_periods=1).mean()
     return df.dropna()
 
+def _build_rules() -> RuleSet:
+    """Confirmaciones (2 de 3) y filtros anticagadas como reglas (ver utils/rules.py)."""
+    close, open_, rsi, body = col('close'), col('open'), col('rsi'), col('body')
+    high, low = col('high', default=close), col('low', default=close)
+
+    # EMA and its slope (pendiente)
+    ema, ema_prev = col('ema200'), col('ema200').prev()
+    ema_margin = ema * EMA_NEUTRAL_MARGIN_PCT
+    ema_slope = (ema - ema_prev) / (ema_prev + 1e-12)  # relativo
+    bullish_price_vs_ema = close > ema + ema_margin
+    bearish_price_vs_ema = close < ema - ema_margin
+
+    # RSI momentum
+    rsi_prev = rsi.prev()
+
+    # ATR-based thresholds
+    atr_now = maximum(col('atr'), 1e-8)
+    price_ref = close.prev(19).fillna(close)
+    min_body_threshold = maximum(price_ref * 0.0005, atr_now * ATR_BODY_MULTIPLIER)
+    strong_body_threshold = maximum(price_ref * 0.0010, atr_now * ATR_STRONG_BODY_MULTIPLIER)
+    last_body_is_strong = body >= strong_body_threshold
+    last_body_is_ok = body >= min_body_threshold
+    in_rsi_neutral = (RSI_NEUTRAL_LOW < rsi) & (rsi < RSI_NEUTRAL_HIGH)
+
+    # Anticagadas: no entrar contra una vela previa fuerte
+    prev_close, prev_open = close.prev(), open_.prev()
+    prev_strong = abs(prev_close - prev_open) >= strong_body_threshold
+
+    # (A) Trend & momentum: precio vs EMA + pendiente + RSI + estructura
+    trend_buy = bullish_price_vs_ema & (ema_slope > 0) & (rsi > rsi_prev) & (high > high.prev())
+    trend_sell = bearish_price_vs_ema & (ema_slope < 0) & (rsi < rsi_prev) & (low < low.prev())
+
+    return RuleSet(
+        groups={
+            "buy": [
+                Rule("trend_momentum_ok", trend_buy),
+                Rule("bb_support", close >= col('bb_low')),  # (B) Price/BB
+                Rule("body_ok", last_body_is_ok),            # (C) Body/ATR
+            ],
+            "sell": [
+                Rule("trend_momentum_ok", trend_sell),
+                Rule("bb_resistance", close <= col('bb_high')),
+                Rule("body_ok", last_body_is_ok),
+            ],
+        },
+        values={
+            "bb_width": (col('bb_high') - col('bb_low')) / (close + 1e-12),
+            "trend_buy": trend_buy,
+            "trend_sell": trend_sell,
+            "last_body_is_strong": last_body_is_strong,
+            "in_rsi_neutral": in_rsi_neutral,
+            "neutral_ok": ~in_rsi_neutral | last_body_is_strong,
+            "blocked_buy": (prev_close < prev_open) & prev_strong,
+            "blocked_sell": (prev_close > prev_open) & prev_strong,
+            "rsi": rsi,
+            "rsi_prev": rsi_prev,
+            "ema_slope": ema_slope,
+            "body": body,
+            "atr_now": atr_now,
+        },
+    )
+
+
+RULES = _build_rules()
+
+
+def _decide(rules: RuleResult, allowed: np.ndarray, last_signal) -> np.ndarray:
+    """Código de señal de cada vela (o de cada par): confirmaciones y, si no, fallback."""
+    can_buy = allowed & ~rules['blocked_buy'] & (last_signal != "BUY")
+    can_sell = allowed & ~rules['blocked_sell'] & (last_signal != "SELL")
+    strong_outside_neutral = rules['last_body_is_strong'] & ~rules['in_rsi_neutral']
+    return select_codes(
+        [
+            can_buy & (rules.count("buy") >= CONFIRMATIONS_TO_ENTER) & rules['neutral_ok'],
+            can_sell & (rules.count("sell") >= CONFIRMATIONS_TO_ENTER) & rules['neutral_ok'],
+            can_buy & rules['trend_buy'] & strong_outside_neutral,
+            can_sell & rules['trend_sell'] & strong_outside_neutral,
+        ],
+        [BUY, SELL, BUY, SELL],
+    )
+
+
 def bb_rsi_otc_trend(df: pd.DataFrame, last_signal: Optional[str] = None, current_hour: Optional[int] = None) -> Optional[str]:
     """
     Versión agresiva experta:
@@ -52,14 +151,14 @@ def bb_rsi_otc_trend(df: pd.DataFrame, last_signal: Optional[str] = None, curren
     - Filtros anticagadas: no entrar contra vela previa fuerte, no entrar en RSI neutra
     """
     df = add_indicators(df) # dropna() is now inside add_indicators
-    if len(df) < 60:
+    if len(df) < MIN_ROWS:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    rules = RULES.evaluate_last(df)
+    last = {name: value[-1] for name, value in rules.values.items()}
 
     # Basic filters
-    bb_width = (last['bb_high'] - last['bb_low']) / (last['close'] + 1e-12)
+    bb_width = last['bb_width']
     if bb_width < MIN_BB_WIDTH:
         logger.debug(f"[strategy] BB width demasiado estrecho: {bb_width:.6f}")
         return None
@@ -68,138 +167,83 @@ def bb_rsi_otc_trend(df: pd.DataFrame, last_signal: Optional[str] = None, curren
         logger.debug(f"[strategy] Fuera de horario: {current_hour}h")
         return None
 
-    # EMA and its slope (pendiente)
-    ema_now = last['ema200']
-    ema_prev = df['ema200'].iloc[-2]
-    ema_margin = ema_now * EMA_NEUTRAL_MARGIN_PCT
-    ema_slope = (ema_now - ema_prev) / (ema_prev + 1e-12)  # relativo
+    confirmations_buy = rules.count("buy")[-1]
+    confirmations_sell = rules.count("sell")[-1]
+    reasons_buy = rules.reasons("buy", -1)
+    reasons_sell = rules.reasons("sell", -1)
 
-    ema_up = ema_slope > 0
-    ema_down = ema_slope < 0
+    # Logging debug about constituents
+    logger.debug(f"[strategy] rsi={last['rsi']:.2f} rsi_prev={last['rsi_prev']:.2f} ema_slope={last['ema_slope']:.6f} "
+                 f"bbw={bb_width:.6f} body={last['body']:.6f} atr={last['atr_now']:.6f} "
+                 f"conf_buy={confirmations_buy} conf_sell={confirmations_sell}")
 
-    bullish_price_vs_ema = last['close'] > ema_now + ema_margin
-    bearish_price_vs_ema = last['close'] < ema_now - ema_margin
+    # Aggressive rule: if confirmations >= 2 and not blocked/repeated, enter
+    # (en zona RSI neutra solo con vela fuerte)
+    if confirmations_buy >= CONFIRMATIONS_TO_ENTER:
+        if not last['blocked_buy'] and last_signal != "BUY" and last['neutral_ok']:
+            logger.info(f"✅ SIGNAL: BUY | conf={confirmations_buy} | reasons={reasons_buy}")
+            return "BUY"
 
-    # Structure (highs / lows) - confirm direction
-    high_now = last.get('high', last['close'])
-    high_prev = prev.get('high', prev['close'])
-    low_now = last.get('low', last['close'])
-    low_prev = prev.get('low', prev['close'])
+    if confirmations_sell >= CONFIRMATIONS_TO_ENTER:
+        if not last['blocked_sell'] and last_signal != "SELL" and last['neutral_ok']:
+            logger.info(f"✅ SIGNAL: SELL | conf={confirmations_sell} | reasons={reasons_sell}")
+            return "SELL"
 
-    up_structure = high_now > high_prev
-    down_structure = low_now < low_prev
+    # Fallback aggressive-ish: trend+momentum presente pero menos de 2 confirmaciones,
+    # solo con vela fuerte y fuera de la zona neutra
+    strong_outside_neutral = last['last_body_is_strong'] and not last['in_rsi_neutral']
+    if last['trend_buy'] and not last['blocked_buy'] and last_signal != "BUY" and strong_outside_neutral:
+        logger.info(f"⚠️ FALLBACK BUY (trend present + strong body) | reasons={reasons_buy}")
+        return "BUY"
 
-    # RSI momentum
-    rsi_now = last['rsi']
-    rsi_prev = prev['rsi']
-    rsi_up = rsi_now > rsi_prev
-    rsi_down = rsi_now < rsi_prev
+    if last['trend_sell'] and not last['blocked_sell'] and last_signal != "SELL" and strong_outside_neutral:
+        logger.info(f"⚠️ FALLBACK SELL (trend present + strong body) | reasons={reasons_sell}")
+        return "SELL"
 
-    # ATR-based thresholds
-    atr_now = max(last.get('atr', 1e-8), 1e-8)
-    price_ref = df['close'].iloc[-20] if len(df) >= 20 else last['close']
-    min_body_threshold = max(price_ref * 0.0005, atr_now * ATR_BODY_MULTIPLIER)
-    strong_body_threshold = max(price_ref * 0.0010, atr_now * ATR_STRONG_BODY_MULTIPLIER)
-
-    last_body = last['body']
-    last_body_is_strong = last_body >= strong_body_threshold
-    last_body_is_ok = last_body >= min_body_threshold
-
-    # Avoid RSI neutral zone unless confirmations are very strong
-    in_rsi_neutral = RSI_NEUTRAL_LOW < rsi_now < RSI_NEUTRAL_HIGH
-
-    # Prev candle checks (anticagadas)
-    prev_bullish = prev['close'] > prev['open']
-    prev_bearish = prev['close'] < prev['open']
-    prev_body = abs(prev['close'] - prev['open'])
-
-    # Avoid entering against a strong previous candle
-    prev_strong = prev_body >= strong_body_threshold
-
-    # Build confirmations (2 of 3 logic)
-    # For BUY confirmations
-    confirmations_buy = 0
-    reasons_buy = []
-
-    # (A) Trend & momentum: price above EMA + ema rising + rsi rising + structure up
-    cond_trend_buy = bullish_price_vs_ema and ema_up and rsi_up and up_structure
-    if cond_trend_buy:
-        confirmations_buy += 1
-        reasons_buy.append("trend_momentum_ok")
-
-    # (B) Price/BB confirmation: close above lower BB (shows reversion-to-mean or support)
-    cond_bb_buy = last['close'] >= last['bb_low']
-    if cond_bb_buy:
-        confirmations_buy += 1
-        reasons_buy.append("bb_support")
-
-    # (C) Body/ATR confirmation: candle has strength
-    cond_body_buy = last_body_is_ok
-    if cond_body_buy:
-        confirmations_buy += 1
-        reasons_buy.append("body_ok")
-
-    # For SELL confirmations
-    confirmations_sell = 0
-    reasons_sell = []
-
-    cond_trend_sell = bearish_price_vs_ema and ema_down and rsi_down and down_structure
-    if cond_trend_sell:
-        confirmations_sell += 1
-        reasons_sell.append("trend_momentum_ok")
-
-    cond_bb_sell = last['close'] <= last['bb_high']
-    if cond_bb_sell:
-        confirmations_sell += 1
-        reasons_sell.append("bb_resistance")
-
-    cond_body_sell = last_body_is_ok
-    if cond_body_sell:
-        confirmations_sell += 1
-        reasons_sell.append("body_ok")
+    # Otherwise, no signal
+    return None
 
-    # Logging debug about constituents
-    logger.debug(f"[strategy] rsi={rsi_now:.2f} rsi_prev={rsi_prev:.2f} ema_slope={ema_slope:.6f} "
-                 f"bbw={bb_width:.6f} body={last_body:.6f} atr={atr_now:.6f} conf_buy={confirmations_buy} conf_sell={confirmations_sell}")
-
-    # Anticagadas: no entrar si prev candle fue fuerte en contra
-    def blocked_by_prev(signal: str) -> bool:
-        if signal == "BUY" and prev_bearish and prev_strong:
-            return True
-        if signal == "SELL" and prev_bullish and prev_strong:
-            return True
-        return False
-
-    # Avoid repeat same signal immediately
-    def is_repetition(signal: str) -> bool:
-        return last_signal == signal
-
-    # Decide entry with confirmations (prefer BUY or SELL when confirmations >= CONFIRMATIONS_TO_ENTER)
-    # Aggressive rule: if confirmations >= 2 and not blocked, enter.
-    if confirmations_buy >= CONFIRMATIONS_TO_ENTER:
-        if not blocked_by_prev("BUY") and not is_repetition("BUY"):
-            # If in RSI neutral zone require a strong body to allow entry
-            if (not in_rsi_neutral) or (in_rsi_neutral and last_body_is_strong):
-                logger.info(f"✅ SIGNAL: BUY | conf={confirmations_buy} | reasons={reasons_buy}")
-                return "BUY"
 
-    if confirmations_sell >= CONFIRMATIONS_TO_ENTER:
-        if not blocked_by_prev("SELL") and not is_repetition("SELL"):
-            if (not in_rsi_neutral) or (in_rsi_neutral and last_body_is_strong):
-                logger.info(f"✅ SIGNAL: SELL | conf={confirmations_sell} | reasons={reasons_sell}")
-                return "SELL"
-
-    # Fallback aggressive-ish: if trend+momentum present (cond_trend_buy/cond_trend_sell)
-    # but confirmations < 2, allow entry only if body is strong and not blocked/repeated
-    if cond_trend_buy and not blocked_by_prev("BUY") and not is_repetition("BUY"):
-        if last_body_is_strong and (not in_rsi_neutral):
-            logger.info(f"⚠️ FALLBACK BUY (trend present + strong body) | reasons={reasons_buy}")
-            return "BUY"
+def bb_rsi_otc_trend_vectorized(df: pd.DataFrame, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    """
+    Modo vectorizado de bb_rsi_otc_trend: evalúa todas las velas a la vez con máscaras.
+    Devuelve las columnas 'signal', 'direction' y 'reasons' alineadas con `df`.
+    """
+    d = add_indicators(df)
+    n = len(d)
+    pos = np.arange(n)
+    hours = bar_times(d).hour.to_numpy()
+    rules = RULES.evaluate(d)
 
-    if cond_trend_sell and not blocked_by_prev("SELL") and not is_repetition("SELL"):
-        if last_body_is_strong and (not in_rsi_neutral):
-            logger.info(f"⚠️ FALLBACK SELL (trend present + strong body) | reasons={reasons_sell}")
-            return "SELL"
+    allowed = (pos >= 59) & (rules['bb_width'] >= MIN_BB_WIDTH)
+    allowed &= (TRADING_START_HOUR <= hours) & (hours < TRADING_END_HOUR)
 
-    # Otherwise, no signal
-    return None
+    candidates = {last_signal: _decide(rules, allowed, last_signal) for last_signal in (None, "BUY", "SELL")}
+    codes = resolve_signals(candidates, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return rules.reasons("buy" if code == BUY else "sell", i)
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
+
+
+def bb_rsi_otc_trend_cross_section(
+    columns: Dict[str, np.ndarray],
+    last_signals: np.ndarray,
+    current_hour: Optional[int] = None
+) -> np.ndarray:
+    """
+    Modo transversal (utils/cross_section.py): señal de la última vela de cada par,
+    con las columnas como arrays pares × velas.
+    """
+    rules = RULES.evaluate_arrays(body_columns(columns, average=False), last=True).last()
+    allowed = rules['bb_width'] >= MIN_BB_WIDTH
+    if current_hour is not None and not (TRADING_START_HOUR <= current_hour < TRADING_END_HOUR):
+        allowed = np.zeros_like(allowed)
+    return _decide(rules, allowed, last_signals)
+
+
+def bb_rsi_otc_trend_strength(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Confirmaciones de compra y de venta de la última vela de cada par, en unidades de CONFIRMATIONS_TO_ENTER."""
+    rules = RULES.evaluate_arrays(body_columns(columns, average=False), last=True).last()
+    return {"BUY": rules.count("buy") / CONFIRMATIONS_TO_ENTER, "SELL": rules.count("sell") / CONFIRMATIONS_TO_ENTER}
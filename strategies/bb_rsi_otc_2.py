@@ -1,9 +1,13 @@
 # strategies/bb_rsi_otc_trend.py (versión ajustada para más entradas)
-from typing import Optional, Dict, Any
+from typing import Dict, Optional, Tuple
 import time
+import numpy as np
 import pandas as pd
-from utils.indicators import calculate_rsi, calculate_bollinger_bands, calculate_ema, calculate_atr
+from utils import indicator_kernels as kernels
 from utils.logger import setup_logger
+from utils.cross_section import body_columns
+from utils.rules import Expr, Rule, RuleResult, RuleSet, col, maximum
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, select_codes, signal_frame
 
 logger = setup_logger()
 
@@ -33,33 +37,124 @@ MAX_TRADES_PER_HOUR = 6
 
 PRICE_EDGE_PCT = 0.15
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_high", "bb_low")),
+    ("ema", {"window": 200}, ("ema200",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = 60
+
 # ----------------- FUNCIONES -----------------
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_high' not in df.columns or 'bb_low' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], window=20)
+        bb_high, bb_low = kernels.bollinger_bands(close, window=20)
         df['bb_high'] = bb_high
         df['bb_low'] = bb_low
     if 'ema200' not in df.columns:
-        df['ema200'] = calculate_ema(df['close'], window=200)
+        df['ema200'] = kernels.ema(close, window=200)
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
     df['body'] = (df['close'] - df['open']).abs()
     df['avg_body'] = df['body'].rolling(20, min_periods=1).mean()
     return df.dropna()
 
-def _price_within_edge_of_bb(last_close: float, bb_low: float, bb_high: float, edge_pct: float) -> Dict[str, bool]:
+def _price_within_edge_of_bb(close: Expr, bb_low: Expr, bb_high: Expr, edge_pct: float) -> Tuple[Expr, Expr]:
+    """(near_low, near_high): precio a menos de `edge_pct` del ancho de banda de cada borde."""
     width = bb_high - bb_low
-    if width <= 0:
-        return {'near_low': False, 'near_high': False}
-    dist_low = last_close - bb_low
-    dist_high = bb_high - last_close
-    return {
-        'near_low': (dist_low / width) <= edge_pct,
-        'near_high': (dist_high / width) <= edge_pct
-    }
+    has_width = width > 0
+    near_low = has_width & ((close - bb_low) / width <= edge_pct)
+    near_high = has_width & ((bb_high - close) / width <= edge_pct)
+    return near_low, near_high
+
+def _build_rules() -> RuleSet:
+    """Confirmaciones (2 de 3) con bordes de Bollinger como reglas (ver utils/rules.py)."""
+    close, open_, rsi, body = col('close'), col('open'), col('rsi'), col('body')
+    high, low = col('high', default=close), col('low', default=close)
+
+    ema, ema_prev = col('ema200'), col('ema200').prev()
+    ema_slope = (ema - ema_prev) / (ema_prev + 1e-12)
+    ema_up = ema_slope > EMA_SLOPE_MIN
+    ema_down = ema_slope < -EMA_SLOPE_MIN
+    ema_neutral = ~(ema_up | ema_down)
+
+    bullish_price_vs_ema = close > ema + ema * EMA_NEUTRAL_MARGIN_PCT
+    bearish_price_vs_ema = close < ema - ema * EMA_NEUTRAL_MARGIN_PCT
+
+    rsi_prev = rsi.prev()
+
+    atr_now = maximum(col('atr'), 1e-8)
+    price_ref = close.prev(19).fillna(close)
+    min_body_threshold = maximum(price_ref * 0.0007, atr_now * ATR_BODY_MULTIPLIER)
+    strong_body_threshold = maximum(price_ref * 0.0015, atr_now * ATR_STRONG_BODY_MULTIPLIER)
+    last_body_is_strong = body >= strong_body_threshold
+    last_body_is_ok = body >= min_body_threshold
+    in_rsi_neutral = (RSI_NEUTRAL_LOW < rsi) & (rsi < RSI_NEUTRAL_HIGH)
+
+    prev_close, prev_open = close.prev(), open_.prev()
+    prev_strong = abs(prev_close - prev_open) >= strong_body_threshold
+
+    near_low, near_high = _price_within_edge_of_bb(close, col('bb_low'), col('bb_high'), PRICE_EDGE_PCT)
+
+    trend_buy = bullish_price_vs_ema & ema_up & (rsi > rsi_prev) & (high > high.prev()) & ~ema_neutral
+    trend_sell = bearish_price_vs_ema & ema_down & (rsi < rsi_prev) & (low < low.prev()) & ~ema_neutral
+
+    return RuleSet(
+        groups={
+            "buy": [
+                Rule("trend_momentum_ok", trend_buy),
+                Rule("bb_edge_support", near_low),
+                Rule("body_ok", last_body_is_ok),
+            ],
+            "sell": [
+                Rule("trend_momentum_ok", trend_sell),
+                Rule("bb_edge_resistance", near_high),
+                Rule("body_ok", last_body_is_ok),
+            ],
+        },
+        values={
+            "bb_width": (col('bb_high') - col('bb_low')) / (close + 1e-12),
+            "near_low": near_low,
+            "near_high": near_high,
+            "last_body_is_strong": last_body_is_strong,
+            "neutral_ok": ~in_rsi_neutral | last_body_is_strong,
+            "blocked_buy": (prev_close < prev_open) & prev_strong,
+            "blocked_sell": (prev_close > prev_open) & prev_strong,
+        },
+    )
+
+
+RULES = _build_rules()
+
+def _decide(rules: RuleResult, allowed: np.ndarray, last_signal) -> np.ndarray:
+    """Código de señal de cada vela (o de cada par): confirmaciones y, si no, fallback en el borde."""
+    can_buy = allowed & ~rules['blocked_buy'] & (last_signal != "BUY")
+    can_sell = allowed & ~rules['blocked_sell'] & (last_signal != "SELL")
+    confirmations_buy = rules.count("buy")
+    confirmations_sell = rules.count("sell")
+    return select_codes(
+        [
+            can_buy & (confirmations_buy >= CONFIRMATIONS_TO_ENTER) & rules['neutral_ok'],
+            can_sell & (confirmations_sell >= CONFIRMATIONS_TO_ENTER) & rules['neutral_ok'],
+            can_buy & (confirmations_buy >= 2) & rules['last_body_is_strong'] & rules['near_low'],
+            can_sell & (confirmations_sell >= 2) & rules['last_body_is_strong'] & rules['near_high'],
+        ],
+        [BUY, SELL, BUY, SELL],
+    )
+
+def _trade_gate_open(last_trade_timestamp: Optional[float], trades_in_last_hour: int) -> bool:
+    """Cooldown entre operaciones y límite por hora."""
+    if last_trade_timestamp is not None and (time.time() - last_trade_timestamp) < MIN_SECONDS_BETWEEN_TRADES:
+        return False
+    return trades_in_last_hour < MAX_TRADES_PER_HOUR
 
 def bb_rsi_otc_trend(
     df: pd.DataFrame,
@@ -70,128 +165,90 @@ def bb_rsi_otc_trend(
 ) -> Optional[str]:
 
     df = add_indicators(df) # dropna() is now inside add_indicators
-    if len(df) < 60:
+    if len(df) < MIN_ROWS:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    rules = RULES.evaluate_last(df)
+    last = {name: value[-1] for name, value in rules.values.items()}
 
-    bb_width = (last['bb_high'] - last['bb_low']) / (last['close'] + 1e-12)
-    if bb_width < MIN_BB_WIDTH:
+    if last['bb_width'] < MIN_BB_WIDTH:
         return None
 
     if current_hour is not None and not (TRADING_START_HOUR <= current_hour < TRADING_END_HOUR):
         return None
 
-    now_ts = time.time()
-    if last_trade_timestamp is not None:
-        if (now_ts - last_trade_timestamp) < MIN_SECONDS_BETWEEN_TRADES:
-            return None
-    if trades_in_last_hour >= MAX_TRADES_PER_HOUR:
+    if not _trade_gate_open(last_trade_timestamp, trades_in_last_hour):
         return None
 
-    ema_now = last['ema200']
-    ema_prev = df['ema200'].iloc[-2]
-    ema_slope = (ema_now - ema_prev) / (ema_prev + 1e-12)
-    ema_up = ema_slope > EMA_SLOPE_MIN
-    ema_down = ema_slope < -EMA_SLOPE_MIN
-    ema_neutral = not (ema_up or ema_down)
-
-    bullish_price_vs_ema = last['close'] > ema_now + ema_now * EMA_NEUTRAL_MARGIN_PCT
-    bearish_price_vs_ema = last['close'] < ema_now - ema_now * EMA_NEUTRAL_MARGIN_PCT
-
-    up_structure = (last.get('high', last['close']) > prev.get('high', prev['close']))
-    down_structure = (last.get('low', last['close']) < prev.get('low', prev['close']))
-
-    rsi_now = last['rsi']
-    rsi_prev = prev['rsi']
-    rsi_up = rsi_now > rsi_prev
-    rsi_down = rsi_now < rsi_prev
-
-    atr_now = max(last.get('atr', 1e-8), 1e-8)
-    price_ref = df['close'].iloc[-20] if len(df) >= 20 else last['close']
-    min_body_threshold = max(price_ref * 0.0007, atr_now * ATR_BODY_MULTIPLIER)
-    strong_body_threshold = max(price_ref * 0.0015, atr_now * ATR_STRONG_BODY_MULTIPLIER)
-
-    last_body = last['body']
-    last_body_is_strong = last_body >= strong_body_threshold
-    last_body_is_ok = last_body >= min_body_threshold
-
-    in_rsi_neutral = RSI_NEUTRAL_LOW < rsi_now < RSI_NEUTRAL_HIGH
-
-    prev_bullish = prev['close'] > prev['open']
-    prev_bearish = prev['close'] < prev['open']
-    prev_body = abs(prev['close'] - prev['open'])
-    prev_strong = prev_body >= strong_body_threshold
-
-    edge_info = _price_within_edge_of_bb(last['close'], last['bb_low'], last['bb_high'], PRICE_EDGE_PCT)
-    near_low = edge_info['near_low']
-    near_high = edge_info['near_high']
-
-    confirmations_buy = 0
-    reasons_buy = []
-
-    cond_trend_buy = bullish_price_vs_ema and ema_up and rsi_up and up_structure and not ema_neutral
-    if cond_trend_buy:
-        confirmations_buy += 1
-        reasons_buy.append("trend_momentum_ok")
-
-    cond_bb_buy = near_low
-    if cond_bb_buy:
-        confirmations_buy += 1
-        reasons_buy.append("bb_edge_support")
-
-    cond_body_buy = last_body_is_ok
-    if cond_body_buy:
-        confirmations_buy += 1
-        reasons_buy.append("body_ok")
-
-    confirmations_sell = 0
-    reasons_sell = []
-
-    cond_trend_sell = bearish_price_vs_ema and ema_down and rsi_down and down_structure and not ema_neutral
-    if cond_trend_sell:
-        confirmations_sell += 1
-        reasons_sell.append("trend_momentum_ok")
-
-    cond_bb_sell = near_high
-    if cond_bb_sell:
-        confirmations_sell += 1
-        reasons_sell.append("bb_edge_resistance")
-
-    cond_body_sell = last_body_is_ok
-    if cond_body_sell:
-        confirmations_sell += 1
-        reasons_sell.append("body_ok")
-
-    def blocked_by_prev(signal: str) -> bool:
-        if signal == "BUY" and prev_bearish and prev_strong:
-            return True
-        if signal == "SELL" and prev_bullish and prev_strong:
-            return True
-        return False
-
-    def is_repetition(signal: str) -> bool:
-        return last_signal == signal
+    confirmations_buy = rules.count("buy")[-1]
+    confirmations_sell = rules.count("sell")[-1]
+    can_buy = not last['blocked_buy'] and last_signal != "BUY"
+    can_sell = not last['blocked_sell'] and last_signal != "SELL"
 
-    if confirmations_buy >= CONFIRMATIONS_TO_ENTER:
-        if not blocked_by_prev("BUY") and not is_repetition("BUY"):
-            if (not in_rsi_neutral) or (in_rsi_neutral and last_body_is_strong):
-                logger.info(f"✅ SIGNAL: BUY | conf={confirmations_buy} | reasons={reasons_buy}")
-                return "BUY"
+    if confirmations_buy >= CONFIRMATIONS_TO_ENTER and can_buy and last['neutral_ok']:
+        logger.info(f"✅ SIGNAL: BUY | conf={confirmations_buy} | reasons={rules.reasons('buy', -1)}")
+        return "BUY"
 
-    if confirmations_sell >= CONFIRMATIONS_TO_ENTER:
-        if not blocked_by_prev("SELL") and not is_repetition("SELL"):
-            if (not in_rsi_neutral) or (in_rsi_neutral and last_body_is_strong):
-                logger.info(f"✅ SIGNAL: SELL | conf={confirmations_sell} | reasons={reasons_sell}")
-                return "SELL"
+    if confirmations_sell >= CONFIRMATIONS_TO_ENTER and can_sell and last['neutral_ok']:
+        logger.info(f"✅ SIGNAL: SELL | conf={confirmations_sell} | reasons={rules.reasons('sell', -1)}")
+        return "SELL"
 
-    if confirmations_buy >= 2 and last_body_is_strong and near_low and not blocked_by_prev("BUY") and not is_repetition("BUY"):
-        logger.info(f"⚠️ FALLBACK BUY (2/3 + strong body + edge) | reasons={reasons_buy}")
+    if confirmations_buy >= 2 and last['last_body_is_strong'] and last['near_low'] and can_buy:
+        logger.info(f"⚠️ FALLBACK BUY (2/3 + strong body + edge) | reasons={rules.reasons('buy', -1)}")
         return "BUY"
 
-    if confirmations_sell >= 2 and last_body_is_strong and near_high and not blocked_by_prev("SELL") and not is_repetition("SELL"):
-        logger.info(f"⚠️ FALLBACK SELL (2/3 + strong body + edge) | reasons={reasons_sell}")
+    if confirmations_sell >= 2 and last['last_body_is_strong'] and last['near_high'] and can_sell:
+        logger.info(f"⚠️ FALLBACK SELL (2/3 + strong body + edge) | reasons={rules.reasons('sell', -1)}")
         return "SELL"
 
     return None
+
+
+def bb_rsi_otc_trend_vectorized(df: pd.DataFrame, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    """
+    Modo vectorizado de bb_rsi_otc_trend (versión con más entradas).
+    El cooldown por tiempo real y el límite por hora no aplican sobre el histórico.
+    """
+    d = add_indicators(df)
+    n = len(d)
+    pos = np.arange(n)
+    hours = bar_times(d).hour.to_numpy()
+    rules = RULES.evaluate(d)
+
+    allowed = (pos >= 59) & (rules['bb_width'] >= MIN_BB_WIDTH)
+    allowed &= (TRADING_START_HOUR <= hours) & (hours < TRADING_END_HOUR)
+
+    candidates = {last_signal: _decide(rules, allowed, last_signal) for last_signal in (None, "BUY", "SELL")}
+    codes = resolve_signals(candidates, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return rules.reasons("buy" if code == BUY else "sell", i)
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
+
+
+def bb_rsi_otc_trend_cross_section(
+    columns: Dict[str, np.ndarray],
+    last_signals: np.ndarray,
+    current_hour: Optional[int] = None,
+    last_trade_timestamp: Optional[float] = None,
+    trades_in_last_hour: int = 0
+) -> np.ndarray:
+    """
+    Modo transversal (utils/cross_section.py): señal de la última vela de cada par,
+    con las columnas como arrays pares × velas. El cooldown y el límite por hora son
+    de la cuenta, comunes a todos los pares.
+    """
+    rules = RULES.evaluate_arrays(body_columns(columns, average=False), last=True).last()
+    allowed = rules['bb_width'] >= MIN_BB_WIDTH
+    if current_hour is not None and not (TRADING_START_HOUR <= current_hour < TRADING_END_HOUR):
+        allowed = np.zeros_like(allowed)
+    if not _trade_gate_open(last_trade_timestamp, trades_in_last_hour):
+        allowed = np.zeros_like(allowed)
+    return _decide(rules, allowed, last_signals)
+
+
+def bb_rsi_otc_trend_strength(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Confirmaciones de compra y de venta de la última vela de cada par, en unidades de CONFIRMATIONS_TO_ENTER."""
+    rules = RULES.evaluate_arrays(body_columns(columns, average=False), last=True).last()
+    return {"BUY": rules.count("buy") / CONFIRMATIONS_TO_ENTER, "SELL": rules.count("sell") / CONFIRMATIONS_TO_ENTER}
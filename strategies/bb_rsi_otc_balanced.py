@@ -1,14 +1,12 @@
 # strategies/bb_rsi_otc_balanced_v2_focus.py
 from typing import Optional, Dict, Any
+import numpy as np
 import pandas as pd
 import datetime
-from utils.indicators import (
-    calculate_rsi,
-    calculate_bollinger_bands,
-    calculate_ema,
-    calculate_atr
-)
+from utils import indicator_kernels as kernels
+from utils.bar_view import last_bars
 from utils.logger import setup_logger
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, rolling_mean, shifted, signal_frame
 
 logger = setup_logger()
 
@@ -27,20 +25,34 @@ MIN_DYNAMIC_BB_WIDTH = 0.002    # umbral para extender horario
 
 # ---------------------------------------------------------
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_upper", "bb_lower")),
+    ("ema", {"window": EMA_PERIOD}, ("ema",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = EMA_PERIOD
+
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     Añade los indicadores necesarios para la estrategia OTC Balanced.
     """
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_upper' not in df.columns:
-        bb = calculate_bollinger_bands(df['close'], window=20, std_dev=2)
-        df = pd.concat([df, bb], axis=1)
+        bb_upper, bb_lower = kernels.bollinger_bands(close, window=20, std_dev=2)
+        df['bb_upper'] = bb_upper
+        df['bb_lower'] = bb_lower
     if 'ema' not in df.columns:
-        df['ema'] = calculate_ema(df['close'], EMA_PERIOD)
+        df['ema'] = kernels.ema(close, EMA_PERIOD)
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
     
     df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / (df['close'] + 1e-12)
     return df
@@ -57,13 +69,12 @@ def strategy_bb_rsi_otc_balanced_v2_focus(
     - Incluye control de ATR y amplitud de bandas
     """
     df = add_indicators(df).dropna()
-    if len(df) < EMA_PERIOD:
+    if len(df) < MIN_ROWS:
         return None
 
 
     # Última y penúltima vela
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    prev, last = last_bars(df)
 
     # -------- Control horario (interno o externo) --------
     now = datetime.datetime.now()
@@ -135,3 +146,63 @@ def strategy_bb_rsi_otc_balanced_v2_focus(
         "atr": last['atr'],
         "timestamp": now
     }
+
+
+def strategy_bb_rsi_otc_balanced_v2_focus_vectorized(
+    df: pd.DataFrame,
+    start: int = 0,
+    stop: Optional[int] = None,
+    current_minute: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Modo vectorizado de strategy_bb_rsi_otc_balanced_v2_focus.
+    La extensión dinámica usa el minuto de cada vela; `current_minute` fija un
+    minuto único para reproducir la lectura del reloj de la versión en vivo.
+    """
+    d = add_indicators(df).dropna()
+    n = len(d)
+    pos = np.arange(n)
+    times = bar_times(d)
+    hours = times.hour.to_numpy()
+    minutes = times.minute.to_numpy() if current_minute is None else np.full(n, current_minute)
+
+    close = d['close'].to_numpy()
+    rsi = d['rsi'].to_numpy()
+    ema = d['ema'].to_numpy()
+    atr = d['atr'].to_numpy()
+    bb_upper = d['bb_upper'].to_numpy()
+    bb_lower = d['bb_lower'].to_numpy()
+    bb_width = d['bb_width'].to_numpy()
+
+    in_main_window = (TRADING_START_HOUR <= hours) & (hours < TRADING_END_HOUR)
+    in_dynamic_window = (
+        (hours == TRADING_END_HOUR) & (minutes <= DYNAMIC_EXTENSION_MINUTES)
+        & (bb_width > MIN_DYNAMIC_BB_WIDTH)
+    )
+    avg_atr = rolling_mean(atr, 20)
+    allowed = (pos >= EMA_PERIOD - 1) & (in_main_window | in_dynamic_window)
+    allowed &= (bb_width >= MIN_BB_WIDTH) & ~(atr < avg_atr * ATR_VOLATILITY_DROP)
+
+    with np.errstate(invalid='ignore'):
+        put = (
+            (shifted(close) > shifted(bb_upper) - BB_TOUCH_TOLERANCE) &
+            (close < bb_upper - BB_TOUCH_TOLERANCE) &
+            (rsi > RSI_OVERBOUGHT) &
+            (close < ema)
+        )
+        call = (
+            (shifted(close) < shifted(bb_lower) + BB_TOUCH_TOLERANCE) &
+            (close > bb_lower + BB_TOUCH_TOLERANCE) &
+            (rsi < RSI_OVERSOLD) &
+            (close > ema)
+        )
+
+    confirmations = put.astype(int) + call
+    candidates = np.where(call, BUY, np.where(put, SELL, 0)).astype(np.int8)
+    candidates[~allowed | (confirmations < CONFIRMATIONS_TO_ENTER)] = 0
+    codes = resolve_signals({None: candidates}, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return ["bb_rsi_reversal_call" if code == BUY else "bb_rsi_reversal_put"]
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
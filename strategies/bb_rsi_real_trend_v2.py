@@ -1,9 +1,13 @@
 # strategies/bb_rsi_real_trend_v2.py
-from typing import Optional
+from typing import Dict, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from utils.indicators import calculate_rsi, calculate_bollinger_bands, calculate_ema, calculate_atr
+from utils import indicator_kernels as kernels
 from utils.logger import setup_logger
+from utils.cross_section import body_columns
+from utils.rules import Rule, RuleResult, RuleSet, col
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, rolling_mean, select_codes, signal_frame
 
 logger = setup_logger()
 
@@ -36,26 +40,105 @@ BODY_RATIO_THRESHOLD = 0.30
 
 
 # ===========================================================
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_high", "bb_low")),
+    ("ema", {"window": 200}, ("ema200",)),
+    ("ema", {"window": 20}, ("ema20",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = 60
+
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_high' not in df.columns or 'bb_low' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], window=20)
+        bb_high, bb_low = kernels.bollinger_bands(close, window=20)
         df['bb_high'] = bb_high
         df['bb_low'] = bb_low
     if 'ema200' not in df.columns:
-        df['ema200'] = calculate_ema(df['close'], window=200)
+        df['ema200'] = kernels.ema(close, window=200)
     if 'ema20' not in df.columns:
-        df['ema20'] = calculate_ema(df['close'], window=20)
+        df['ema20'] = kernels.ema(close, window=20)
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
 
     df['body'] = (df['close'] - df['open']).abs()
     df['avg_body'] = df['body'].rolling(20, min_periods=1).mean()
     return df
 
 
+# ===========================================================
+def _build_rules() -> RuleSet:
+    """Score con penalizaciones como reglas (mismas en vivo y en backtest, ver utils/rules.py)."""
+    close, open_, rsi = col('close'), col('open'), col('rsi')
+    rsi_prev = rsi.prev()
+
+    # 3️⃣ TENDENCIA PRINCIPAL
+    ema_margin = col('ema200') * EMA_NEUTRAL_MARGIN_PCT
+    bullish_trend = close > col('ema200') + ema_margin
+    bearish_trend = close < col('ema200') - ema_margin
+
+    # 4️⃣ MOMENTUM RSI
+    rsi_up = rsi > rsi_prev
+    rsi_down = rsi < rsi_prev
+
+    body_ratio = col('body') / (col('avg_body') + 1e-12)
+
+    # 5️⃣ SCORE ESTRUCTURADO y 6️⃣ PENALIZACIONES (peso negativo)
+    return RuleSet(
+        groups={
+            "buy": [
+                Rule("pullback_buy", bullish_trend & (rsi_prev < RSI_PULLBACK_BUY) & (RSI_PULLBACK_BUY <= rsi),
+                     SCORE_PULLBACK_ENTRY, reason=f"pullback_buy(rsi_cross_{RSI_PULLBACK_BUY})"),
+                Rule("trend_continuation_up", bullish_trend & rsi_up, SCORE_TREND_MOMENTUM),
+                Rule("rsi_bull_zone", rsi > RSI_BULL_ZONE, SCORE_RSI_ZONE, report=False),
+                Rule("close_above_ema20", close > col('ema20'), SCORE_BB_CONFIRMATION, report=False),
+                Rule("bull_body", (close > open_) & (body_ratio >= BODY_RATIO_THRESHOLD), SCORE_BODY_CONFIRMATION, report=False),
+                Rule("penalty_rsi_contrary", bullish_trend & rsi_down, -PENALTY_CONTRADICTION),
+            ],
+            "sell": [
+                Rule("pullback_sell", bearish_trend & (rsi_prev > RSI_PULLBACK_SELL) & (RSI_PULLBACK_SELL >= rsi),
+                     SCORE_PULLBACK_ENTRY, reason=f"pullback_sell(rsi_cross_{RSI_PULLBACK_SELL})"),
+                Rule("trend_continuation_down", bearish_trend & rsi_down, SCORE_TREND_MOMENTUM),
+                Rule("rsi_bear_zone", rsi < RSI_BEAR_ZONE, SCORE_RSI_ZONE, report=False),
+                Rule("close_below_ema20", close < col('ema20'), SCORE_BB_CONFIRMATION, report=False),
+                Rule("bear_body", (close < open_) & (body_ratio >= BODY_RATIO_THRESHOLD), SCORE_BODY_CONFIRMATION, report=False),
+                Rule("penalty_rsi_contrary", bearish_trend & rsi_up, -PENALTY_CONTRADICTION),
+            ],
+        },
+        values={"bb_width": (col('bb_high') - col('bb_low')) / (close + 1e-12)},
+    )
+
+
+RULES = _build_rules()
+
+
+def _decide(rules: RuleResult, allowed: np.ndarray, last_signal) -> np.ndarray:
+    """Código de señal de cada vela (o de cada par) según el score y `last_signal`."""
+    score_buy = rules.score("buy")
+    score_sell = rules.score("sell")
+    wants_buy = allowed & (score_buy >= MIN_SCORE_TO_ENTER) & (score_buy > score_sell)
+    wants_sell = allowed & (score_sell >= MIN_SCORE_TO_ENTER) & (score_sell > score_buy)
+    return select_codes(
+        [wants_buy & (last_signal != "BUY"), wants_sell & (last_signal != "SELL")],
+        [BUY, SELL],
+    )
+
+
+def _in_session(current_hour: int, current_minute: int) -> bool:
+    """Horario permitido, fuera de la hora muerta (9:15–9:45)."""
+    if not (TRADING_START_HOUR <= current_hour < TRADING_END_HOUR):
+        return False
+    return not (9 <= current_hour < 10 and 15 <= current_minute <= 45)
+
+
 # ===========================================================
 def bb_rsi_real_trend_v2(df: pd.DataFrame, last_signal: Optional[str] = None, current_hour: Optional[int] = None) -> Optional[str]:
     """
@@ -66,12 +149,9 @@ def bb_rsi_real_trend_v2(df: pd.DataFrame, last_signal: Optional[str] = None, cu
     - Penaliza señales contradictorias
     """
     df = add_indicators(df).dropna()
-    if len(df) < 60:
+    if len(df) < MIN_ROWS:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
-
     # ===========================================================
     # 1️⃣ HORARIO DINÁMICO
     if current_hour is None:
@@ -86,8 +166,9 @@ def bb_rsi_real_trend_v2(df: pd.DataFrame, last_signal: Optional[str] = None, cu
 
     # ===========================================================
     # 2️⃣ FILTROS DE VOLATILIDAD
-    bb_width = (last['bb_high'] - last['bb_low']) / (last['close'] + 1e-12)
-    atr_now = last['atr']
+    rules = RULES.evaluate_last(df)
+    bb_width = rules['bb_width'][-1]
+    atr_now = df['atr'].iloc[-1]
     atr_avg = df['atr'].tail(20).mean()
     if bb_width < MIN_BB_WIDTH:
         logger.debug(f"[v2] Banda de Bollinger estrecha (BB={bb_width:.6f})")
@@ -96,70 +177,10 @@ def bb_rsi_real_trend_v2(df: pd.DataFrame, last_signal: Optional[str] = None, cu
         logger.debug(f"[v2] ATR bajo (ATR={atr_now:.5f}, avg={atr_avg:.5f})")
         return None
 
-    # ===========================================================
-    # 3️⃣ TENDENCIA PRINCIPAL
-    ema_margin = last['ema200'] * EMA_NEUTRAL_MARGIN_PCT
-    bullish_trend = last['close'] > last['ema200'] + ema_margin
-    bearish_trend = last['close'] < last['ema200'] - ema_margin
-
-    # ===========================================================
-    # 4️⃣ MOMENTUM RSI
-    rsi_up = last['rsi'] > prev['rsi']
-    rsi_down = last['rsi'] < prev['rsi']
-
-    # ===========================================================
-    # 5️⃣ SCORE ESTRUCTURADO
-    score_buy, score_sell = 0.0, 0.0
-    reasons_buy, reasons_sell = [], []
-
-    # --- Pullback entries ---
-    if bullish_trend and prev['rsi'] < RSI_PULLBACK_BUY <= last['rsi']:
-        score_buy += SCORE_PULLBACK_ENTRY
-        reasons_buy.append(f"pullback_buy(rsi_cross_{RSI_PULLBACK_BUY})")
-
-    if bearish_trend and prev['rsi'] > RSI_PULLBACK_SELL >= last['rsi']:
-        score_sell += SCORE_PULLBACK_ENTRY
-        reasons_sell.append(f"pullback_sell(rsi_cross_{RSI_PULLBACK_SELL})")
-
-    # --- Continuación de tendencia ---
-    if bullish_trend and rsi_up:
-        score_buy += SCORE_TREND_MOMENTUM
-        reasons_buy.append("trend_continuation_up")
-
-    if bearish_trend and rsi_down:
-        score_sell += SCORE_TREND_MOMENTUM
-        reasons_sell.append("trend_continuation_down")
-
-    # --- RSI zones ---
-    if last['rsi'] > RSI_BULL_ZONE:
-        score_buy += SCORE_RSI_ZONE
-    if last['rsi'] < RSI_BEAR_ZONE:
-        score_sell += SCORE_RSI_ZONE
-
-    # --- Confirmación EMA20 / Bollinger ---
-    if last['close'] > last['ema20']:
-        score_buy += SCORE_BB_CONFIRMATION
-    if last['close'] < last['ema20']:
-        score_sell += SCORE_BB_CONFIRMATION
-
-    # --- Cuerpo de vela ---
-    body_ratio = last['body'] / (last['avg_body'] + 1e-12)
-    if last['close'] > last['open'] and body_ratio >= BODY_RATIO_THRESHOLD:
-        score_buy += SCORE_BODY_CONFIRMATION
-    elif last['close'] < last['open'] and body_ratio >= BODY_RATIO_THRESHOLD:
-        score_sell += SCORE_BODY_CONFIRMATION
-
-    # ===========================================================
-    # 6️⃣ PENALIZACIONES
-    if bullish_trend and rsi_down:
-        score_buy -= PENALTY_CONTRADICTION
-        reasons_buy.append("penalty_rsi_contrary")
-    if bearish_trend and rsi_up:
-        score_sell -= PENALTY_CONTRADICTION
-        reasons_sell.append("penalty_rsi_contrary")
-
     # ===========================================================
     # 7️⃣ DECISIÓN FINAL
+    score_buy, score_sell = rules.score("buy")[-1], rules.score("sell")[-1]
+    reasons_buy, reasons_sell = rules.reasons("buy", -1), rules.reasons("sell", -1)
     logger.debug(f"[v2] BUY={score_buy:.2f} ({reasons_buy}) | SELL={score_sell:.2f} ({reasons_sell})")
 
     if score_buy >= MIN_SCORE_TO_ENTER and score_buy > score_sell:
@@ -173,3 +194,67 @@ def bb_rsi_real_trend_v2(df: pd.DataFrame, last_signal: Optional[str] = None, cu
             return "SELL"
 
     return None
+
+
+# ===========================================================
+def bb_rsi_real_trend_v2_vectorized(
+    df: pd.DataFrame,
+    start: int = 0,
+    stop: Optional[int] = None,
+    current_minute: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Modo vectorizado de bb_rsi_real_trend_v2.
+    La hora muerta (9:15–9:45) se evalúa con el minuto de cada vela; `current_minute`
+    fija un minuto único para reproducir la lectura del reloj de la versión en vivo.
+    """
+    d = add_indicators(df).dropna()
+    n = len(d)
+    pos = np.arange(n)
+    times = bar_times(d)
+    hours = times.hour.to_numpy()
+    minutes = times.minute.to_numpy() if current_minute is None else np.full(n, current_minute)
+    rules = RULES.evaluate(d)
+
+    atr = d['atr'].to_numpy()
+    atr_avg = rolling_mean(atr, 20)
+    dead_hour = (9 <= hours) & (hours < 10) & (15 <= minutes) & (minutes <= 45)
+    allowed = (pos >= 59) & (TRADING_START_HOUR <= hours) & (hours < TRADING_END_HOUR) & ~dead_hour
+    allowed &= (rules['bb_width'] >= MIN_BB_WIDTH) & ~(atr < atr_avg * ATR_VOLATILITY_FACTOR)
+
+    candidates = {last_signal: _decide(rules, allowed, last_signal) for last_signal in (None, "BUY", "SELL")}
+    codes = resolve_signals(candidates, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return rules.reasons("buy" if code == BUY else "sell", i)
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
+
+
+# ===========================================================
+def bb_rsi_real_trend_v2_cross_section(
+    columns: Dict[str, np.ndarray],
+    last_signals: np.ndarray,
+    current_hour: Optional[int] = None
+) -> np.ndarray:
+    """
+    Modo transversal (utils/cross_section.py): señal de la última vela de cada par,
+    con las columnas como arrays pares × velas. Horario y hora muerta con el reloj,
+    igual que la versión en vivo.
+    """
+    rules = RULES.evaluate_arrays(body_columns(columns), last=True).last()
+    atr = columns['atr']
+    atr_now = atr[:, -1]
+    atr_avg = atr[:, -20:].mean(axis=-1)
+    allowed = (rules['bb_width'] >= MIN_BB_WIDTH) & ~(atr_now < atr_avg * ATR_VOLATILITY_FACTOR)
+
+    now = datetime.now()
+    if not _in_session(now.hour if current_hour is None else current_hour, now.minute):
+        allowed = np.zeros_like(allowed)
+    return _decide(rules, allowed, last_signals)
+
+
+def bb_rsi_real_trend_v2_strength(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Score de compra y de venta de la última vela de cada par, en unidades de MIN_SCORE_TO_ENTER."""
+    rules = RULES.evaluate_arrays(body_columns(columns), last=True).last()
+    return {"BUY": rules.score("buy") / MIN_SCORE_TO_ENTER, "SELL": rules.score("sell") / MIN_SCORE_TO_ENTER}
@@ -1,15 +1,16 @@
 import pandas as pd
-from utils.indicators import calculate_rsi, calculate_bollinger_bands, calculate_ema, calculate_atr
+from utils import indicator_kernels as kernels
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Añade todos los indicadores necesarios al DataFrame."""
-    df['rsi'] = calculate_rsi(df['close'], window=14)
-    df['bb_high'], df['bb_low'] = calculate_bollinger_bands(df['close'], window=20)
-    df['ema200'] = calculate_ema(df['close'], window=200)
-    df['atr'] = calculate_atr(df, window=14)
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
+    df['rsi'] = kernels.rsi(close, window=14)
+    df['bb_high'], df['bb_low'] = kernels.bollinger_bands(close, window=20)
+    df['ema200'] = kernels.ema(close, window=200)
+    df['atr'] = kernels.atr(high, low, close, window=14)
     return df
 
 
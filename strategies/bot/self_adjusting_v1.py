@@ -3,14 +3,12 @@ import json
 import os
 from typing import Optional, Dict, Any
 import logging
+import numpy as np
 import pandas as pd
 import datetime
-from utils.indicators import (
-    calculate_rsi,
-    calculate_bollinger_bands,
-    calculate_ema,
-    calculate_atr
-)
+from utils import indicator_kernels as kernels
+from utils.bar_view import last_bars
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, rolling_mean, shifted, signal_frame
 
 logger = logging.getLogger("TradingBot")
 
@@ -25,19 +23,32 @@ def load_config():
 
 PARAMS = load_config()
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_upper", "bb_lower")),
+    ("ema", {"window": PARAMS['EMA_PERIOD']}, ("ema",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = PARAMS['EMA_PERIOD']
+
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Añade los indicadores necesarios para la estrategia."""
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_upper' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], window=20, std_dev=2)
+        bb_high, bb_low = kernels.bollinger_bands(close, window=20, std_dev=2)
         df['bb_upper'] = bb_high
         df['bb_lower'] = bb_low
     if 'ema' not in df.columns:
-        df['ema'] = calculate_ema(df['close'], PARAMS['EMA_PERIOD'])
+        df['ema'] = kernels.ema(close, PARAMS['EMA_PERIOD'])
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
     
     df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / (df['close'] + 1e-12)
     return df
@@ -55,8 +66,7 @@ def self_adjusting_strategy_v1(
     if len(df) < PARAMS['EMA_PERIOD']:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    prev, last = last_bars(df)
 
     now = datetime.datetime.now()
     if current_hour is None:
@@ -115,4 +125,55 @@ def self_adjusting_strategy_v1(
         "ema": last['ema'],
         "atr": last['atr'],
         "timestamp": now
-    }
\ No newline at end of file
+    }
+
+def self_adjusting_strategy_v1_vectorized(
+    df: pd.DataFrame,
+    start: int = 0,
+    stop: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Modo vectorizado de self_adjusting_strategy_v1 (mismos parámetros JSON).
+    """
+    d = add_indicators(df).dropna()
+    n = len(d)
+    pos = np.arange(n)
+    hours = bar_times(d).hour.to_numpy()
+
+    close = d['close'].to_numpy()
+    rsi = d['rsi'].to_numpy()
+    ema = d['ema'].to_numpy()
+    atr = d['atr'].to_numpy()
+    bb_upper = d['bb_upper'].to_numpy()
+    bb_lower = d['bb_lower'].to_numpy()
+    bb_width = d['bb_width'].to_numpy()
+    tolerance = PARAMS['BB_TOUCH_TOLERANCE']
+
+    avg_atr = rolling_mean(atr, 20)
+    allowed = (pos >= PARAMS['EMA_PERIOD'] - 1)
+    allowed &= (PARAMS['TRADING_START_HOUR'] <= hours) & (hours < PARAMS['TRADING_END_HOUR'])
+    allowed &= (bb_width >= PARAMS['MIN_BB_WIDTH']) & ~(atr < avg_atr * PARAMS['ATR_VOLATILITY_DROP'])
+
+    with np.errstate(invalid='ignore'):
+        put = (
+            (shifted(close) > shifted(bb_upper) - tolerance) &
+            (close < bb_upper - tolerance) &
+            (rsi > PARAMS['RSI_OVERBOUGHT']) &
+            (close < ema)
+        )
+        call = (
+            (shifted(close) < shifted(bb_lower) + tolerance) &
+            (close > bb_lower + tolerance) &
+            (rsi < PARAMS['RSI_OVERSOLD']) &
+            (close > ema)
+        )
+
+    confirmations = put.astype(int) + call
+    candidates = np.where(call, BUY, np.where(put, SELL, 0)).astype(np.int8)
+    candidates[~allowed | (confirmations < PARAMS['CONFIRMATIONS_TO_ENTER'])] = 0
+    codes = resolve_signals({None: candidates}, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return ["bb_rsi_reversal_call" if code == BUY else "bb_rsi_reversal_put"]
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
@@ -3,15 +3,13 @@ import json
 import os
 from typing import Optional, Dict, Any
 import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 
-from utils.indicators import (
-    calculate_rsi,
-    calculate_bollinger_bands,
-    calculate_ema,
-    calculate_atr
-)
+from utils import indicator_kernels as kernels
+from utils.bar_view import last_bars
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, rolling_mean, shifted, signal_frame
 
 logger = logging.getLogger("TradingBot")
 
@@ -29,20 +27,33 @@ def get_params(force_reload: bool = False) -> dict:
             PARAMS = json.load(f)
     return PARAMS
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_upper", "bb_lower")),
+    ("ema", {"window": get_params()['EMA_PERIOD']}, ("ema",)),
+    ("atr", {"window": 14}, ("atr",)),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = get_params()['EMA_PERIOD']
+
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Añade los indicadores necesarios para la estrategia."""
     params = get_params()
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], window=14)
+        df['rsi'] = kernels.rsi(close, window=14)
     if 'bb_upper' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], window=20, std_dev=2)
+        bb_high, bb_low = kernels.bollinger_bands(close, window=20, std_dev=2)
         df['bb_upper'] = bb_high
         df['bb_lower'] = bb_low
     if 'ema' not in df.columns:
-        df['ema'] = calculate_ema(df['close'], params['EMA_PERIOD'])
+        df['ema'] = kernels.ema(close, params['EMA_PERIOD'])
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, window=14)
+        df['atr'] = kernels.atr(high, low, close, window=14)
     
     df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / (df['close'] + 1e-12)
     return df
@@ -63,8 +74,7 @@ def self_adjusting_strategy_v2(
     if len(df) < params['EMA_PERIOD']:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    prev, last = last_bars(df)
 
     # --- Nivel 1: Uso de UTC para el tiempo ---
     now = datetime.now(timezone.utc)
@@ -125,4 +135,59 @@ def self_adjusting_strategy_v2(
         "ema": last['ema'],
         "atr": last['atr'],
         "timestamp": now
-    }
\ No newline at end of file
+    }
+
+def self_adjusting_strategy_v2_vectorized(
+    df: pd.DataFrame,
+    start: int = 0,
+    stop: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Modo vectorizado de self_adjusting_strategy_v2 (mismos parámetros JSON).
+    """
+    params = get_params()
+    d = add_indicators(df).dropna()
+    n = len(d)
+    pos = np.arange(n)
+    hours = bar_times(d).hour.to_numpy()
+
+    close = d['close'].to_numpy()
+    open_ = d['open'].to_numpy()
+    rsi = d['rsi'].to_numpy()
+    ema = d['ema'].to_numpy()
+    atr = d['atr'].to_numpy()
+    bb_width = d['bb_width'].to_numpy()
+    tolerance = params['BB_TOUCH_TOLERANCE']
+
+    allowed = (pos >= params['EMA_PERIOD'] - 1)
+    allowed &= (params['TRADING_START_HOUR'] <= hours) & (hours < params['TRADING_END_HOUR'])
+    allowed &= ~(bb_width < params['MIN_BB_WIDTH'])
+    allowed &= ~(atr < rolling_mean(atr, 20) * params['ATR_VOLATILITY_DROP'])
+    allowed &= ~(np.abs(close - open_) < atr * 0.5)  # Movimiento débil
+
+    prev_close = shifted(close)
+    with np.errstate(invalid='ignore'):
+        put = (
+            (prev_close > shifted(d['bb_upper'].to_numpy()) - tolerance) &
+            (rsi > params['RSI_OVERBOUGHT']) &
+            (close < prev_close)
+        )
+        call = (
+            (prev_close < shifted(d['bb_lower'].to_numpy()) + tolerance) &
+            (rsi < params['RSI_OVERSOLD']) &
+            (close > prev_close)
+        )
+
+    # Filtros post-señal: tendencia con EMA y persistencia RSI
+    rsi_trend = rolling_mean(rsi, 5)
+    put &= ~call & ~(close > ema) & ~(rsi_trend > 75)
+    call &= ~(close < ema) & ~(rsi_trend < 25)
+
+    candidates = np.where(call, BUY, np.where(put, SELL, 0)).astype(np.int8)
+    candidates[~allowed] = 0
+    codes = resolve_signals({None: candidates}, start, stop)
+
+    def reasons(i: int, code: int) -> list:
+        return ["bb_rsi_reversal_call" if code == BUY else "bb_rsi_reversal_put"]
+
+    return signal_frame(d, codes, reasons, target_index=df.index)
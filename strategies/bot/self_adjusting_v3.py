@@ -6,12 +6,10 @@ from typing import Optional, Dict, Any
 import pandas as pd
 import numpy as np
 
-from utils.indicators import (
-    calculate_rsi,
-    calculate_bollinger_bands,
-    calculate_ema,
-    calculate_atr
-)
+from utils import indicator_kernels as kernels
+from utils.bar_view import last_bars
+from utils.timeframes import add_timeframes, all_timeframe_columns
+from utils.vectorized import BUY, SELL, bar_times, resolve_signals, rolling_mean, shifted, signal_frame
 
 logger = logging.getLogger("TradingBot")
 
@@ -30,26 +28,50 @@ def get_params(force_reload: bool = False) -> dict:
     return PARAMS
 
 
+# Indicadores que main.py mantiene en streaming (utils/streaming_indicators.py);
+# add_indicators solo calcula las columnas que falten.
+INDICATORS = [
+    ("rsi", {"window": 14}, ("rsi",)),
+    ("ema", {"window": 14}, ("ema_fast",)),
+    ("ema", {"window": 50}, ("ema_slow",)),
+    ("atr", {"window": 14}, ("atr",)),
+    ("bollinger", {"window": 20, "std_dev": 2}, ("bb_upper", "bb_lower")),
+]
+
+# Filas que la estrategia necesita tras dropna() (utils/lookback.py)
+MIN_ROWS = 100
+
+# Temporalidades superiores (utils/timeframes.py): la tendencia de 5 minutos confirma
+# las duraciones de 5 y 10 minutos.
+TIMEFRAMES = {
+    5: [("ema", {"window": 20}, ("ema20",))],
+}
+
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Añade indicadores técnicos necesarios."""
     params = get_params()
     df = df.copy()
+    high, low, close = (kernels.as_array(df[col]) for col in ('high', 'low', 'close'))
 
     if 'rsi' not in df.columns:
-        df['rsi'] = calculate_rsi(df['close'], 14)
+        df['rsi'] = kernels.rsi(close, 14)
     if 'ema_fast' not in df.columns:
-        df['ema_fast'] = calculate_ema(df['close'], 14)
+        df['ema_fast'] = kernels.ema(close, 14)
     if 'ema_slow' not in df.columns:
-        df['ema_slow'] = calculate_ema(df['close'], 50)
+        df['ema_slow'] = kernels.ema(close, 50)
     if 'atr' not in df.columns:
-        df['atr'] = calculate_atr(df, 14)
+        df['atr'] = kernels.atr(high, low, close, 14)
     if 'bb_upper' not in df.columns:
-        bb_high, bb_low = calculate_bollinger_bands(df['close'], 20, 2)
+        bb_high, bb_low = kernels.bollinger_bands(close, 20, 2)
         df['bb_upper'] = bb_high
         df['bb_lower'] = bb_low
 
     df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / (df['close'] + 1e-12)
-    return df.dropna()
+    # Las columnas de 5 minutos no tienen valor hasta cerrar la primera vela de 5m
+    df = df.dropna(subset=df.columns.difference(all_timeframe_columns(TIMEFRAMES)))
+    if 'm5_ema20' not in df.columns:
+        df = add_timeframes(df, TIMEFRAMES)
+    return df
 
 
 def self_adjusting_strategy_v3(
@@ -65,11 +87,11 @@ def self_adjusting_strategy_v3(
     """
     params = get_params()
     df = add_indicators(df)
-    if len(df) < 100:
+    if len(df) < MIN_ROWS:
         return None
 
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    bars = last_bars(df, 10)
+    prev, last = bars[-2:]
 
     now = datetime.now(timezone.utc)
     if current_hour is None:
@@ -79,7 +101,7 @@ def self_adjusting_strategy_v3(
         return None
 
     # --- 1️⃣ Análisis de estructura general ---
-    ema_slope = (df['ema_slow'].iloc[-1] - df['ema_slow'].iloc[-10]) / df['ema_slow'].iloc[-10]
+    ema_slope = (last['ema_slow'] - bars[0]['ema_slow']) / bars[0]['ema_slow']
     atr_mean = df['atr'].tail(50).mean()
     atr_now = last['atr']
     trend_strength = abs(ema_slope) * (atr_now / (atr_mean + 1e-12))
@@ -132,6 +154,12 @@ def self_adjusting_strategy_v3(
     if direction is None:
         return None
 
+    # Las duraciones largas exigen que la vela de 5 minutos acompañe la dirección
+    htf_close, htf_ema = last['m5_close'], last['m5_ema20']
+    if duration > 1 and not np.isnan(htf_ema):
+        if (direction == "call" and htf_close <= htf_ema) or (direction == "put" and htf_close >= htf_ema):
+            duration = 1
+
     # --- 4️⃣ Filtros de confirmación ---
     if last['bb_width'] < params['MIN_BB_WIDTH']:
         return None
@@ -151,3 +179,97 @@ def self_adjusting_strategy_v3(
         "atr": last["atr"],
         "timestamp": now
     }
+
+
+def self_adjusting_strategy_v3_vectorized(
+    df: pd.DataFrame,
+    start: int = 0,
+    stop: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Modo vectorizado de self_adjusting_strategy_v3.
+    Además de 'signal', 'direction' y 'reasons' devuelve la duración sugerida por vela
+    ('duration_minutes') junto con 'trend_strength', 'bias' y 'ema_slope'.
+    """
+    params = get_params()
+    d = add_indicators(df)
+    n = len(d)
+    pos = np.arange(n)
+    hours = bar_times(d).hour.to_numpy()
+
+    close = d['close'].to_numpy()
+    open_ = d['open'].to_numpy()
+    rsi = d['rsi'].to_numpy()
+    ema_slow = d['ema_slow'].to_numpy()
+    atr = d['atr'].to_numpy()
+    tolerance = params['BB_TOUCH_TOLERANCE']
+
+    allowed = (pos >= 99) & (params['TRADING_START_HOUR'] <= hours) & (hours < params['TRADING_END_HOUR'])
+
+    # --- 1️⃣ Análisis de estructura general ---
+    with np.errstate(invalid='ignore'):
+        ema_ref = shifted(ema_slow, 9)
+        ema_slope = (ema_slow - ema_ref) / ema_ref
+        atr_mean = rolling_mean(atr, 50)
+        trend_strength = np.abs(ema_slope) * (atr / (atr_mean + 1e-12))
+
+    up_count = pd.Series(close > open_).rolling(30, min_periods=1).sum().to_numpy()
+    up_ratio = up_count / 30
+    bias = np.where(up_ratio > 0.55, "bullish", np.where(up_ratio < 0.45, "bearish", "neutral"))
+
+    # --- 2️⃣ Ajuste de duración según contexto ---
+    duration = np.where(
+        trend_strength > params['TREND_STRONG_THRESHOLD'], 10,
+        np.where(trend_strength > params['TREND_MEDIUM_THRESHOLD'], 5, 1)
+    )
+
+    # --- 3️⃣ Lógica de señal principal ---
+    prev_close = shifted(close)
+    trending = trend_strength > params['TREND_MEDIUM_THRESHOLD']
+    with np.errstate(invalid='ignore'):
+        continuation_call = (bias == "bullish") & (close > ema_slow) & (rsi > 50) & (close > prev_close)
+        continuation_put = (bias == "bearish") & (close < ema_slow) & (rsi < 50) & (close < prev_close)
+        reversal_put = (
+            (prev_close > shifted(d['bb_upper'].to_numpy()) - tolerance) &
+            (rsi > params['RSI_OVERBOUGHT']) &
+            (close < prev_close)
+        )
+        reversal_call = (
+            (prev_close < shifted(d['bb_lower'].to_numpy()) + tolerance) &
+            (rsi < params['RSI_OVERSOLD']) &
+            (close > prev_close)
+        )
+
+    candidates = np.select(
+        [
+            trending & continuation_call,
+            trending & continuation_put,
+            ~trending & reversal_put,
+            ~trending & reversal_call,
+        ],
+        [BUY, SELL, SELL, BUY],
+        default=0,
+    ).astype(np.int8)
+
+    # --- 4️⃣ Filtros de confirmación ---
+    allowed &= ~(d['bb_width'].to_numpy() < params['MIN_BB_WIDTH'])
+    allowed &= ~(atr < atr_mean * params['ATR_VOLATILITY_DROP'])
+    candidates[~allowed] = 0
+    codes = resolve_signals({None: candidates}, start, stop)
+
+    # Las duraciones largas exigen que la vela de 5 minutos acompañe la dirección
+    htf_close, htf_ema = d['m5_close'].to_numpy(), d['m5_ema20'].to_numpy()
+    with np.errstate(invalid='ignore'):
+        against_htf = np.where(codes == BUY, htf_close <= htf_ema, htf_close >= htf_ema) & ~np.isnan(htf_ema)
+    duration = np.where((duration > 1) & against_htf, 1, duration)
+
+    def reasons(i: int, code: int) -> list:
+        return ["trend_continuation" if trending[i] else "bb_rsi_reversal"]
+
+    extra = {
+        'duration_minutes': duration,
+        'trend_strength': trend_strength,
+        'bias': bias,
+        'ema_slope': ema_slope,
+    }
+    return signal_frame(d, codes, reasons, extra=extra, target_index=df.index)
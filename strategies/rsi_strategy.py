@@ -1,11 +1,12 @@
-from utils.indicators import calculate_rsi
+from utils import indicator_kernels as kernels
 import pandas as pd
 
 def rsi_strategy(df: pd.DataFrame) -> str | None:
     if len(df) < 15:
         return None  # No hay suficientes velas para RSI 14
 
-    df['rsi'] = calculate_rsi(df['close'], window=14)
+    close = kernels.as_array(df['close'])
+    df['rsi'] = kernels.rsi(close, window=14)
     latest = df.iloc[-1]
 
     if latest['rsi'] < 30:
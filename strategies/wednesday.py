@@ -1,4 +1,4 @@
-from utils.indicators import calculate_rsi, calculate_ema
+from utils import indicator_kernels as kernels
 import pandas as pd
 
 from utils.logger import setup_logger
@@ -6,9 +6,10 @@ logger = setup_logger()
 
 def wednesday_strategy(df: pd.DataFrame) -> str | None:
     # Calcula los indicadores
-    df['rsi'] = calculate_rsi(df['close'], window=14)
-    df['ema5'] = calculate_ema(df['close'], window=5)
-    df['ema20'] = calculate_ema(df['close'], window=20)
+    close = kernels.as_array(df['close'])
+    df['rsi'] = kernels.rsi(close, window=14)
+    df['ema5'] = kernels.ema(close, window=5)
+    df['ema20'] = kernels.ema(close, window=20)
 
     if len(df) < 21:
         return None  # no hay suficientes datos
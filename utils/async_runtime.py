@@ -0,0 +1,289 @@
+# utils/async_runtime.py
+"""
+Runtime asyncio: muchos pares × estrategias desde un solo proceso y una sola conexión.
+
+main.py es un bucle síncrono para un único PAIR. `AsyncTradingRuntime` reparte una
+conexión de IQ_Option entre N pares y M estrategias:
+
+- Las llamadas bloqueantes de iqoptionapi (get_candles, buy, get_balance y la
+  lectura del stream) pasan por `AsyncAPI`, un pool de hilos acotado
+  (`max_workers`), así nunca hay más de `max_workers` peticiones en vuelo.
+- Un solo CandleClock (utils/candle_clock.py) despierta al cierre de cada vela;
+  MarketData (utils/market_data.py) entrega las velas cerradas de todos los pares
+  de una lectura, y cada par evalúa sus estrategias con estado
+  (utils/strategy_base.py) en el hilo del bucle.
+- Las señales se envían por el pool y se resuelven en segundo plano con
+  OrderManager (utils/order_manager.py), con sus límites de exposición.
+- iqoptionapi comparte entre hilos el estado de respuesta de get_candles y buy,
+  así que por defecto MarketData y OrderManager hacen esas llamadas de una en una
+  (`thread_safe_api=False`, como utils/history_downloader.py); el pool sigue
+  solapando el resto (stream, saldo, resultados) con la evaluación.
+
+La latencia de decisión es el tiempo desde que despierta el reloj hasta que se han
+evaluado todos los pares y enviado las compras al pool; la de órdenes, hasta que el
+broker ha confirmado todas las compras de la vela (con compras serializadas crece
+con el número de señales). `stats()` da media / p95 / máximo de ambas.
+La comprobación con 30 pares sobre la API simulada está en benchmark_async_runtime.py.
+"""
+import asyncio
+import functools
+import importlib
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from utils.backtest_engine import normalize_signal
+from utils.candle_buffer import Bar
+from utils.candle_clock import CandleClock
+from utils.history_downloader import MAX_CANDLES_PER_REQUEST
+from utils.logger import setup_logger
+from utils.lookback import strategy_lookback
+from utils.market_data import MarketData
+from utils.order_manager import OrderManager, Position
+from utils.strategy_base import Strategy, load_strategy
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+logger = setup_logger()
+
+DEFAULT_API_WORKERS = 8
+LATENCY_SAMPLES = 500
+STATS_EVERY = 60  # velas entre resúmenes
+
+
+class AsyncAPI:
+    """Llamadas bloqueantes de la API en un pool de hilos acotado."""
+
+    def __init__(self, api, max_workers: int = DEFAULT_API_WORKERS):
+        self.api = api
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iqapi")
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Ejecuta `func(*args, **kwargs)` en el pool sin bloquear el bucle."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class AsyncTradingRuntime:
+    """Evalúa `strategy_keys` en todos los `pairs` en cada cierre de vela."""
+
+    def __init__(
+        self,
+        api,
+        pairs: Sequence[str],
+        strategy_keys: Sequence[str],
+        amount: float,
+        duration: int,
+        candle_duration: int = 60,
+        dtype=np.float64,
+        orders: Optional[OrderManager] = None,
+        clock: Optional[CandleClock] = None,
+        max_workers: int = DEFAULT_API_WORKERS,
+        stop_win: Optional[float] = None,
+        stop_loss: Optional[float] = None,
+        end_hour: Optional[int] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        thread_safe_api: bool = False,
+    ):
+        """
+        Args:
+            api: conexión de IQ_Option (o FakeIQOption) compartida por todos los pares.
+            pairs / strategy_keys: pares y claves de AVAILABLE_STRATEGIES a combinar.
+            amount, duration: importe y vencimiento (minutos) de cada operación.
+            orders: OrderManager con los límites de exposición (por defecto, uno nuevo).
+            clock: CandleClock (por defecto, con la hora del servidor de `api`).
+            stop_win / stop_loss: saldo (contando lo que hay en juego) al que se para.
+            end_hour: hora local a partir de la que se para.
+            sleep: espera asíncrona del reloj (inyectable para la simulación).
+            thread_safe_api: True solo si la API admite get_candles y buy concurrentes
+                (p. ej. la simulada); se aplica al OrderManager por defecto y a MarketData.
+        """
+        self.api = api
+        self.calls = AsyncAPI(api, max_workers)
+        self.pairs = list(pairs)
+        self.strategy_keys = list(strategy_keys)
+        self.amount = amount
+        self.duration = duration
+        self.candle_duration = candle_duration
+        self.dtype = dtype
+        self.clock = clock or CandleClock(candle_duration, server_time=api.get_server_timestamp)
+        self.orders = orders or OrderManager(api, thread_safe_api=thread_safe_api)
+        self.stop_win = stop_win
+        self.stop_loss = stop_loss
+        self.end_hour = end_hour
+        self.sleep = sleep
+
+        modules = [importlib.import_module(AVAILABLE_STRATEGIES[key]["module"]) for key in self.strategy_keys]
+        lookbacks = [strategy_lookback(module, candle_duration) for module in modules]
+        self.num_candles = min(max(lookbacks), MAX_CANDLES_PER_REQUEST)
+        self.market = MarketData(api, self.num_candles, duration=candle_duration, dtype=dtype,
+                                 close_grace=self.clock.offset, clock=self.clock.now,
+                                 thread_safe_api=thread_safe_api)
+        self.strategies: Dict[str, List[Tuple[str, Strategy]]] = {}
+        self.owners: Dict[Position, Strategy] = {}
+        self.last_order_time: Dict[Tuple[str, str], float] = {}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.order_latencies = deque(maxlen=LATENCY_SAMPLES)  # solo velas con compras
+        self.running = False
+
+    # ----------------- Arranque -----------------
+    async def start(self):
+        """Carga el histórico de todos los pares y calienta las estrategias.
+
+        Las suscripciones van por el pool, pero MarketData serializa get_candles salvo
+        con `thread_safe_api=True`.
+        """
+        buffers = await asyncio.gather(*(self.calls.call(self.market.subscribe, pair) for pair in self.pairs))
+        for pair, buffer in zip(self.pairs, buffers):
+            history = buffer.to_frame() if len(buffer) else None
+            strategies = []
+            for key in self.strategy_keys:
+                strategy = load_strategy(key, history=self.num_candles, base_duration=self.candle_duration, dtype=self.dtype)
+                if history is not None:
+                    strategy.warmup(history)
+                strategies.append((key, strategy))
+            self.strategies[pair] = strategies
+        logger.info(f"🚀 Runtime asyncio: {len(self.pairs)} pares × {len(self.strategy_keys)} estrategias "
+                    f"({self.num_candles} velas por par)")
+
+    # ----------------- Bucle -----------------
+    async def run(self, max_candles: Optional[int] = None):
+        """Un ciclo por cierre de vela hasta un stop, la hora límite o `max_candles` velas."""
+        await self.start()
+        self.running = True
+        candles = 0
+        try:
+            while self.running and (max_candles is None or candles < max_candles):
+                tick = await self.clock.wait_async(self.sleep)
+                if not await self.on_tick(tick):
+                    break
+                candles += 1
+                if candles % STATS_EVERY == 0:
+                    self.log_stats()
+        finally:
+            self.running = False
+            self.log_stats()
+
+    def stop(self):
+        self.running = False
+
+    async def on_tick(self, tick) -> bool:
+        """Evalúa la vela recién cerrada en todos los pares. Devuelve False si hay que parar."""
+        start = time.perf_counter()
+        for position in self.orders.settled():
+            owner = self.owners.pop(position, None)
+            if owner is not None:
+                owner.on_trade_result(position.trade())
+
+        # Hora de la vela según el reloj del servidor (en vivo, la misma que datetime.now())
+        current_hour = datetime.fromtimestamp(tick.target).hour
+        if not await self._within_limits(current_hour):
+            return False
+
+        events = await self.calls.call(self.market.poll)
+        closed: Dict[str, List[Bar]] = {}
+        for pair, bar in events:
+            closed.setdefault(pair, []).append(bar)
+
+        purchases = []
+        for pair, bars in closed.items():
+            for key, strategy in self.strategies[pair]:
+                signal = self._evaluate(pair, key, strategy, bars, current_hour)
+                if signal is not None:
+                    purchases.append(asyncio.ensure_future(self._open(pair, key, strategy, *signal)))
+            await asyncio.sleep(0)  # deja avanzar las compras ya enviadas entre par y par
+        await self._settle_purchases(start, purchases)
+        return True
+
+    async def _settle_purchases(self, start: float, purchases: List[asyncio.Future]):
+        """Registra la latencia de decisión y espera a que el broker confirme las compras."""
+        self.latencies.append(time.perf_counter() - start)
+        if purchases:
+            await asyncio.gather(*purchases)
+            self.order_latencies.append(time.perf_counter() - start)
+
+    async def _within_limits(self, current_hour: int) -> bool:
+        if self.end_hour is not None and current_hour >= self.end_hour:
+            logger.info("🕒 Hora límite alcanzada. Cerrando runtime...")
+            return False
+        if self.stop_win is None and self.stop_loss is None:
+            return True
+        balance = await self.calls.call(self.api.get_balance) + self.orders.exposure
+        if self.stop_win is not None and balance >= self.stop_win:
+            logger.info(f"🏁 Stop Win alcanzado ({balance} >= {self.stop_win}). Cerrando runtime...")
+            return False
+        if self.stop_loss is not None and balance <= self.stop_loss:
+            logger.info(f"🏳️ Stop Loss alcanzado ({balance} <= {self.stop_loss}). Cerrando runtime...")
+            return False
+        return True
+
+    def _evaluate(self, pair: str, key: str, strategy: Strategy, bars: List[Bar], current_hour: int) -> Optional[Tuple[str, Any]]:
+        """Incorpora las velas y devuelve (dirección, last_signal) si hay que operar."""
+        if not strategy.ready:
+            # Solo velas cerradas: el buffer ya trae la vela en curso, posterior a `bars`
+            history = self.market.buffer(pair).to_frame()
+            strategy.warmup(history[history["from"] < bars[0].time])
+        for bar in bars[:-1]:
+            strategy.update(bar)
+        try:
+            signal = strategy.on_candle(bars[-1], current_hour=current_hour)
+        except Exception as e:
+            logger.error(f"❌ Error en la estrategia {key} ({pair}): {e}")
+            return None
+        direction, value = normalize_signal(signal)
+        if direction is None:
+            return None
+        # Evitar spam de entradas repetidas
+        last_order = self.last_order_time.get((pair, key), 0)
+        if value == strategy.last_signal and time.time() - last_order < self.candle_duration + 10:
+            logger.debug(f"🚫 Señal repetida recientemente en {pair} ({key}).")
+            return None
+        logger.info(f"📊 Señal detectada en {pair} ({key}): {direction.upper()}")
+        return direction, value
+
+    async def _open(self, pair: str, key: str, strategy: Strategy, direction: str, value: Any):
+        try:
+            position = await self.calls.call(self.orders.open, pair, direction, self.amount, self.duration, signal=value)
+        except Exception as e:
+            logger.error(f"⚠️ Error al ejecutar orden en {pair}: {e}")
+            return
+        if position:
+            self.last_order_time[(pair, key)] = time.time()
+            self.owners[position] = strategy
+            strategy.on_order_opened({"signal": value, "entry_time": position.entry_time})
+
+    # ----------------- Cierre y métricas -----------------
+    def close(self, wait_orders: bool = True):
+        """Cierra streams, resuelve (o abandona) las operaciones abiertas y libera el pool."""
+        self.orders.close(wait=wait_orders)
+        self.market.close()
+        self.calls.close()
+
+    def stats(self) -> Dict[str, float]:
+        """Latencias de decisión y de órdenes por vela (ms) y métricas del reloj."""
+        latencies = np.array(self.latencies) * 1e3
+        orders = np.array(self.order_latencies) * 1e3
+        return {
+            "candles": len(latencies),
+            "latency_mean_ms": float(latencies.mean()) if len(latencies) else 0.0,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            "latency_max_ms": float(latencies.max()) if len(latencies) else 0.0,
+            "orders_mean_ms": float(orders.mean()) if len(orders) else 0.0,
+            "orders_p95_ms": float(np.percentile(orders, 95)) if len(orders) else 0.0,
+            "orders_max_ms": float(orders.max()) if len(orders) else 0.0,
+            **{f"clock_{k}": v for k, v in self.clock.stats().items()},
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"⏱️ Runtime: {s['candles']} velas × {len(self.pairs)} pares | latencia de decisión media "
+            f"{s['latency_mean_ms']:.1f}ms, p95 {s['latency_p95_ms']:.1f}ms, máx {s['latency_max_ms']:.1f}ms | "
+            f"órdenes confirmadas p95 {s['orders_p95_ms']:.1f}ms | "
+            f"{s['clock_missed']} cierres perdidos | {self.orders.open_count} operaciones abiertas"
+        )
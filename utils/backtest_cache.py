@@ -0,0 +1,184 @@
+# utils/backtest_cache.py
+"""
+Caché en disco de resultados de backtest, direccionada por contenido.
+
+La clave combina:
+    - la huella de las velas (timestamps y OHLC),
+    - el código fuente de la estrategia y de todos los módulos del repo que usa,
+      directa o indirectamente (más los del motor de backtest),
+    - los parámetros (settings y el <modulo>_config.json de la estrategia).
+
+Si cualquiera cambia, la clave cambia y el resultado se recalcula; no hace falta
+invalidar nada a mano. Cada entrada es un pickle; al leerla se actualiza su fecha
+de modificación y, cuando la caché supera `max_bytes`, se borran las entradas
+usadas hace más tiempo (LRU).
+"""
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import pickle
+import sys
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".backtest_cache"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+ENTRY_EXTENSION = ".pkl"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que intervienen en cualquier backtest, además de la estrategia
+ENGINE_MODULES = ("utils.backtest_engine", "utils.vectorized", "utils.outcomes", "utils.session_simulator")
+
+_MISSING = object()
+
+
+def _digest(*chunks: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Huella de las velas: índice de tiempo y columnas OHLC."""
+    times = pd.DatetimeIndex(df.index).asi8 if isinstance(df.index, pd.DatetimeIndex) else df['from'].to_numpy(dtype=np.int64)
+    ohlc = df[['open', 'high', 'low', 'close']].to_numpy(dtype=np.float64)
+    return _digest(np.ascontiguousarray(times).tobytes(), np.ascontiguousarray(ohlc).tobytes())
+
+
+def _repo_module(obj: Any) -> Optional[ModuleType]:
+    """Módulo del repo al que pertenece `obj` (None si es de terceros o de la stdlib)."""
+    module = obj if isinstance(obj, ModuleType) else sys.modules.get(getattr(obj, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    if path and os.path.abspath(path).startswith(PROJECT_ROOT + os.sep):
+        return module
+    return None
+
+
+def strategy_modules(module: ModuleType) -> list:
+    """
+    La estrategia, los del motor de backtest y todos los módulos del repo que
+    importan, siguiendo las importaciones de cada uno (cierre transitivo).
+    """
+    found = {module.__name__: module}
+    for name in ENGINE_MODULES:
+        found.setdefault(name, importlib.import_module(name))
+    pending = list(found.values())
+    while pending:
+        current = pending.pop()
+        if hasattr(current, '__path__'):
+            continue  # los atributos de un paquete son los submódulos que se hayan importado en el proceso
+        for value in vars(current).values():
+            dependency = _repo_module(value)
+            if dependency is not None and dependency.__name__ not in found:
+                found[dependency.__name__] = dependency
+                pending.append(dependency)
+    return [found[name] for name in sorted(found)]
+
+
+def source_fingerprint(modules: Iterable[ModuleType]) -> str:
+    """Huella del código fuente de los módulos indicados."""
+    chunks = []
+    for module in modules:
+        chunks.append(module.__name__.encode())
+        chunks.append(inspect.getsource(module).encode())
+    return _digest(*chunks)
+
+
+def strategy_config(module: ModuleType) -> Optional[dict]:
+    """Contenido del <modulo>_config.json de la estrategia, si existe (estrategias BOT)."""
+    config_path = os.path.splitext(module.__file__)[0] + "_config.json"
+    if not os.path.exists(config_path):
+        return None
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def params_fingerprint(params: Dict[str, Any]) -> str:
+    return _digest(json.dumps(params, sort_keys=True, default=str).encode())
+
+
+def backtest_key(df: pd.DataFrame, module: ModuleType, params: Optional[Dict[str, Any]] = None) -> str:
+    """Clave de caché de un backtest de `module` sobre `df` con `params`."""
+    params = {**(params or {}), "strategy_config": strategy_config(module)}
+    return _digest(
+        dataset_fingerprint(df).encode(),
+        source_fingerprint(strategy_modules(module)).encode(),
+        params_fingerprint(params).encode(),
+    )
+
+
+class BacktestCache:
+    """Caché LRU en disco acotada por tamaño. Segura entre procesos (escrituras atómicas)."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_EXTENSION)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)  # marca la entrada como usada recientemente
+            return value
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def put(self, key: str, value: Any):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> tuple:
+        """
+        Devuelve (valor, hit). Si la clave no está en caché ejecuta `compute` y guarda
+        el resultado.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value, True
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def evict(self):
+        """Borra las entradas menos usadas hasta quedar por debajo de `max_bytes`."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(ENTRY_EXTENSION):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # otro proceso ya la borró
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_EXTENSION):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,163 @@
+# utils/backtest_engine.py
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from utils.cross_section import PRICE_COLUMNS
+from utils.helpers import signal_to_direction
+from utils.strategy_base import Strategy
+
+# Número de velas que se entregan a la estrategia en cada paso.
+# Debe cubrir el mayor requisito de la estrategia (len(df) < N, tail(N), iloc[-N]).
+# Las estrategias actuales piden como máximo 200 filas (EMA_PERIOD de los BOT).
+DEFAULT_LOOKBACK = 300
+
+# Índice inicial del backtest (mismo valor que usaba el bucle original).
+DEFAULT_START = 60
+
+
+def normalize_signal(signal: Any) -> Tuple[Optional[str], Any]:
+    """
+    Unifica las dos formas de señal que devuelven las estrategias.
+
+    - Estrategias antiguas: "BUY" / "SELL" (str).
+    - Estrategias BOT: dict con la clave "direction" ("call" / "put").
+
+    Returns:
+        tuple: (dirección "call"/"put" o None, valor a pasar como last_signal).
+    """
+    if not signal:
+        return None, None
+    if isinstance(signal, str):
+        return signal_to_direction(signal), signal
+    direction = signal.get("direction")
+    return direction, direction
+
+
+def iter_signals(
+    strategy_func: Union[Callable, Strategy],
+    df_with_indicators: pd.DataFrame,
+    start: int = DEFAULT_START,
+    stop: Optional[int] = None,
+    lookback: int = DEFAULT_LOOKBACK,
+) -> Iterator[Tuple[int, Any, str]]:
+    """
+    Recorre el histórico vela a vela sin recalcular indicadores.
+
+    Los indicadores se calculan una sola vez sobre todo el histórico (add_indicators
+    de la estrategia). En cada paso la estrategia ve solo las últimas `lookback`
+    velas, así que el coste por vela no crece con el histórico:
+
+    - Strategy con `columnar` (modo transversal, utils/strategy_base.py): vistas de
+      los arrays de precios e indicadores precalculados, con `evaluate_columns`,
+      como en vivo. No se construye ningún DataFrame por vela.
+    - Resto (funciones y estrategias con TIMEFRAMES): un `df.iloc` de la ventana y la
+      función completa, que hace su propio DataFrame por vela (del orden de ms).
+
+    Como add_indicators solo calcula las columnas que faltan, la estrategia reutiliza
+    los valores precalculados y obtiene exactamente el mismo resultado que con el
+    prefijo completo.
+
+    `strategy_func` puede ser una función `(df, last_signal, current_hour)` o una
+    Strategy, cuyo last_signal se actualiza con cada señal.
+
+    Yields:
+        tuple: (posición de la vela, señal original, dirección "call"/"put").
+    """
+    df = df_with_indicators
+    index = df.index
+    stop = len(df) - 1 if stop is None else min(stop, len(df) - 1)
+    hours = index.hour.to_numpy()
+    strategy = strategy_func if isinstance(strategy_func, Strategy) else None
+    last_signal = None
+    if strategy is not None:
+        strategy.last_signal = None
+    columns = None
+    if strategy is not None and strategy.columnar:
+        # Las mismas columnas que Strategy.columns() en vivo (precios e INDICATORS)
+        names = list(PRICE_COLUMNS) + strategy.streaming_indicators.columns
+        columns = {c: df[c].to_numpy(dtype=np.float64) for c in names}
+
+    for i in range(start, stop):
+        first = max(0, i + 1 - lookback)
+        current_hour = int(hours[i])
+        if columns is not None:
+            window = {c: values[first:i + 1] for c, values in columns.items()}
+            signal = strategy.evaluate_columns(window, current_hour=current_hour)
+        elif strategy is not None:
+            signal = strategy.evaluate(df.iloc[first:i + 1], current_hour=current_hour)
+        else:
+            signal = strategy_func(df.iloc[first:i + 1], last_signal, current_hour=current_hour)
+
+        direction, signal_state = normalize_signal(signal)
+        if not direction:
+            continue
+
+        yield i, signal, direction
+        last_signal = signal_state  # ✅ Evita señales duplicadas consecutivas
+        if strategy is not None:
+            strategy.last_signal = signal_state
+
+
+def run_incremental(
+    strategy_func: Union[Callable, Strategy],
+    df_with_indicators: pd.DataFrame,
+    start: int = DEFAULT_START,
+    lookback: int = DEFAULT_LOOKBACK,
+) -> List[dict]:
+    """Ejecuta la estrategia vela a vela y devuelve la lista de señales del backtest."""
+    close = df_with_indicators['close'].to_numpy()
+    index = df_with_indicators.index
+    return [
+        {
+            'time': index[i],
+            'signal': direction.upper(),
+            'price': close[i],
+            'position': i,
+            'raw': signal,
+        }
+        for i, signal, direction in iter_signals(strategy_func, df_with_indicators, start=start, lookback=lookback)
+    ]
+
+
+def run_vectorized(
+    vectorized_func: Callable,
+    df_with_indicators: pd.DataFrame,
+    start: int = DEFAULT_START,
+    **options: Any,
+) -> List[dict]:
+    """
+    Ejecuta el modo vectorizado de una estrategia y devuelve la misma lista de
+    señales que run_incremental (mismo rango de velas: de `start` a la penúltima).
+    `options` se pasa tal cual a la función vectorizada.
+    """
+    df = df_with_indicators
+    frame = vectorized_func(df, start=start, stop=len(df) - 1, **options)
+    close = df['close'].to_numpy()
+    index = df.index
+    extra_columns = [c for c in frame.columns if c not in ('signal', 'direction')]
+
+    signals = []
+    for i in np.flatnonzero(frame['signal'].to_numpy()):
+        row = frame.iloc[i]
+        signals.append({
+            'time': index[i],
+            'signal': row['direction'].upper(),
+            'price': close[i],
+            'position': int(i),
+            'raw': {'direction': row['direction'], **{c: row[c] for c in extra_columns}},
+        })
+    return signals
+
+
+def compare_signals(expected: List[dict], actual: List[dict]) -> List[str]:
+    """Compara dos listas de señales (tiempo, dirección, precio) y describe las diferencias."""
+    def key(s):
+        return s['time'], s['signal'], s['price']
+
+    expected_keys = [key(s) for s in expected]
+    actual_keys = [key(s) for s in actual]
+    expected_set, actual_set = set(expected_keys), set(actual_keys)
+    missing = [k for k in expected_keys if k not in actual_set]
+    extra = [k for k in actual_keys if k not in expected_set]
+    return [f"falta {k}" for k in missing] + [f"sobra {k}" for k in extra]
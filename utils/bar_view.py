@@ -0,0 +1,110 @@
+# utils/bar_view.py
+"""
+Acceso rápido a las últimas filas de un DataFrame en las estrategias vela a vela.
+
+`df.iloc[-1]` construye una Series en cada llamada y cada `last['col']` pasa por el
+índice de pandas (decenas de microsegundos por acceso con pandas 3). `last_bars`
+convierte el DataFrame a un array float64 una sola vez y devuelve vistas con
+__slots__ cuyos valores son floats de Python:
+
+    prev, last = last_bars(df)
+    if last['close'] > prev['close'] and last.get('atr', 0) > 0: ...
+
+Admiten `bar['col']`, `bar.get('col', default)` y `bar.col`, igual que una Series.
+Las columnas de fechas se convierten a nanosegundos (las estrategias no las leen).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Posición de cada columna, por tupla de columnas (se repiten en cada vuelta)
+_POSITIONS: Dict[Tuple[str, ...], Dict[str, int]] = {}
+
+
+class BarView:
+    """Una fila del DataFrame: valores en una lista y posiciones compartidas."""
+
+    __slots__ = ("_values", "_positions")
+
+    def __init__(self, values: List[Any], positions: Dict[str, int]):
+        self._values = values
+        self._positions = positions
+
+    def __getitem__(self, column: str) -> Any:
+        return self._values[self._positions[column]]
+
+    def __getattr__(self, column: str) -> Any:
+        if column.startswith("_"):  # slots sin inicializar (copy/pickle)
+            raise AttributeError(column)
+        try:
+            return self._values[self._positions[column]]
+        except KeyError:
+            raise AttributeError(column) from None
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._positions
+
+    def get(self, column: str, default: Any = None) -> Any:
+        position = self._positions.get(column)
+        return default if position is None else self._values[position]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {column: self._values[i] for column, i in self._positions.items()}
+
+    def __repr__(self) -> str:
+        return f"BarView({self.to_dict()})"
+
+
+def _positions(df: pd.DataFrame) -> Dict[str, int]:
+    columns = tuple(df.columns.tolist())
+    positions = _POSITIONS.get(columns)
+    if positions is None:
+        positions = _POSITIONS[columns] = {column: i for i, column in enumerate(columns)}
+    return positions
+
+
+def _tail_values(df: pd.DataFrame, n: Optional[int]) -> np.ndarray:
+    """Últimas `n` filas (todas si n es None) como un único array 2-D."""
+    try:
+        values = df.to_numpy(dtype=np.float64, copy=False)
+    except (TypeError, ValueError):  # columnas de texto u objetos
+        return (df if n is None else df.iloc[-n:]).to_numpy(dtype=object)
+    return values if n is None else values[-n:]
+
+
+def last_bars(df: pd.DataFrame, n: int = 2) -> List[BarView]:
+    """Las últimas `n` filas de `df` (la más antigua primero) como BarView."""
+    positions = _positions(df)
+    return [BarView(row, positions) for row in _tail_values(df, n).tolist()]
+
+
+def column_arrays(df: pd.DataFrame, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Columnas de las últimas `n` filas como arrays (vistas de una sola conversión)."""
+    values = _tail_values(df, n)
+    return {column: values[:, i] for column, i in _positions(df).items()}
+
+
+class SeriesBars:
+    """
+    Versión con pandas de last_bars (cada fila es un `df.iloc[i]` construido al
+    pedirla, como antes); referencia para benchmark_strategies.py.
+    """
+
+    def __init__(self, df: pd.DataFrame, n: int = 2):
+        self.df = df
+        self.n = min(n, len(df))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.n))]
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        return self.df.iloc[i - self.n]
+
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
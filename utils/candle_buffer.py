@@ -0,0 +1,160 @@
+# utils/candle_buffer.py
+"""
+Buffer circular de velas para el bucle en vivo.
+
+Guarda las últimas `capacity` velas como arrays de NumPy de tamaño fijo (precios en
+float64 o float32) en lugar de construir un DataFrame nuevo en cada vuelta:
+
+- Cada valor se escribe dos veces (posición i y i + capacity), así las últimas N
+  velas siempre son un tramo contiguo del array y `array('close', n)` devuelve una
+  vista sin copiar.
+- `refresh` solo pide a la API las velas posteriores a la última guardada (más la
+  vela en curso, que se sobrescribe mientras no cierra).
+- `last`, `prev` y `bars(n)` devuelven objetos `Bar` con __slots__ para leer velas
+  sueltas sin Series de pandas; `to_frame` crea el DataFrame solo cuando hace falta.
+"""
+import time
+from typing import Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+API_RENAMES = {"max": "high", "min": "low"}
+
+
+class Bar:
+    """Vela individual (sin diccionario de atributos)."""
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, time: int, open: float, high: float, low: float, close: float, volume: float):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __repr__(self) -> str:
+        return f"Bar(time={self.time}, open={self.open}, high={self.high}, low={self.low}, close={self.close}, volume={self.volume})"
+
+
+class CandleBuffer:
+    """Últimas `capacity` velas de un par en arrays contiguos."""
+
+    def __init__(self, capacity: int, dtype=np.float64, duration: int = 60):
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.duration = duration
+        self.times = np.zeros(2 * capacity, dtype=np.int64)
+        self.columns = {c: np.zeros(2 * capacity, dtype=self.dtype) for c in PRICE_COLUMNS}
+        self.size = 0
+        self.head = 0  # posición de la próxima vela
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return int(self.times[self.head - 1 + self.capacity]) if self.size else None
+
+    # ----------------- Escritura -----------------
+    def _write(self, slot: int, time: int, values: tuple):
+        for position in (slot, slot + self.capacity):
+            self.times[position] = time
+            for column, value in zip(PRICE_COLUMNS, values):
+                self.columns[column][position] = value
+
+    def append(self, time: int, open: float, high: float, low: float, close: float, volume: float = 0.0):
+        """
+        Añade una vela. Si tiene el mismo timestamp que la última la sustituye (vela en
+        curso); si es anterior se ignora.
+        """
+        values = (open, high, low, close, volume)
+        last = self.last_time
+        if last is not None and time < last:
+            return
+        if last is not None and time == last:
+            self._write((self.head - 1) % self.capacity, time, values)
+            return
+        self._write(self.head, time, values)
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def load_frame(self, df: pd.DataFrame):
+        """Sustituye el contenido por las últimas `capacity` velas de un DataFrame (de una vez)."""
+        df = df.tail(self.capacity)
+        n = len(df)
+        if 'from' in df.columns:
+            times = df['from'].to_numpy(dtype=np.int64)
+        else:
+            index = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.DatetimeIndex(df['time'])
+            times = index.asi8 // 10**9
+        for start in (0, self.capacity):
+            self.times[start:start + n] = times
+            for column in PRICE_COLUMNS:
+                self.columns[column][start:start + n] = df[column].to_numpy() if column in df.columns else 0.0
+        self.size = n
+        self.head = n % self.capacity
+
+    def extend(self, candles: Iterable[dict]):
+        """Añade velas con el formato de get_candles (claves 'from', 'max', 'min'...)."""
+        for candle in sorted(candles, key=lambda c: c["from"]):
+            c = {API_RENAMES.get(k, k): v for k, v in candle.items()}
+            self.append(int(c["from"]), c["open"], c["high"], c["low"], c["close"], c.get("volume", 0.0))
+
+    def refresh(self, api, pair: str, count: Optional[int] = None) -> int:
+        """
+        Pide a la API solo las velas que faltan desde la última guardada (todas si el
+        buffer está vacío). Devuelve el número de velas recibidas.
+        """
+        now = time.time()
+        if count is None:
+            if self.size == 0:
+                count = self.capacity
+            else:
+                missing = int(now - self.last_time) // self.duration + 1
+                count = min(max(missing, 1), self.capacity)
+        candles = api.get_candles(pair, self.duration, count, now) or []
+        self.extend(candles)
+        return len(candles)
+
+    # ----------------- Lectura -----------------
+    def _span(self, n: Optional[int]) -> slice:
+        n = self.size if n is None else min(n, self.size)
+        end = self.head + self.capacity
+        return slice(end - n, end)
+
+    def array(self, column: str, n: Optional[int] = None) -> np.ndarray:
+        """Vista contigua (sin copia) de las últimas `n` velas de una columna."""
+        if column == "from":
+            return self.times[self._span(n)]
+        return self.columns[column][self._span(n)]
+
+    def bar(self, offset: int = -1) -> Bar:
+        """Vela en la posición `offset` contando desde el final (-1 = última)."""
+        if not -self.size <= offset < 0:
+            raise IndexError("offset fuera del buffer")
+        position = self.head + self.capacity + offset
+        return Bar(int(self.times[position]), *(float(self.columns[c][position]) for c in PRICE_COLUMNS))
+
+    @property
+    def last(self) -> Bar:
+        return self.bar(-1)
+
+    @property
+    def prev(self) -> Bar:
+        return self.bar(-2)
+
+    def bars(self, n: Optional[int] = None) -> List[Bar]:
+        span = self._span(n)
+        times = self.times[span].tolist()
+        columns = [self.columns[c][span].tolist() for c in PRICE_COLUMNS]
+        return [Bar(t, *values) for t, *values in zip(times, *columns)]
+
+    def to_frame(self, n: Optional[int] = None) -> pd.DataFrame:
+        """DataFrame con el formato de get_candle_dataframe (para las estrategias con DataFrame)."""
+        span = self._span(n)
+        df = pd.DataFrame({"from": self.times[span], **{c: self.columns[c][span] for c in PRICE_COLUMNS}})
+        df["time"] = pd.to_datetime(df["from"], unit="s")
+        return df
@@ -0,0 +1,176 @@
+# utils/candle_clock.py
+"""
+Planificador alineado al cierre de las velas.
+
+El bucle en vivo terminaba con `time.sleep(CANDLE_DURATION)` tras un trabajo de
+duración variable, así que la evaluación se iba desplazando respecto al cierre de
+la vela. `CandleClock` despierta `offset` segundos después de cada cierre según la
+hora del servidor del broker:
+
+    clock = CandleClock(60, offset=0.3, server_time=API.get_server_timestamp)
+    while True:
+        tick = clock.wait()        # duerme hasta el próximo cierre + offset
+        ...                        # decidir sobre la vela tick.boundary - 60
+    clock.stats()                  # retraso medio / p95 / máximo y cierres perdidos
+
+- La hora del servidor llega con el último mensaje de sincronización del websocket,
+  siempre algo atrasada; la diferencia con el reloj local se estima con el máximo de
+  las últimas muestras y se duerme con el reloj local.
+- `Tick.lateness` es lo que se despertó tarde respecto al objetivo (el jitter).
+- Si el trabajo de una vuelta se come uno o más cierres, `Tick.missed` dice cuántos
+  y se avisa en el log: se salta al siguiente cierre en lugar de acumular retraso.
+- `wait_async` hace lo mismo dentro de asyncio (utils/async_runtime.py).
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import numpy as np
+
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_OFFSET = 0.3       # segundos tras el cierre de la vela
+SKEW_SAMPLES = 30          # muestras de la diferencia servidor - local que se guardan
+JITTER_SAMPLES = 500       # retrasos que se guardan para las estadísticas
+LATE_TOLERANCE = 0.25      # segundos de retraso a partir de los que un despertar cuenta como tarde
+
+
+class Tick:
+    """Un despertar del planificador."""
+
+    __slots__ = ("boundary", "target", "woke_at", "lateness", "missed")
+
+    def __init__(self, boundary: int, target: float, woke_at: float, missed: int):
+        self.boundary = boundary    # cierre de vela (hora del servidor, múltiplo de la duración)
+        self.target = target        # boundary + offset
+        self.woke_at = woke_at      # hora del servidor estimada al despertar
+        self.lateness = woke_at - target
+        self.missed = missed        # cierres saltados desde el despertar anterior
+
+    def __repr__(self) -> str:
+        return f"Tick(boundary={self.boundary}, lateness={self.lateness * 1e3:.1f}ms, missed={self.missed})"
+
+
+class CandleClock:
+    """Despierta `offset` segundos después de cada cierre de vela (hora del servidor)."""
+
+    def __init__(
+        self,
+        duration: int = 60,
+        offset: float = DEFAULT_OFFSET,
+        server_time: Optional[Callable[[], float]] = None,
+        local_time: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        late_tolerance: float = LATE_TOLERANCE,
+    ):
+        """
+        Args:
+            duration: duración de la vela en segundos.
+            offset: segundos tras el cierre en los que se despierta.
+            server_time: hora del servidor (API.get_server_timestamp); sin ella, el reloj local.
+            local_time / sleep: reloj local y espera (inyectables para la simulación).
+        """
+        self.duration = duration
+        self.offset = offset
+        self.server_time = server_time
+        self.local_time = local_time
+        self.sleep = sleep
+        self.late_tolerance = late_tolerance
+        self.skews = deque(maxlen=SKEW_SAMPLES)
+        self.lateness = deque(maxlen=JITTER_SAMPLES)
+        self.last_boundary: Optional[int] = None
+        self.ticks = 0
+        self.missed = 0
+        self.late = 0
+
+    # ----------------- Reloj -----------------
+    def _sample_skew(self):
+        if self.server_time is None:
+            return
+        try:
+            server = self.server_time()
+        except Exception as e:
+            logger.debug(f"[clock] Sin hora del servidor: {e}")
+            return
+        if server:
+            self.skews.append(float(server) - self.local_time())
+
+    @property
+    def skew(self) -> float:
+        """Diferencia estimada servidor - local (la muestra menos atrasada)."""
+        return max(self.skews) if self.skews else 0.0
+
+    def now(self) -> float:
+        """Hora del servidor estimada."""
+        return self.local_time() + self.skew
+
+    def next_boundary(self, now: Optional[float] = None) -> int:
+        """Próximo cierre de vela cuyo objetivo (cierre + offset) aún no ha pasado."""
+        now = self.now() if now is None else now
+        return int((now - self.offset) // self.duration + 1) * self.duration
+
+    # ----------------- Espera -----------------
+    def _schedule(self) -> Tuple[int, float, int]:
+        """Próximo cierre, su objetivo y los cierres saltados desde el despertar anterior."""
+        self._sample_skew()
+        boundary = self.next_boundary()
+        missed = 0
+        if self.last_boundary is not None:
+            missed = max(0, (boundary - self.last_boundary) // self.duration - 1)
+            if missed:
+                self.missed += missed
+                logger.warning(f"⏱️ {missed} cierre(s) de vela perdido(s): la vuelta anterior tardó más de una vela")
+        return boundary, boundary + self.offset, missed
+
+    def _record(self, boundary: int, target: float, missed: int) -> Tick:
+        tick = Tick(boundary, target, self.now(), missed)
+        self.last_boundary = boundary
+        self.ticks += 1
+        self.lateness.append(tick.lateness)
+        if tick.lateness > self.late_tolerance:
+            self.late += 1
+            logger.warning(f"⏱️ Despertar tardío: {tick.lateness * 1e3:.0f}ms tras el objetivo")
+        return tick
+
+    def wait(self) -> Tick:
+        """Duerme hasta el próximo cierre + offset y devuelve el Tick."""
+        boundary, target, missed = self._schedule()
+        while True:
+            remaining = target - self.now()
+            if remaining <= 0:
+                break
+            self.sleep(remaining)
+        return self._record(boundary, target, missed)
+
+    async def wait_async(self, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep) -> Tick:
+        """Como `wait`, sin bloquear el bucle de asyncio."""
+        boundary, target, missed = self._schedule()
+        while True:
+            remaining = target - self.now()
+            if remaining <= 0:
+                break
+            await sleep(remaining)
+        return self._record(boundary, target, missed)
+
+    # ----------------- Métricas -----------------
+    def stats(self) -> Dict[str, float]:
+        """Retraso respecto al objetivo (ms) de los últimos despertares y cierres perdidos."""
+        lateness = np.array(self.lateness) * 1e3
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "late": self.late,
+            "mean_ms": float(lateness.mean()) if len(lateness) else 0.0,
+            "p95_ms": float(np.percentile(lateness, 95)) if len(lateness) else 0.0,
+            "max_ms": float(lateness.max()) if len(lateness) else 0.0,
+            "skew_s": self.skew,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"⏱️ Planificador: {s['ticks']} velas | retraso medio {s['mean_ms']:.1f}ms, p95 {s['p95_ms']:.1f}ms, "
+            f"máx {s['max_ms']:.1f}ms | {s['missed']} cierres perdidos, {s['late']} tardíos"
+        )
@@ -0,0 +1,190 @@
+# utils/candle_store.py
+"""
+Almacén columnar de velas históricas.
+
+Cada par/temporalidad tiene su propio directorio con una columna por archivo binario
+(float64/int64 sin cabecera) y un meta.json con el número de filas válidas:
+
+    historical_data/store/EURUSD-OTC_60s/
+        from.i8  open.f8  high.f8  low.f8  close.f8  volume.f8  meta.json
+
+Las velas se guardan ordenadas por timestamp ('from') y sin duplicados. Si las
+velas nuevas son posteriores a la última guardada se añaden al final de cada
+archivo (append puro); si se solapan o son anteriores (descargas hacia atrás)
+se fusionan y se reescribe el dataset. La lectura usa np.memmap, así que cargar
+un rango de fechas solo lee las páginas de ese rango.
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.path.join("historical_data", "store")
+
+TIME_COLUMN = "from"
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+DTYPES = {TIME_COLUMN: np.int64, **{c: np.float64 for c in PRICE_COLUMNS}}
+EXTENSIONS = {np.int64: "i8", np.float64: "f8"}
+META_FILE = "meta.json"
+
+# Nombres que usa la API de IQ Option para high/low
+API_RENAMES = {"max": "high", "min": "low"}
+
+
+def candles_to_arrays(candles: Union[pd.DataFrame, Iterable[dict]]) -> Dict[str, np.ndarray]:
+    """Convierte velas de la API (lista de dicts) o un DataFrame en columnas ordenadas y sin duplicados."""
+    df = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(list(candles))
+    df = df.rename(columns=API_RENAMES)
+    if TIME_COLUMN not in df.columns:
+        if isinstance(df.index, pd.DatetimeIndex):
+            df = df.assign(**{TIME_COLUMN: df.index.asi8 // 10**9})
+        else:
+            raise ValueError("Las velas deben incluir la columna 'from' (timestamp de apertura).")
+
+    arrays = {}
+    for column, dtype in DTYPES.items():
+        values = df[column].to_numpy() if column in df.columns else np.full(len(df), np.nan)
+        arrays[column] = np.ascontiguousarray(values, dtype=dtype)
+    return _sorted_unique(arrays)
+
+
+def _sorted_unique(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Ordena por 'from' y elimina duplicados conservando la última aparición."""
+    times = arrays[TIME_COLUMN]
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    keep = np.ones(len(times), dtype=bool)
+    keep[:-1] = times[1:] != times[:-1]
+    return {column: values[order][keep] for column, values in arrays.items()}
+
+
+class CandleStore:
+    """Dataset columnar por par/temporalidad con append incremental y lectura por memmap."""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    # ----------------- Rutas y metadatos -----------------
+    def dataset_dir(self, pair: str, duration: int) -> str:
+        return os.path.join(self.root, f"{pair}_{duration}s")
+
+    def _column_path(self, pair: str, duration: int, column: str) -> str:
+        extension = EXTENSIONS[DTYPES[column]]
+        return os.path.join(self.dataset_dir(pair, duration), f"{column}.{extension}")
+
+    def _read_meta(self, pair: str, duration: int) -> dict:
+        meta_path = os.path.join(self.dataset_dir(pair, duration), META_FILE)
+        if not os.path.exists(meta_path):
+            return {"count": 0}
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    def _write_meta(self, pair: str, duration: int, count: int, first: Optional[int], last: Optional[int]):
+        meta_path = os.path.join(self.dataset_dir(pair, duration), META_FILE)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pair": pair, "duration": duration, "count": count, "first": first, "last": last}, f, indent=4)
+        os.replace(tmp_path, meta_path)
+
+    def count(self, pair: str, duration: int) -> int:
+        """Número de velas guardadas."""
+        return self._read_meta(pair, duration)["count"]
+
+    def time_range(self, pair: str, duration: int) -> Optional[Tuple[int, int]]:
+        """(primer 'from', último 'from') guardados, o None si el dataset está vacío."""
+        meta = self._read_meta(pair, duration)
+        if not meta["count"]:
+            return None
+        return meta["first"], meta["last"]
+
+    # ----------------- Escritura -----------------
+    def append(self, pair: str, duration: int, candles: Union[pd.DataFrame, Iterable[dict]]) -> int:
+        """
+        Añade velas al dataset (deduplicadas por 'from'). Una vela ya guardada se
+        sustituye por la nueva versión. Devuelve el número de velas nuevas.
+        """
+        new = candles_to_arrays(candles)
+        if not len(new[TIME_COLUMN]):
+            return 0
+
+        with self._lock:
+            os.makedirs(self.dataset_dir(pair, duration), exist_ok=True)
+            count = self.count(pair, duration)
+            range_ = self.time_range(pair, duration)
+
+            # Caso habitual: velas posteriores a la última guardada → append puro
+            if range_ is None or new[TIME_COLUMN][0] > range_[1]:
+                for column, values in new.items():
+                    path = self._column_path(pair, duration, column)
+                    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                        f.seek(count * values.itemsize)
+                        f.truncate()  # descarta restos de una escritura interrumpida
+                        values.tofile(f)
+                first = new[TIME_COLUMN][0] if range_ is None else range_[0]
+                self._write_meta(pair, duration, count + len(new[TIME_COLUMN]), int(first), int(new[TIME_COLUMN][-1]))
+                return len(new[TIME_COLUMN])
+
+            # Solapamiento o velas antiguas → fusionar y reescribir
+            existing = {column: np.array(values) for column, values in self._open_arrays(pair, duration, count).items()}
+            merged = _sorted_unique({c: np.concatenate([existing[c], new[c]]) for c in DTYPES})
+            for column, values in merged.items():
+                path = self._column_path(pair, duration, column)
+                values.tofile(path + ".tmp")
+                os.replace(path + ".tmp", path)
+            times = merged[TIME_COLUMN]
+            self._write_meta(pair, duration, len(times), int(times[0]), int(times[-1]))
+            return len(times) - count
+
+    def import_csv(self, file_path: str, pair: str, duration: int) -> int:
+        """Importa un CSV antiguo de historical_data/ al almacén."""
+        df = pd.read_csv(file_path, index_col='time', parse_dates=True)
+        return self.append(pair, duration, df)
+
+    # ----------------- Lectura -----------------
+    def _open_arrays(self, pair: str, duration: int, count: int) -> Dict[str, np.ndarray]:
+        if not count:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in DTYPES.items()}
+        return {
+            column: np.memmap(self._column_path(pair, duration, column), dtype=dtype, mode="r", shape=(count,))
+            for column, dtype in DTYPES.items()
+        }
+
+    def load_arrays(
+        self,
+        pair: str,
+        duration: int,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        last_n: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Devuelve las columnas como vistas memmap (sin copiar) del rango pedido.
+
+        Args:
+            start, end: timestamps Unix (segundos) de la primera y última vela, inclusive.
+            last_n: si se indica, solo las últimas `last_n` velas del rango.
+        """
+        arrays = self._open_arrays(pair, duration, self.count(pair, duration))
+        times = arrays[TIME_COLUMN]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+        if last_n is not None:
+            lo = max(lo, hi - last_n)
+        return {column: values[lo:hi] for column, values in arrays.items()}
+
+    def load(
+        self,
+        pair: str,
+        duration: int,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        last_n: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Carga un rango como DataFrame indexado por 'time' (mismo formato que los CSV antiguos)."""
+        arrays = self.load_arrays(pair, duration, start, end, last_n)
+        df = pd.DataFrame({column: np.asarray(values) for column, values in arrays.items()})
+        df.index = pd.DatetimeIndex(pd.to_datetime(df[TIME_COLUMN], unit="s"), name="time")
+        return df
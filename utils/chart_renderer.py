@@ -0,0 +1,130 @@
+# utils/chart_renderer.py
+"""
+Gráficos de backtest con mplfinance.
+
+- mplfinance solo se importa al dibujar, así que el modo headless no lo necesita.
+- Los históricos largos se reducen a `max_candles` velas agregando OHLC por bloques
+  (apertura del primero, máximo, mínimo y cierre del último) antes de dibujar.
+- `render_chart_async` dibuja el PNG en un proceso aparte (backend Agg, sin
+  ventana) mientras el backtest sigue con lo demás.
+"""
+import math
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_CANDLES = 1500
+WARMUP_CANDLES = 59  # Velas iniciales sin indicadores fiables (igual que el backtest)
+
+INDICATOR_LINES = (
+    (('bb_high', 'bb_low'), dict(alpha=0.4)),
+    (('bb_upper', 'bb_lower'), dict(alpha=0.4)),
+    (('ema200',), dict(color='purple', width=1.0)),
+    (('ema20',), dict(color='orange', width=0.7)),
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def downsample_candles(df: pd.DataFrame, max_candles: int = DEFAULT_MAX_CANDLES) -> tuple:
+    """
+    Agrega bloques de velas consecutivas para que el gráfico no supere `max_candles`.
+
+    Returns:
+        tuple: (DataFrame reducido, tamaño del bloque).
+    """
+    factor = max(1, math.ceil(len(df) / max_candles))
+    if factor == 1:
+        return df, 1
+
+    groups = np.arange(len(df)) // factor
+    grouped = df.groupby(groups)
+    out = grouped.last()  # indicadores: último valor del bloque
+    out['open'] = grouped['open'].first()
+    out['high'] = grouped['high'].max()
+    out['low'] = grouped['low'].min()
+    if 'volume' in df.columns:
+        out['volume'] = grouped['volume'].sum()
+    out.index = df.index[::factor][:len(out)]
+    return out, factor
+
+
+def _signal_markers(df_plot: pd.DataFrame, signals: List[dict], offset: int, factor: int) -> tuple:
+    """Series de marcadores de compra/venta alineadas con df_plot."""
+    buy = np.full(len(df_plot), np.nan)
+    sell = np.full(len(df_plot), np.nan)
+    for s in signals:
+        pos = (s['position'] - offset) // factor
+        if not 0 <= pos < len(df_plot):
+            continue
+        if s['signal'] in ('CALL', 'BUY'):
+            buy[pos] = s['price'] * 0.99
+        elif s['signal'] in ('PUT', 'SELL'):
+            sell[pos] = s['price'] * 1.01
+    return pd.Series(buy, index=df_plot.index), pd.Series(sell, index=df_plot.index)
+
+
+def plot_kwargs(df: pd.DataFrame, signals: List[dict], title: str, max_candles: Optional[int] = DEFAULT_MAX_CANDLES) -> tuple:
+    """Prepara las velas reducidas y los argumentos de mpf.plot. Importa mplfinance."""
+    import mplfinance as mpf
+
+    df_plot = df.iloc[WARMUP_CANDLES:]
+    factor = 1
+    if max_candles:
+        df_plot, factor = downsample_candles(df_plot, max_candles)
+
+    add_plots = []
+    for columns, style in INDICATOR_LINES:
+        if set(columns).issubset(df_plot.columns):
+            add_plots.append(mpf.make_addplot(df_plot[list(columns)], **style))
+
+    buy_signal, sell_signal = _signal_markers(df_plot, signals, WARMUP_CANDLES, factor)
+    if not buy_signal.isnull().all():
+        add_plots.append(mpf.make_addplot(buy_signal, type='scatter', marker='^', color='g', markersize=100))
+    if not sell_signal.isnull().all():
+        add_plots.append(mpf.make_addplot(sell_signal, type='scatter', marker='v', color='r', markersize=100))
+
+    if factor > 1:
+        title = f"{title} (1 vela = {factor} velas)"
+    kwargs = dict(
+        type='candle',
+        style='yahoo',
+        title=title,
+        ylabel='Precio',
+        addplot=add_plots,
+        figsize=(15, 7),
+        datetime_format='%Y-%m-%d %H:%M',  # Formato explícito para fecha y hora
+        xrotation=45,                     # Rota las etiquetas para que no se solapen
+        show_nontrading=False,            # Oculta los huecos de tiempo sin datos (fines de semana)
+    )
+    return df_plot, kwargs
+
+
+def render_chart(df: pd.DataFrame, signals: List[dict], path: str, title: str, max_candles: Optional[int] = DEFAULT_MAX_CANDLES) -> str:
+    """Dibuja el gráfico en un PNG sin abrir ventanas. Devuelve la ruta."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import mplfinance as mpf
+
+    df_plot, kwargs = plot_kwargs(df, signals, title, max_candles)
+    mpf.plot(df_plot, savefig=dict(fname=path, dpi=100, bbox_inches='tight'), **kwargs)
+    return path
+
+
+def render_chart_async(df: pd.DataFrame, signals: List[dict], path: str, title: str, max_candles: Optional[int] = DEFAULT_MAX_CANDLES) -> Future:
+    """Encola el PNG en un proceso de fondo. Usa `wait_for_charts` antes de salir."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1)
+    columns = [c for c in df.columns if c in ('open', 'high', 'low', 'close', 'volume') or any(c in cols for cols, _ in INDICATOR_LINES)]
+    slim_signals = [{'position': s['position'], 'signal': s['signal'], 'price': s['price']} for s in signals]
+    return _executor.submit(render_chart, df[columns], slim_signals, path, title, max_candles)
+
+
+def wait_for_charts():
+    """Espera a que terminen los gráficos pendientes y libera el proceso de fondo."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -9,6 +9,7 @@ CONFIG_FILENAME = "self_adjusting_v1_config.json"
 CONFIG_PATH = os.path.join(STRATEGY_DIR, CONFIG_FILENAME)
 VERSIONS_DIR = os.path.join(STRATEGY_DIR, "config_versions")
 SETTINGS_FILE = "settings.json"
+CURRENCIES_FILE = "currencies.txt"
 ENV_FILE = ".env"
 
 def get_settings():
@@ -24,8 +25,19 @@ def get_settings():
         "DURATION": 1,
         "STOP_WIN": 10,
         "STOP_LOSS": 10,
+        "END_HOUR": 20,
         "CANDLE_DURATION": 60,
-        "NUM_CANDLES": 200
+        "NUM_CANDLES": 200,
+        "CANDLE_DTYPE": "float64",  # float32 reduce a la mitad la memoria del buffer de velas
+        "CANDLE_OFFSET_MS": 300,  # milisegundos tras el cierre de vela en los que se decide
+        "MAX_OPEN_POSITIONS": 3,  # operaciones abiertas a la vez
+        "MAX_POSITIONS_PER_PAIR": 2,
+        "MAX_EXPOSURE": None,  # importe total en juego como máximo (None: sin límite)
+        "API_WORKERS": 8,  # hilos para las llamadas bloqueantes de la API (main_async.py)
+        "SCANNER_TOP_K": 2,  # oportunidades operadas por vela en modo escáner
+        "SCAN_BUDGET_MS": 500,  # presupuesto de tiempo de cada escaneo
+        "PAYOUT": 0.8,
+        "DRAW_RULE": "refund"
     }
 
     if not os.path.exists(SETTINGS_FILE):
@@ -38,6 +50,13 @@ def get_settings():
             settings.setdefault(key, value)
         return settings
 
+def get_currency_pairs(path: str = CURRENCIES_FILE) -> list:
+    """Lee la lista de pares configurados en currencies.txt (uno por línea)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
 def save_settings(new_settings: dict):
     """Guarda la configuración en settings.json y .env."""
     # Guardar credenciales en .env
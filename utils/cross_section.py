@@ -0,0 +1,212 @@
+# utils/cross_section.py
+"""
+Evaluación transversal: una estrategia sobre muchos pares en la misma vela.
+
+Al escanear los pares de currencies.txt, cada par pasaba por su propio DataFrame:
+add_indicators, dropna y la estrategia, una vez por par. `PairStack` alinea las
+últimas velas de todos los pares en arrays 2-D (pares × velas); los kernels de
+utils/indicator_kernels.py y las reglas de utils/rules.py trabajan sobre el último
+eje, así que indicadores y máscaras de todos los pares salen de una sola llamada:
+
+    stack = PairStack.from_frames({"EURUSD-OTC": df1, "GBPUSD-OTC": df2, ...})
+    signals = scan_pairs("5", stack, last_signals={"EURUSD-OTC": "BUY"}, current_hour=10)
+    # {"EURUSD-OTC": None, "GBPUSD-OTC": "SELL", ...}
+
+En vivo, `PairStack.from_buffers` apila directamente los CandleBuffer de
+utils/market_data.py (sin DataFrames), hasta la última vela cerrada de cada par.
+
+Las estrategias que lo admiten registran en AVAILABLE_STRATEGIES la clave
+'cross_section': una función `(columns, last_signals, current_hour=None, **contexto)`
+que recibe las columnas pares × velas (OHLC, sus INDICATORS y body / avg_body) y
+devuelve el código BUY / SELL / NO_SIGNAL de la última vela de cada par, con la
+misma decisión que la versión vela a vela. Las demás se evalúan par a par con su
+función de siempre, así que `scan_pairs` sirve para cualquier estrategia.
+La clave opcional 'strength' da la fuerza de la señal (`signal_strength`), que usa
+utils/opportunity_scanner.py para ordenar las oportunidades.
+"""
+import importlib
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+import numpy as np
+import pandas as pd
+
+from utils import indicator_kernels as kernels
+from utils.bar_view import column_arrays
+from utils.candle_buffer import CandleBuffer
+from utils.indicator_planner import KERNELS
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+from utils.vectorized import NO_SIGNAL, SIGNAL_LABELS, rolling_mean
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+
+class PairStack:
+    """Últimas velas de varios pares, alineadas por la derecha en arrays pares × velas."""
+
+    def __init__(self, pairs: List[str], columns: Dict[str, np.ndarray], frames: Optional[Mapping[str, pd.DataFrame]] = None):
+        self.pairs = list(pairs)
+        self.columns = columns
+        self.frames = frames or {}  # DataFrames de origen (para las estrategias sin modo transversal)
+        self.sources: Dict[str, tuple] = {}  # par → (CandleBuffer, fin) de from_buffers
+
+    @classmethod
+    def from_frames(cls, frames: Mapping[str, pd.DataFrame], window: Optional[int] = None) -> "PairStack":
+        """Últimas `window` velas de cada par (por defecto, tantas como tenga el par más corto)."""
+        pairs = list(frames)
+        shortest = min((len(frames[pair]) for pair in pairs), default=0)
+        window = shortest if window is None else min(window, shortest)
+        # Una conversión por par (column_arrays) y un apilado por columna
+        arrays = [column_arrays(frames[pair], window) for pair in pairs]
+        columns = {
+            column: np.stack([kernels.as_array(a[column]) for a in arrays]) if pairs else np.empty((0, window))
+            for column in PRICE_COLUMNS
+        }
+        return cls(pairs, columns, frames)
+
+    @classmethod
+    def from_buffers(
+        cls,
+        buffers: Mapping[str, CandleBuffer],
+        window: Optional[int] = None,
+        until: Optional[Mapping[str, int]] = None,
+    ) -> "PairStack":
+        """
+        Últimas `window` velas de cada CandleBuffer hasta la vela con 'from' `until[par]`
+        incluida (la última cerrada; la vela en curso queda fuera). Sin `until`, hasta
+        la última del buffer.
+        """
+        pairs = list(buffers)
+        stops = {}
+        for pair in pairs:
+            times = buffers[pair].array("from")
+            stops[pair] = len(times) if until is None else int(np.searchsorted(times, until[pair], side="right"))
+        shortest = min(stops.values(), default=0)
+        window = shortest if window is None else min(window, shortest)
+        columns = {
+            column: np.stack([kernels.as_array(buffers[pair].array(column)[stops[pair] - window:stops[pair]]) for pair in pairs])
+            if pairs else np.empty((0, window))
+            for column in PRICE_COLUMNS
+        }
+        stack = cls(pairs, columns)
+        stack.sources = {pair: (buffers[pair], stops[pair]) for pair in pairs}
+        return stack
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    @property
+    def window(self) -> int:
+        return self.columns["close"].shape[-1]
+
+    def frame(self, pair: str) -> pd.DataFrame:
+        """Las velas del par que entran en el stack, como DataFrame."""
+        if pair not in self.frames and pair in self.sources:
+            buffer, stop = self.sources[pair]
+            df = buffer.to_frame()
+            return df.iloc[stop - self.window:stop]
+        df = self.frames[pair]
+        return df.iloc[len(df) - self.window:]
+
+    def subset(self, pairs: Iterable[str]) -> "PairStack":
+        """Stack con solo `pairs` (en ese orden)."""
+        pairs = list(pairs)
+        rows = [self.pairs.index(pair) for pair in pairs]
+        stack = PairStack(pairs, {c: values[rows] for c, values in self.columns.items()}, self.frames)
+        stack.sources = {pair: self.sources[pair] for pair in pairs if pair in self.sources}
+        return stack
+
+    def with_indicators(self, specs: Iterable[tuple]) -> Dict[str, np.ndarray]:
+        """Columnas de precios más los indicadores de una lista INDICATORS, para todos los pares."""
+        columns = dict(self.columns)
+        high, low, close = columns["high"], columns["low"], columns["close"]
+        for kind, params, names in specs:
+            columns.update(zip(names, KERNELS[kind](high, low, close, **params)))
+        return columns
+
+
+def body_columns(columns: Dict[str, np.ndarray], average: bool = True) -> Dict[str, np.ndarray]:
+    """`columns` más 'body' y 'avg_body' (si `average`), calculados como en add_indicators de las estrategias."""
+    body = np.abs(columns["close"] - columns["open"])
+    if not average:
+        return dict(columns, body=body)
+    return dict(columns, body=body, avg_body=rolling_mean(body, 20))
+
+
+def complete_rows(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Velas sin NaN de cada par (las que deja dropna() en la versión vela a vela)."""
+    complete = np.logical_and.reduce([~np.isnan(values) for values in columns.values()])
+    return complete.sum(axis=-1)
+
+
+def scan_pairs(
+    strategy_key: str,
+    pairs: Union[PairStack, Mapping[str, pd.DataFrame]],
+    last_signals: Optional[Mapping[str, Optional[str]]] = None,
+    current_hour: Optional[int] = None,
+    **context: Any,
+) -> Dict[str, Any]:
+    """
+    Señal de la última vela de cada par con la estrategia `strategy_key`.
+
+    Args:
+        pairs: PairStack o DataFrames de velas por par (sin indicadores).
+        last_signals: última señal de cada par ("BUY" / "SELL"), como `last_signal`.
+        current_hour: hora con la que se filtra, igual que en la versión vela a vela.
+        context: argumentos de contexto de operaciones (last_trade_timestamp,
+            trades_in_last_hour) para las estrategias que los aceptan.
+
+    Returns:
+        dict: par → señal ("BUY" / "SELL" en modo transversal, o lo que devuelva la
+        estrategia par a par) o None.
+    """
+    stack = pairs if isinstance(pairs, PairStack) else PairStack.from_frames(pairs)
+    last_signals = last_signals or {}
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+
+    if "cross_section" not in strategy_info:
+        strategy_func = getattr(module, strategy_info["function"])
+        return {
+            pair: strategy_func(stack.frame(pair), last_signals.get(pair), current_hour=current_hour, **context)
+            for pair in stack.pairs
+        }
+
+    columns = stack.with_indicators(getattr(module, "INDICATORS", []))
+    signals = evaluate_columns(strategy_key, columns, [last_signals.get(pair) for pair in stack.pairs], current_hour, **context)
+    return dict(zip(stack.pairs, signals))
+
+
+def evaluate_columns(
+    strategy_key: str,
+    columns: Dict[str, np.ndarray],
+    last_signals: Iterable[Optional[str]],
+    current_hour: Optional[int] = None,
+    **context: Any,
+) -> List[Optional[str]]:
+    """
+    Señal ("BUY" / "SELL" / None) de la última vela de cada fila de `columns` con la
+    función 'cross_section' de la estrategia. `columns` ya trae sus INDICATORS (de
+    with_indicators o de los indicadores en streaming de utils/strategy_base.py).
+    """
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+    previous = np.array(list(last_signals), dtype=object)
+    codes = getattr(module, strategy_info["cross_section"])(columns, previous, current_hour=current_hour, **context)
+    # Filas sin las velas que exige la estrategia tras dropna()
+    codes = np.where(complete_rows(columns) >= getattr(module, "MIN_ROWS", 2), codes, NO_SIGNAL)
+    return [SIGNAL_LABELS.get(int(code)) for code in codes]
+
+
+def signal_strength(strategy_key: str, stack: PairStack, pairs: Optional[Iterable[str]] = None) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Fuerza de la señal de la última vela de cada par: {"BUY": x, "SELL": y} en
+    unidades del umbral de entrada de la estrategia (1.0 = justo lo necesario para
+    entrar). None para las estrategias sin la clave 'strength'.
+    """
+    pairs = list(stack.pairs if pairs is None else pairs)
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    if "strength" not in strategy_info or not pairs:
+        return {pair: None for pair in pairs}
+    module = importlib.import_module(strategy_info["module"])
+    subset = stack.subset(pairs)
+    strengths = getattr(module, strategy_info["strength"])(subset.with_indicators(getattr(module, "INDICATORS", [])))
+    return {pair: {label: float(values[i]) for label, values in strengths.items()} for i, pair in enumerate(pairs)}
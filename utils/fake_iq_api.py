@@ -0,0 +1,191 @@
+# utils/fake_iq_api.py
+"""
+Simulación local de la API de IQ Option para pruebas sin conexión.
+
+Genera velas deterministas (paseo aleatorio con semilla por par) sobre una rejilla
+de tiempo regular, con huecos configurables (p. ej. fines de semana) y un inicio
+de histórico. Reproduce el formato de `IQ_Option.get_candles` y el stream de velas
+(`start_candles_stream` / `get_realtime_candles`); el reloj avanza con `advance`.
+La vela en curso se devuelve parcial (cierre interpolado según el tiempo transcurrido).
+"""
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+DEFAULT_NOW = 1760470560  # 2025-10-14 19:36 UTC
+MAX_CANDLES_PER_REQUEST = 1000
+FUTURE_SECONDS = 24 * 3600  # velas generadas por delante de `now` para advance()
+
+
+class FakeIQOption:
+    """Doble de prueba de IQ_Option con los métodos que usa el bot."""
+
+    def __init__(
+        self,
+        now: int = DEFAULT_NOW,
+        history_seconds: int = 30 * 24 * 3600,
+        gaps: Optional[List[Tuple[int, int]]] = None,
+        fail_after_calls: Optional[int] = None,
+        balance: float = 1000.0,
+        payout: float = 0.8,
+        buy_latency: float = 0.0,
+    ):
+        """
+        Args:
+            now: timestamp de la última vela disponible.
+            history_seconds: antigüedad del histórico disponible.
+            gaps: rangos [inicio, fin] (timestamps) sin velas, como un mercado cerrado.
+            fail_after_calls: lanza ConnectionError tras este número de llamadas
+                (para simular una descarga interrumpida).
+            balance, payout: saldo inicial y beneficio por unidad de las operaciones.
+            buy_latency: segundos reales que tarda `buy` en responder (ida y vuelta al broker).
+        """
+        self.now = now
+        self.history_start = now - history_seconds
+        self.gaps = gaps or []
+        self.fail_after_calls = fail_after_calls
+        self.calls = 0
+        self._end = now + FUTURE_SECONDS
+        self._series: Dict[Tuple[str, int], Dict[str, np.ndarray]] = {}
+        self._streams: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self.balance = balance
+        self.payout = payout
+        self.buy_latency = buy_latency
+        self.orders: Dict[int, dict] = {}
+
+    # ----------------- Conexión -----------------
+    def connect(self):
+        return True, None
+
+    def check_connect(self) -> bool:
+        return True
+
+    def get_server_timestamp(self) -> float:
+        return self.now
+
+    # ----------------- Reloj -----------------
+    def advance(self, seconds: float):
+        """Avanza el reloj simulado (nuevas velas disponibles en histórico y stream)."""
+        self.now += seconds
+
+    # ----------------- Datos -----------------
+    def _candles(self, pair: str, size: int) -> Dict[str, np.ndarray]:
+        key = (pair, size)
+        with self._lock:
+            if key not in self._series:
+                first = self.history_start - self.history_start % size
+                times = np.arange(first, self._end + 1, size, dtype=np.int64)
+                for gap_start, gap_end in self.gaps:
+                    times = times[(times < gap_start) | (times > gap_end)]
+
+                rng = np.random.default_rng(zlib.crc32(f"{pair}_{size}".encode()))
+                close = 1.0 + np.cumsum(rng.normal(0, 0.0004, len(times)))
+                open_ = np.r_[close[0], close[:-1]]
+                spread = np.abs(rng.normal(0, 0.0002, len(times)))
+                self._series[key] = {
+                    "from": times,
+                    "open": open_,
+                    "close": close,
+                    "min": np.minimum(open_, close) - spread,
+                    "max": np.maximum(open_, close) + spread,
+                    "volume": rng.integers(1, 200, len(times)),
+                }
+            return self._series[key]
+
+    def _candle(self, series: Dict[str, np.ndarray], i: int, size: int) -> dict:
+        """Vela `i` como la devuelve la API; la vela en curso, parcial."""
+        start = int(series["from"][i])
+        progress = min(max((self.now - start) / size, 0.0), 1.0)
+        open_ = float(series["open"][i])
+        close = open_ + (float(series["close"][i]) - open_) * progress
+        spread_low = (min(open_, float(series["close"][i])) - float(series["min"][i])) * progress
+        spread_high = (float(series["max"][i]) - max(open_, float(series["close"][i]))) * progress
+        return {
+            "id": i,
+            "from": start,
+            "at": int(min(self.now, start + size)) * 10**9,
+            "to": start + size,
+            "open": open_,
+            "close": close if progress < 1 else float(series["close"][i]),
+            "min": min(open_, close) - spread_low if progress < 1 else float(series["min"][i]),
+            "max": max(open_, close) + spread_high if progress < 1 else float(series["max"][i]),
+            "volume": int(series["volume"][i] * progress),
+        }
+
+    def _last_index(self, series: Dict[str, np.ndarray], end_time: float) -> int:
+        """Posición tras la última vela con 'from' <= end_time que ya ha empezado."""
+        return int(np.searchsorted(series["from"], min(end_time, self.now), side="right"))
+
+    def get_candles(self, pair: str, size: int, count: int, end_time: float) -> List[dict]:
+        """Últimas `count` velas con 'from' <= end_time, en orden ascendente (como la API real)."""
+        with self._lock:
+            self.calls += 1
+            if self.fail_after_calls is not None and self.calls > self.fail_after_calls:
+                raise ConnectionError("Conexión perdida (simulada)")
+
+        series = self._candles(pair, size)
+        hi = self._last_index(series, end_time)
+        lo = max(0, hi - min(count, MAX_CANDLES_PER_REQUEST))
+        return [self._candle(series, i, size) for i in range(lo, hi)]
+
+    # ----------------- Stream -----------------
+    def start_candles_stream(self, pair: str, size: int, maxdict: int):
+        self._streams[(pair, size)] = maxdict
+
+    def stop_candles_stream(self, pair: str, size: int):
+        self._streams.pop((pair, size), None)
+
+    def get_realtime_candles(self, pair: str, size: int) -> Dict[int, dict]:
+        """Últimas `maxdict` velas del stream ({from: vela}), sin contar como petición."""
+        maxdict = self._streams.get((pair, size))
+        if maxdict is None:
+            return {}
+        series = self._candles(pair, size)
+        hi = self._last_index(series, self.now)
+        return {int(series["from"][i]): self._candle(series, i, size) for i in range(max(0, hi - maxdict), hi)}
+
+    # ----------------- Operaciones -----------------
+    def get_balance(self) -> float:
+        return self.balance
+
+    def get_all_profit(self) -> Dict[str, Dict[str, float]]:
+        """Payout por par (entre 0.70 y 0.89, fijo por par) para los pares con velas generadas."""
+        pairs = {pair for pair, _ in self._series}
+        return {pair: {"turbo": 0.70 + zlib.crc32(pair.encode()) % 20 / 100} for pair in pairs}
+
+    def buy(self, amount: float, pair: str, direction: str, duration: int) -> Tuple[bool, Optional[int]]:
+        """Opción binaria al precio actual; vence `duration` minutos después."""
+        if self.buy_latency:
+            time.sleep(self.buy_latency)
+        series = self._candles(pair, 60)
+        hi = self._last_index(series, self.now)
+        if hi == 0:
+            return False, None
+        with self._lock:
+            order_id = len(self.orders) + 1
+            self.orders[order_id] = {
+                "pair": pair,
+                "direction": direction.lower(),
+                "amount": amount,
+                "entry": self._candle(series, hi - 1, 60)["close"],
+                "expiry": self.now + duration * 60,
+            }
+            self.balance -= amount
+        return True, order_id
+
+    def check_win_v3(self, order_id: int) -> float:
+        """Profit de la operación; como la API real, espera a que venza."""
+        order = self.orders[order_id]
+        while self.now < order["expiry"]:
+            time.sleep(0.001)
+        series = self._candles(order["pair"], 60)
+        hi = self._last_index(series, order["expiry"])
+        exit_price = self._candle(series, hi - 1, 60)["close"]
+        move = (exit_price - order["entry"]) * (1 if order["direction"] == "call" else -1)
+        profit = order["amount"] * self.payout if move > 0 else -order["amount"] if move < 0 else 0.0
+        with self._lock:
+            self.balance += order["amount"] + profit
+        return profit
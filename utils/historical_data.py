@@ -0,0 +1,48 @@
+# utils/historical_data.py
+import glob
+import os
+import re
+from typing import Optional
+import pandas as pd
+
+from utils.candle_store import CandleStore
+
+DATA_DIR = "historical_data"
+
+
+def find_historical_file(pair: str, duration: int, data_dir: str = DATA_DIR) -> Optional[str]:
+    """Devuelve el CSV antiguo con más velas para el par y la temporalidad indicados."""
+    pattern = os.path.join(data_dir, f"{pair}_{duration}s_*c.csv")
+    best_path, best_count = None, -1
+    for path in glob.glob(pattern):
+        match = re.search(r"_(\d+)c\.csv$", path)
+        count = int(match.group(1)) if match else 0
+        if count > best_count:
+            best_path, best_count = path, count
+    return best_path
+
+
+def migrate_csv_files(store: CandleStore, pair: str, duration: int, data_dir: str = DATA_DIR) -> int:
+    """Importa al almacén todos los CSV antiguos del par (se pueden borrar después)."""
+    added = 0
+    for path in glob.glob(os.path.join(data_dir, f"{pair}_{duration}s_*c.csv")):
+        added += store.import_csv(path, pair, duration)
+    return added
+
+
+def load_historical_data(
+    pair: str,
+    duration: int,
+    num_candles: Optional[int] = None,
+    store: Optional[CandleStore] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Carga el histórico guardado de un par sin conexión a IQ Option (None si no existe).
+    Lee del almacén columnar; si aún no hay datos allí importa los CSV antiguos.
+    """
+    store = store or CandleStore()
+    if store.count(pair, duration) == 0 and find_historical_file(pair, duration):
+        migrate_csv_files(store, pair, duration)
+    if store.count(pair, duration) == 0:
+        return None
+    return store.load(pair, duration, last_n=num_candles)
@@ -0,0 +1,227 @@
+# utils/history_downloader.py
+"""
+Descarga paginada del histórico de velas hacia atrás, más allá de las 1000 velas
+que devuelve una sola llamada a `get_candles`.
+
+- Calcula qué rangos faltan en el almacén (inicio, final y huecos intermedios) y
+  los rellena página a página, desde el final del hueco hacia atrás.
+- Los rangos en los que la API no tiene velas (mercado cerrado, inicio del
+  histórico), también los que quedan dentro de una misma página, se guardan en un
+  checkpoint para no volver a pedirlos.
+- El checkpoint se actualiza tras cada página: si la descarga se interrumpe,
+  volver a llamar a `download` continúa donde se quedó (las velas ya guardadas
+  no se vuelven a pedir).
+- Varios pares se descargan en paralelo con un limitador de peticiones común.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from utils.candle_store import CandleStore
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+MAX_CANDLES_PER_REQUEST = 1000
+CHECKPOINT_FILE = "download_state.json"
+
+
+class RateLimiter:
+    """Limitador de peticiones (token bucket) compartido entre hilos."""
+
+    def __init__(self, max_calls: int, period: float = 1.0):
+        self.capacity = max_calls
+        self.rate = max_calls / period
+        self.tokens = float(max_calls)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloquea hasta que haya una petición disponible."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                sleep_for = (1 - self.tokens) / self.rate
+            time.sleep(sleep_for)
+
+
+def find_gaps(times: np.ndarray, start: int, end: int, duration: int) -> List[Tuple[int, int]]:
+    """
+    Rangos [desde, hasta] (timestamps de apertura) sin velas dentro de [start, end].
+    `times` son los 'from' guardados, ordenados.
+    """
+    times = times[(times >= start) & (times <= end)]
+    if not len(times):
+        return [(start, end)]
+
+    gaps = []
+    if times[0] - start >= duration:
+        gaps.append((start, int(times[0]) - duration))
+    jumps = np.flatnonzero(np.diff(times) > duration)
+    gaps.extend((int(times[i]) + duration, int(times[i + 1]) - duration) for i in jumps)
+    if end - times[-1] >= duration:
+        gaps.append((int(times[-1]) + duration, end))
+    return gaps
+
+
+def _covered(gap: Tuple[int, int], empty_ranges: List[List[int]]) -> bool:
+    return any(a <= gap[0] and gap[1] <= b for a, b in empty_ranges)
+
+
+class HistoryDownloader:
+    """Descarga histórico hacia atrás en páginas y lo guarda en el CandleStore."""
+
+    def __init__(
+        self,
+        api,
+        store: Optional[CandleStore] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        page_size: int = MAX_CANDLES_PER_REQUEST,
+        thread_safe_api: bool = False,
+    ):
+        """
+        Args:
+            api: objeto con `get_candles(pair, size, count, end_time)` (IQ_Option o FakeIQOption).
+            rate_limiter: limitador común; por defecto 5 peticiones por segundo.
+            thread_safe_api: iqoptionapi comparte el buffer de respuesta de get_candles
+                entre hilos, así que por defecto las llamadas a la API se serializan
+                (el guardado y el cálculo de huecos sí corren en paralelo).
+        """
+        self.api = api
+        self.store = store or CandleStore()
+        self.rate_limiter = rate_limiter or RateLimiter(5, 1.0)
+        self.page_size = min(page_size, MAX_CANDLES_PER_REQUEST)
+        self._api_lock = None if thread_safe_api else threading.Lock()
+
+    # ----------------- Checkpoint -----------------
+    def _checkpoint_path(self, pair: str, duration: int) -> str:
+        return os.path.join(self.store.dataset_dir(pair, duration), CHECKPOINT_FILE)
+
+    def load_checkpoint(self, pair: str, duration: int) -> dict:
+        path = self._checkpoint_path(pair, duration)
+        if not os.path.exists(path):
+            return {"empty_ranges": []}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, pair: str, duration: int, state: dict):
+        path = self._checkpoint_path(pair, duration)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    # ----------------- Descarga -----------------
+    def _get_candles(self, pair: str, duration: int, count: int, end_time: int) -> list:
+        self.rate_limiter.wait()
+        if self._api_lock is None:
+            return self.api.get_candles(pair, duration, count, end_time) or []
+        with self._api_lock:
+            return self.api.get_candles(pair, duration, count, end_time) or []
+
+    def _server_time(self) -> float:
+        """Hora del servidor del broker si la API la da; si no, el reloj local."""
+        try:
+            return self.api.get_server_timestamp() or time.time()
+        except AttributeError:
+            return time.time()
+
+    def _fill_gap(self, pair: str, duration: int, gap: Tuple[int, int], state: dict) -> int:
+        """Rellena un hueco desde su final hacia atrás. Devuelve las velas nuevas."""
+        gap_start, cursor = gap
+        added = 0
+        while cursor >= gap_start:
+            count = min(self.page_size, (cursor - gap_start) // duration + 1)
+            candles = self._get_candles(pair, duration, count, cursor)
+            in_gap = [c for c in candles if gap_start <= c["from"] <= cursor]
+
+            if in_gap:
+                added += self.store.append(pair, duration, in_gap)
+                # Tramos sin velas dentro de la página (p. ej. un fin de semana entre
+                # velas de la misma respuesta): la API ya ha dicho que están vacíos
+                page_times = np.sort(np.fromiter((c["from"] for c in in_gap), dtype=np.int64, count=len(in_gap)))
+                state["empty_ranges"].extend(
+                    list(empty) for empty in find_gaps(page_times, int(page_times[0]), int(cursor), duration)
+                )
+            first = min((c["from"] for c in in_gap), default=None)
+            reached_start = len(candles) < count or any(c["from"] < gap_start for c in candles)
+
+            if first is None or reached_start:
+                # La API no tiene velas en el resto del tramo (mercado cerrado o inicio
+                # del histórico): se marca como vacío para no volver a pedirlo
+                empty_end = cursor if first is None else first - duration
+                if empty_end >= gap_start:
+                    state["empty_ranges"].append([gap_start, int(empty_end)])
+                cursor = gap_start - 1
+            else:
+                cursor = first - duration
+
+            state["cursor"] = int(cursor)
+            state["pages"] = state.get("pages", 0) + 1
+            self._save_checkpoint(pair, duration, state)
+        return added
+
+    def download(self, pair: str, duration: int, start_time: Optional[int] = None, end_time: Optional[int] = None) -> dict:
+        """
+        Descarga (o completa) el histórico de `pair` entre start_time y end_time.
+        Sin argumentos retoma el último objetivo guardado en el checkpoint.
+
+        Returns:
+            dict: resumen con velas nuevas, huecos rellenados y total guardado.
+        """
+        state = self.load_checkpoint(pair, duration)
+        if start_time is None:
+            if "target_start" not in state:
+                raise ValueError(f"No hay descarga previa de {pair} para retomar; indica start_time.")
+            start_time, end_time = state["target_start"], state["target_end"]
+        # La última vela admitida es la última cerrada: la que aún se está formando
+        # se guardaría con OHLC parcial y nunca se volvería a pedir
+        last_closed = int(self._server_time()) - duration
+        end_time = min(int(end_time if end_time is not None else last_closed), last_closed)
+        start_time = int(start_time) - int(start_time) % duration
+        end_time -= end_time % duration
+
+        state.update({"target_start": start_time, "target_end": end_time, "complete": False})
+        self._save_checkpoint(pair, duration, state)
+
+        times = np.asarray(self.store.load_arrays(pair, duration, start_time, end_time)["from"])
+        gaps = [g for g in find_gaps(times, start_time, end_time, duration) if not _covered(g, state["empty_ranges"])]
+        logger.info(f"⬇️ {pair}: {len(gaps)} rango(s) por descargar entre {start_time} y {end_time}")
+
+        added = 0
+        for gap in reversed(gaps):  # del más reciente al más antiguo
+            added += self._fill_gap(pair, duration, gap, state)
+
+        state["complete"] = True
+        self._save_checkpoint(pair, duration, state)
+        summary = {"pair": pair, "added": added, "gaps": len(gaps), "stored": self.store.count(pair, duration)}
+        logger.info(f"✅ {pair}: {added} velas nuevas ({summary['stored']} guardadas)")
+        return summary
+
+    def download_many(
+        self,
+        pairs: List[str],
+        duration: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        max_workers: int = 4,
+    ) -> Dict[str, dict]:
+        """Descarga varios pares en paralelo. Los errores se devuelven en el resumen del par."""
+        def run(pair: str) -> dict:
+            try:
+                return self.download(pair, duration, start_time, end_time)
+            except Exception as e:
+                logger.error(f"❌ {pair}: descarga interrumpida ({e}). Se puede retomar.")
+                return {"pair": pair, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return {summary["pair"]: summary for summary in executor.map(run, pairs)}
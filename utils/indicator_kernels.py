@@ -0,0 +1,171 @@
+# utils/indicator_kernels.py
+"""
+Indicadores sobre arrays de NumPy (float64 contiguos), sin `ta` ni Series intermedias.
+
+Reproducen las funciones de utils/indicators.py tal como se calculaban con `ta` y
+pandas:
+
+    ema:              ewm(span=window, adjust=False)
+    rsi:              ta RSIIndicator (medias ewm con alpha=1/window, min_periods=window)
+    bollinger_bands:  ta BollingerBands (media y desviación ddof=0, min_periods=window)
+    atr:              media de las últimas `window` True Range (min_periods=1)
+
+Las entradas son precios de velas: se asume que no contienen NaN.
+Todas operan sobre el último eje: un array 2-D (pares × velas) calcula el
+indicador de todos los pares a la vez, con los mismos valores que par a par
+(utils/cross_section.py). La comprobación numérica contra `ta` y las medidas de
+velocidad están en benchmark_indicators.py.
+"""
+import math
+from typing import Tuple
+import numpy as np
+
+# Exponente máximo de (1 - alpha)^-k dentro de un bloque de la EMA (e^300 ≈ 1e130)
+_MAX_LOG_SCALE = 300.0
+# Tamaño de tramo (en velas) de las ventanas móviles de Bollinger
+_CHUNK = 16_384
+
+
+def as_array(values) -> np.ndarray:
+    """Convierte una Series / lista en un array float64 contiguo (sin copia si ya lo es)."""
+    if hasattr(values, "to_numpy"):
+        values = values.to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def ema(values: np.ndarray, window: int = None, alpha: float = None, min_periods: int = 0) -> np.ndarray:
+    """
+    Media exponencial y_t = (1 - alpha) · y_{t-1} + alpha · x_t con y_0 = x_0.
+
+    La recurrencia se resuelve por bloques con una suma acumulada escalada por
+    (1 - alpha)^-k; el tamaño del bloque se limita para que la escala no desborde.
+    Con series largas el coste lo marca ese único np.cumsum secuencial, el mismo
+    orden que la recursión en C de pandas: la ventaja está en no crear Series
+    (historiales cortos) y en calcular todos los pares de una vez (arrays 2-D).
+    """
+    values = as_array(values)
+    alpha = alpha if alpha is not None else 2 / (window + 1)
+    n = values.shape[-1]
+    out = np.empty(values.shape)
+    if n == 0:
+        return out
+    if alpha >= 1:
+        out[:] = values
+    else:
+        log_decay = math.log1p(-alpha)
+        block = max(1, min(n, int(_MAX_LOG_SCALE / -log_decay)))
+        scale = np.exp(-log_decay * np.arange(1, block + 1))
+        carry = values[..., :1]
+        for start in range(0, n, block):
+            chunk = values[..., start:start + block]
+            k = chunk.shape[-1]
+            sums = np.cumsum(chunk * scale[:k], axis=-1)
+            out[..., start:start + k] = (carry + alpha * sums) / scale[:k]
+            carry = out[..., start + k - 1:start + k]
+    if min_periods > 1:
+        out[..., :min_periods - 1] = np.nan
+    return out
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """RSI de Wilder, mismos valores que ta.momentum.RSIIndicator(fillna=False)."""
+    close = as_array(close)
+    diff = np.zeros(close.shape)
+    diff[..., 1:] = np.diff(close, axis=-1)
+    up = ema(np.maximum(diff, 0.0), alpha=1 / window, min_periods=window)
+    down = ema(np.maximum(-diff, 0.0), alpha=1 / window, min_periods=window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(down == 0, 100.0, 100 - 100 / (1 + up / down))
+    out[np.isnan(down)] = np.nan
+    return out
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Suma de cada ventana completa, acumulando `window` desplazamientos del array."""
+    n = values.shape[-1]
+    total = values[..., :n - window + 1].copy()
+    for k in range(1, window):
+        np.add(total, values[..., k:n - window + 1 + k], out=total)
+    return total
+
+
+def rolling_mean(values: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """Media de las últimas `window` posiciones; NaN mientras haya menos de `min_periods`."""
+    values = as_array(values)
+    min_periods = window if min_periods is None else max(min_periods, 1)
+    n = values.shape[-1]
+    out = np.full(values.shape, np.nan)
+    if n >= window:
+        out[..., window - 1:] = _window_sum(values, window) / window
+    head = min(window - 1, n)
+    if min_periods < window and head:
+        out[..., :head] = np.cumsum(values[..., :head], axis=-1) / np.arange(1, head + 1)
+        out[..., :min(min_periods - 1, head)] = np.nan
+    return out
+
+
+def _rolling_mean_std(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media y desviación (ddof=0) de cada ventana completa.
+
+    Sumas acumuladas de x y x² restadas a `window` posiciones. Cada tramo se centra
+    en su primer precio y reinicia las sumas, así el error de redondeo queda acotado
+    al tramo y la resta Σx²/w - media² no pierde precisión con precios ~1.0.
+    """
+    lead = values.shape[:-1]
+    count = values.shape[-1] - window + 1
+    mean, std = np.empty(lead + (count,)), np.empty(lead + (count,))
+    # Por tramos para que los arrays temporales quepan en caché con históricos grandes
+    for start in range(0, count, _CHUNK):
+        stop = min(start + _CHUNK, count)
+        chunk = values[..., start:stop + window - 1]
+        shift = chunk[..., :1]
+        centered = chunk - shift
+        sums = np.zeros(lead + (centered.shape[-1] + 1,))
+        np.cumsum(centered, axis=-1, out=sums[..., 1:])
+        m = (sums[..., window:] - sums[..., :-window]) / window
+        np.multiply(centered, centered, out=centered)
+        np.cumsum(centered, axis=-1, out=sums[..., 1:])
+        variance = (sums[..., window:] - sums[..., :-window]) / window
+        variance -= m * m
+        np.maximum(variance, 0.0, out=variance)  # la resta puede dar -1e-20 en ventanas planas
+        mean[..., start:stop] = m + shift
+        np.sqrt(variance, out=std[..., start:stop])
+    return mean, std
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Desviación poblacional (ddof=0) de las últimas `window` posiciones."""
+    values = as_array(values)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] >= window:
+        out[..., window - 1:] = _rolling_mean_std(values, window)[1]
+    return out
+
+
+def bollinger_bands(close: np.ndarray, window: int = 20, std_dev: float = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """Banda superior e inferior (media ± std_dev · desviación ddof=0)."""
+    close = as_array(close)
+    upper, lower = np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    if close.shape[-1] >= window:
+        mean, std = _rolling_mean_std(close, window)
+        width = std_dev * std
+        upper[..., window - 1:] = mean + width
+        lower[..., window - 1:] = mean - width
+    return upper, lower
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True Range; en la primera vela (sin cierre previo) es high - low."""
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    out = high - low
+    if out.shape[-1] > 1:
+        prev_close = close[..., :-1]
+        gap = np.maximum(np.abs(high[..., 1:] - prev_close), np.abs(low[..., 1:] - prev_close))
+        np.maximum(out[..., 1:], gap, out=out[..., 1:])
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Average True Range: media simple de la True Range (min_periods=1)."""
+    return rolling_mean(true_range(high, low, close), window, min_periods=1)
@@ -0,0 +1,83 @@
+# utils/indicator_planner.py
+"""
+Cálculo compartido de indicadores entre estrategias.
+
+Cada estrategia declara en su lista INDICATORS qué indicadores necesita, con qué
+parámetros y con qué nombres de columna:
+
+    INDICATORS = [
+        ("rsi", {"window": 14}, ("rsi",)),
+        ("bollinger", {"window": 20, "std_dev": 2}, ("bb_high", "bb_low")),
+    ]
+
+`IndicatorPlan` junta las declaraciones de varias estrategias, calcula la unión una
+sola vez por DataFrame de velas (RSI 14 o BB 20 se calculan una vez aunque una
+estrategia los llame `bb_high` y otra `bb_upper`) y entrega a cada estrategia su
+vista con las columnas que espera. Como add_indicators solo calcula las columnas que
+faltan, ejecutar todas las estrategias sobre la misma vela cuesta casi lo mismo que
+ejecutar una.
+"""
+import importlib
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+
+from utils import indicator_kernels as kernels
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+# Tipo de indicador → función (high, low, close, **params) -> arrays de salida
+KERNELS = {
+    "ema": lambda high, low, close, window: (kernels.ema(close, window),),
+    "rsi": lambda high, low, close, window=14: (kernels.rsi(close, window),),
+    "bollinger": lambda high, low, close, window=20, std_dev=2: kernels.bollinger_bands(close, window, std_dev),
+    "atr": lambda high, low, close, window=14: (kernels.atr(high, low, close, window),),
+}
+
+IndicatorKey = Tuple[str, Tuple[Tuple[str, float], ...]]
+
+
+def indicator_key(kind: str, params: dict) -> IndicatorKey:
+    """Identifica un indicador por tipo y parámetros, sin importar el nombre de columna."""
+    return kind, tuple(sorted(params.items()))
+
+
+def strategy_indicators(strategy_key: str) -> List[tuple]:
+    """Lista INDICATORS del módulo de una estrategia de AVAILABLE_STRATEGIES (vacía si no la declara)."""
+    module = importlib.import_module(AVAILABLE_STRATEGIES[strategy_key]["module"])
+    return list(getattr(module, "INDICATORS", []))
+
+
+class IndicatorPlan:
+    """
+    Plan de cálculo de los indicadores de varias estrategias.
+
+    `requirements` asocia cada estrategia con su lista INDICATORS.
+    """
+
+    def __init__(self, requirements: Dict[str, List[tuple]]):
+        self.requirements = requirements
+        self.indicators: Dict[IndicatorKey, Tuple[str, dict]] = {}
+        for specs in requirements.values():
+            for kind, params, _ in specs:
+                self.indicators.setdefault(indicator_key(kind, params), (kind, params))
+
+    @classmethod
+    def for_strategies(cls, strategy_keys: Iterable[str]) -> "IndicatorPlan":
+        return cls({key: strategy_indicators(key) for key in strategy_keys})
+
+    def compute(self, df: pd.DataFrame) -> Dict[IndicatorKey, Tuple[np.ndarray, ...]]:
+        """Calcula una vez cada indicador distinto del plan sobre `df`."""
+        high, low, close = (kernels.as_array(df[col]) for col in ("high", "low", "close"))
+        return {key: KERNELS[kind](high, low, close, **params) for key, (kind, params) in self.indicators.items()}
+
+    def view(self, df: pd.DataFrame, computed: Dict[IndicatorKey, Tuple[np.ndarray, ...]], strategy_key: str) -> pd.DataFrame:
+        """Copia de `df` con las columnas de indicadores de una estrategia, con sus nombres."""
+        columns = {}
+        for kind, params, names in self.requirements[strategy_key]:
+            columns.update(zip(names, computed[indicator_key(kind, params)]))
+        return df.assign(**columns)
+
+    def frames(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Vista de `df` para cada estrategia del plan, calculando la unión una sola vez."""
+        computed = self.compute(df)
+        return {key: self.view(df, computed, key) for key in self.requirements}
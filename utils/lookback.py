@@ -0,0 +1,59 @@
+# utils/lookback.py
+"""
+Número de velas que necesita cada estrategia, calculado a partir de lo que declara.
+
+- INDICATORS / TIMEFRAMES: cada indicador aporta su calentamiento. Las filas con NaN
+  (RSI y Bollinger hasta completar la ventana) se descartan con dropna(); las medias
+  exponenciales no dan NaN pero dependen del valor inicial hasta que su peso cae por
+  debajo de WARMUP_TOLERANCE (≈ 461 velas para una EMA200).
+- MIN_ROWS: filas que la estrategia exige después de dropna() (su `len(df) < N`).
+
+`strategy_window` es la ventana que necesita la estrategia cuando los indicadores ya
+están calculados (backtests) y `strategy_lookback` las velas que hay que pedir para
+arrancar en frío (main.py).
+"""
+import math
+from types import ModuleType
+
+# Peso máximo admitido del valor inicial de una media exponencial
+WARMUP_TOLERANCE = 0.01
+
+
+def _ema_convergence(alpha: float) -> int:
+    """Velas hasta que el peso del valor inicial (1 - alpha)^n cae por debajo de la tolerancia."""
+    if alpha >= 1:
+        return 1
+    return math.ceil(math.log(WARMUP_TOLERANCE) / math.log1p(-alpha))
+
+
+def indicator_nan_rows(kind: str, params: dict) -> int:
+    """Filas iniciales en las que el indicador vale NaN."""
+    if kind in ("rsi", "bollinger"):
+        return params.get("window", 14 if kind == "rsi" else 20) - 1
+    return 0  # EMA y ATR (min_periods=1) tienen valor desde la primera vela
+
+
+def indicator_warmup(kind: str, params: dict) -> int:
+    """Velas necesarias para que el indicador tenga un valor estable."""
+    if kind == "ema":
+        return _ema_convergence(2 / (params["window"] + 1))
+    if kind == "rsi":
+        return _ema_convergence(1 / params.get("window", 14)) + 1
+    return params.get("window", 20 if kind == "bollinger" else 14)
+
+
+def strategy_window(module: ModuleType) -> int:
+    """Velas que recibe la estrategia en cada paso cuando los indicadores ya están calculados."""
+    nan_rows = max((indicator_nan_rows(kind, params) for kind, params, _ in getattr(module, "INDICATORS", [])), default=0)
+    return nan_rows + getattr(module, "MIN_ROWS", 2)
+
+
+def strategy_lookback(module: ModuleType, base_duration: int = 60) -> int:
+    """Velas base que hay que pedir para evaluar la estrategia sin histórico previo."""
+    required = [strategy_window(module)]
+    required += [indicator_warmup(kind, params) for kind, params, _ in getattr(module, "INDICATORS", [])]
+    for minutes, specs in getattr(module, "TIMEFRAMES", {}).items():
+        # Una vela superior más, porque la primera puede estar incompleta
+        bars = max((indicator_warmup(kind, params) for kind, params, _ in specs), default=1) + 1
+        required.append(bars * minutes * 60 // base_duration)
+    return max(required)
@@ -0,0 +1,154 @@
+# utils/market_data.py
+"""
+Velas en vivo por stream, en lugar de volver a pedir la ventana en cada vuelta.
+
+`MarketData` mantiene un CandleBuffer (utils/candle_buffer.py) por par:
+
+1. `subscribe(pair)` carga una sola vez con get_candles las velas que necesita la
+   estrategia y abre el stream de la API (`start_candles_stream`).
+2. `poll()` lee `get_realtime_candles`, el diccionario con las últimas `maxdict`
+   velas que la librería mantiene en memoria con cada mensaje del websocket (sin
+   peticiones de red), y lo incorpora al buffer: la vela en curso se sobrescribe.
+   Si entre dos lecturas faltan velas (el stream solo guarda las últimas `maxdict`,
+   p. ej. tras esperar el vencimiento de una operación), se piden a get_candles
+   solo esas.
+3. Cada vela cerrada se emite una vez y en orden: a los oyentes registrados con
+   `on_candle_closed(callback)` y en la lista que devuelve `poll()`.
+
+Una vela está cerrada cuando llega la siguiente o cuando el reloj pasa de su fin
+más `close_grace` segundos. Con `maxdict=2` el stream trae también la vela anterior
+con sus valores finales, así que la vela emitida no se queda con una lectura parcial.
+
+    market = MarketData(API, capacity=NUM_CANDLES, duration=60)
+    buffer = market.subscribe("EURUSD-OTC")
+    market.on_candle_closed(lambda pair, bar: ...)
+    while True:
+        for pair, bar in market.poll(): ...
+        time.sleep(1)
+"""
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from utils.candle_buffer import Bar, CandleBuffer
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+STREAM_MAXDICT = 2  # vela en curso + la anterior con sus valores finales
+CLOSE_GRACE = 1.0   # segundos tras el fin de una vela para darla por cerrada sin la siguiente
+
+CandleListener = Callable[[str, Bar], None]
+
+
+class MarketData:
+    """Buffers de velas por par alimentados por el stream de la API."""
+
+    def __init__(
+        self,
+        api,
+        capacity: int,
+        duration: int = 60,
+        dtype=np.float64,
+        maxdict: int = STREAM_MAXDICT,
+        close_grace: float = CLOSE_GRACE,
+        clock: Callable[[], float] = time.time,
+        thread_safe_api: bool = False,
+    ):
+        """
+        Args:
+            api: IQ_Option (o FakeIQOption) con get_candles y el stream de velas.
+            capacity: velas que guarda cada buffer (las que necesita la estrategia).
+            duration: duración de la vela en segundos.
+            clock: reloj para decidir si la última vela ya cerró (el de la API simulada
+                en pruebas).
+            thread_safe_api: True solo si la API admite get_candles concurrentes. Por
+                defecto se serializan (iqoptionapi comparte el buffer de respuesta entre
+                hilos, ver utils/history_downloader.py).
+        """
+        self.api = api
+        self.capacity = capacity
+        self.duration = duration
+        self.dtype = dtype
+        self.maxdict = maxdict
+        self.close_grace = close_grace
+        self.clock = clock
+        self.buffers: Dict[str, CandleBuffer] = {}
+        self.closed_until: Dict[str, int] = {}  # 'from' de la última vela emitida por par
+        self.listeners: List[CandleListener] = []
+        self.history_requests = 0  # llamadas a get_candles (carga inicial y huecos)
+        self._api_lock = None if thread_safe_api else threading.Lock()
+
+    # ----------------- Suscripción -----------------
+    def subscribe(self, pair: str) -> CandleBuffer:
+        """Carga el histórico del par y abre su stream. El histórico no se emite."""
+        buffer = CandleBuffer(self.capacity, self.dtype, self.duration)
+        buffer.extend(self._history(pair, self.capacity, self.clock()))
+        self.buffers[pair] = buffer
+        # La última vela del histórico puede seguir en curso: se emitirá al cerrar
+        self.closed_until[pair] = buffer.last_time - self.duration if len(buffer) else 0
+        with self._api_lock or nullcontext():
+            self.api.start_candles_stream(pair, self.duration, self.maxdict)
+        logger.info(f"📡 Stream de velas abierto para {pair} ({len(buffer)} velas de histórico)")
+        return buffer
+
+    def unsubscribe(self, pair: str):
+        if self.buffers.pop(pair, None) is not None:
+            self.closed_until.pop(pair, None)
+            self.api.stop_candles_stream(pair, self.duration)
+
+    def close(self):
+        """Cierra los streams de todos los pares."""
+        for pair in list(self.buffers):
+            self.unsubscribe(pair)
+
+    def on_candle_closed(self, callback: CandleListener):
+        """Registra `callback(pair, bar)` para cada vela cerrada."""
+        self.listeners.append(callback)
+
+    # ----------------- Lectura -----------------
+    def poll(self) -> List[Tuple[str, Bar]]:
+        """Incorpora lo recibido por el stream y devuelve las velas que han cerrado."""
+        events = []
+        for pair in list(self.buffers):
+            events.extend((pair, bar) for bar in self._poll_pair(pair))
+        for pair, bar in events:
+            for callback in self.listeners:
+                callback(pair, bar)
+        return events
+
+    def _history(self, pair: str, count: int, end_time: float) -> list:
+        with self._api_lock or nullcontext():
+            self.history_requests += 1
+            return self.api.get_candles(pair, self.duration, count, end_time) or []
+
+    def _poll_pair(self, pair: str) -> List[Bar]:
+        buffer = self.buffers[pair]
+        stream = sorted((self.api.get_realtime_candles(pair, self.duration) or {}).values(), key=lambda c: c["from"])
+        if stream and len(buffer) and stream[0]["from"] > buffer.last_time:
+            # El stream ya no trae la última vela guardada: se piden su valor final y las que faltan
+            first = stream[0]["from"]
+            missing = min((first - buffer.last_time) // self.duration, self.capacity)
+            logger.debug(f"[market] {pair}: recuperando {missing} velas que no llegaron por el stream")
+            buffer.extend(self._history(pair, missing, first - self.duration))
+        buffer.extend(stream)
+        return self._closed_bars(pair)
+
+    def _closed_bars(self, pair: str) -> List[Bar]:
+        buffer = self.buffers[pair]
+        times = buffer.array("from")
+        if not len(times):
+            return []
+        start = int(np.searchsorted(times, self.closed_until[pair], side="right"))
+        stop = len(times)
+        if self.clock() < times[-1] + self.duration + self.close_grace:
+            stop -= 1  # la última sigue en curso
+        if start >= stop:
+            return []
+        self.closed_until[pair] = int(times[stop - 1])
+        return [buffer.bar(i - len(times)) for i in range(start, stop)]
+
+    def buffer(self, pair: str) -> Optional[CandleBuffer]:
+        return self.buffers.get(pair)
@@ -0,0 +1,354 @@
+# utils/opportunity_scanner.py
+"""
+Escáner de oportunidades: todos los pares configurados en cada vela, y solo las
+mejores señales pasan a ejecución.
+
+Con currencies.txt listando ~20 pares solo se operaba el PAIR de settings.json.
+`OpportunityScanner` evalúa en cada cierre de vela todos los pares con una o varias
+estrategias y ordena las señales:
+
+    rank = fuerza × tasa de acierto × (1 + payout)
+
+- fuerza: score / confirmaciones de la estrategia en unidades de su umbral de
+  entrada (clave 'strength' de AVAILABLE_STRATEGIES; 1.0 si no la tiene).
+- tasa de acierto: últimas WIN_RATE_WINDOW operaciones de la estrategia en el par
+  durante la sesión, suavizada hacia DEFAULT_WIN_RATE con PRIOR_TRADES operaciones
+  ficticias.
+- payout: el de `get_all_profit` para el par (o el de settings si no lo hay).
+
+`win_rate × (1 + payout)` es el retorno bruto esperado por unidad invertida, así que
+el rank prefiere señales fuertes en pares que pagan más y que han ido bien.
+
+Las velas se apilan directamente desde los buffers de MarketData
+(PairStack.from_buffers) y las estrategias con modo transversal evalúan todos los
+pares en una sola llamada (utils/cross_section.py). Cada escaneo tiene un
+presupuesto de tiempo: si se agota entre estrategia y estrategia, se enruta lo ya
+encontrado. `stats()` da la duración media / p95 / máxima del escaneo y cuántas
+veces se superó el presupuesto.
+
+`ScannerRuntime` es el modo escáner del runtime asyncio (utils/async_runtime.py):
+mismo reloj, stream y OrderManager, pero con las `top_k` mejores oportunidades por
+vela en lugar de operar cada señal de cada par.
+"""
+import asyncio
+import importlib
+import inspect
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from utils.async_runtime import AsyncTradingRuntime
+from utils.backtest_engine import normalize_signal
+from utils.cross_section import PairStack, scan_pairs, signal_strength
+from utils.logger import setup_logger
+from utils.market_data import MarketData
+from utils.order_manager import Position
+from utils.strategy_base import TRADE_CONTEXT
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+logger = setup_logger()
+
+DEFAULT_TOP_K = 2
+DEFAULT_BUDGET_MS = 500
+DEFAULT_PAYOUT = 0.8
+DEFAULT_WIN_RATE = 0.55
+WIN_RATE_WINDOW = 20    # operaciones recientes por par y estrategia
+PRIOR_TRADES = 10       # peso de DEFAULT_WIN_RATE, en operaciones
+PAYOUT_REFRESH = 300    # segundos entre consultas de get_all_profit
+SCAN_SAMPLES = 500
+
+
+class Opportunity:
+    """Señal de una estrategia en un par, con su rank."""
+
+    __slots__ = ("pair", "strategy_key", "direction", "signal", "strength", "payout", "win_rate", "rank")
+
+    def __init__(self, pair: str, strategy_key: str, direction: str, signal: Any, strength: float, payout: float, win_rate: float):
+        self.pair = pair
+        self.strategy_key = strategy_key
+        self.direction = direction  # "call" / "put"
+        self.signal = signal        # valor que pasa a last_signal
+        self.strength = strength
+        self.payout = payout
+        self.win_rate = win_rate
+        self.rank = strength * win_rate * (1 + payout)
+
+    def __repr__(self) -> str:
+        return (f"Opportunity({self.pair} {self.direction.upper()} [{self.strategy_key}] rank={self.rank:.3f}, "
+                f"fuerza={self.strength:.2f}, acierto={self.win_rate:.2f}, payout={self.payout:.2f})")
+
+
+class OpportunityScanner:
+    """Evalúa todos los pares en cada vela y elige las `top_k` mejores señales."""
+
+    def __init__(
+        self,
+        market: MarketData,
+        strategy_keys: Sequence[str],
+        window: int,
+        top_k: int = DEFAULT_TOP_K,
+        budget_ms: float = DEFAULT_BUDGET_MS,
+        default_payout: float = DEFAULT_PAYOUT,
+        min_rank: float = 0.0,
+        option_type: str = "turbo",
+    ):
+        """
+        Args:
+            market: MarketData con los pares suscritos.
+            strategy_keys: claves de AVAILABLE_STRATEGIES, en orden de prioridad (si se
+                agota el presupuesto, las últimas no se evalúan).
+            window: velas por par que recibe cada estrategia (su lookback).
+            top_k: oportunidades que se enrutan por vela (una por par como máximo).
+            budget_ms: presupuesto de tiempo de cada escaneo.
+            min_rank: rank mínimo para enrutar una oportunidad.
+            option_type: clave de get_all_profit ("turbo" para vencimientos de 1-5 min).
+        """
+        self.market = market
+        self.strategy_keys = list(strategy_keys)
+        self.window = window
+        self.top_k = top_k
+        self.budget = budget_ms / 1000
+        self.default_payout = default_payout
+        self.min_rank = min_rank
+        self.option_type = option_type
+        self.last_signals: Dict[str, Dict[str, Any]] = {key: {} for key in self.strategy_keys}
+        self.trade_times = deque()  # entradas de la última hora (de la cuenta)
+        self.results: Dict[Tuple[str, str], deque] = {}  # (par, estrategia) → aciertos
+        self.payouts: Dict[str, float] = {}
+        self.context_args = {key: self._context_args(key) for key in self.strategy_keys}
+        self.scan_times = deque(maxlen=SCAN_SAMPLES)
+        self.stack_times = deque(maxlen=SCAN_SAMPLES)
+        self.scans = 0
+        self.overruns = 0
+        self.found = 0
+        self.routed = 0
+
+    @staticmethod
+    def _context_args(strategy_key: str) -> List[str]:
+        """Argumentos de contexto de operaciones que acepta la estrategia."""
+        strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+        module = importlib.import_module(strategy_info["module"])
+        func = getattr(module, strategy_info.get("cross_section", strategy_info["function"]))
+        return [arg for arg in TRADE_CONTEXT if arg in inspect.signature(func).parameters]
+
+    # ----------------- Datos de ranking -----------------
+    def update_payouts(self, profits: Optional[Dict[str, Dict[str, float]]]):
+        """Incorpora el resultado de API.get_all_profit()."""
+        for pair, values in (profits or {}).items():
+            try:
+                payout = values[self.option_type]
+            except (KeyError, TypeError):
+                continue
+            if payout:
+                self.payouts[pair] = float(payout)
+
+    def payout(self, pair: str) -> float:
+        return self.payouts.get(pair, self.default_payout)
+
+    def record_result(self, pair: str, strategy_key: str, result: Optional[str]):
+        """Registra el resultado ("win" / "loss" / "draw") de una operación de la estrategia en el par."""
+        if result in ("win", "loss"):
+            self.results.setdefault((pair, strategy_key), deque(maxlen=WIN_RATE_WINDOW)).append(result == "win")
+
+    def win_rate(self, pair: str, strategy_key: str) -> float:
+        """Tasa de acierto reciente de la estrategia en el par, suavizada hacia DEFAULT_WIN_RATE."""
+        results = self.results.get((pair, strategy_key), ())
+        return (sum(results) + PRIOR_TRADES * DEFAULT_WIN_RATE) / (len(results) + PRIOR_TRADES)
+
+    def trade_context(self) -> Dict[str, Any]:
+        now = time.time()
+        while self.trade_times and self.trade_times[0] < now - 3600:
+            self.trade_times.popleft()
+        return {
+            "last_trade_timestamp": self.trade_times[-1] if self.trade_times else None,
+            "trades_in_last_hour": len(self.trade_times),
+        }
+
+    # ----------------- Escaneo -----------------
+    def scan(self, pairs: Sequence[str], current_hour: Optional[int] = None) -> List[Opportunity]:
+        """Señales de la última vela cerrada de `pairs`, ordenadas por rank (mayor primero)."""
+        start = time.perf_counter()
+        deadline = start + self.budget
+        opportunities: List[Opportunity] = []
+        pairs = [pair for pair in pairs if self.market.buffer(pair) is not None]
+        if not pairs:
+            return opportunities
+
+        buffers = {pair: self.market.buffer(pair) for pair in pairs}
+        until = {pair: self.market.closed_until[pair] for pair in pairs}
+        stack = PairStack.from_buffers(buffers, self.window, until)
+        self.stack_times.append(time.perf_counter() - start)
+
+        context = self.trade_context()
+        for i, key in enumerate(self.strategy_keys):
+            if time.perf_counter() > deadline:
+                self.overruns += 1
+                logger.warning(f"⏱️ Presupuesto de escaneo agotado ({self.budget * 1e3:.0f}ms): "
+                               f"sin evaluar {', '.join(self.strategy_keys[i:])}")
+                break
+            extra = {arg: context[arg] for arg in self.context_args[key]}
+            try:
+                signals = scan_pairs(key, stack, last_signals=self.last_signals[key], current_hour=current_hour, **extra)
+            except Exception as e:
+                logger.error(f"❌ Error en la estrategia {key} durante el escaneo: {e}")
+                continue
+            fired = {}
+            for pair, signal in signals.items():
+                direction, value = normalize_signal(signal)
+                if direction is not None:
+                    fired[pair] = (direction, value)
+            strengths = signal_strength(key, stack, list(fired))
+            for pair, (direction, value) in fired.items():
+                label = "BUY" if direction.lower() == "call" else "SELL"
+                strength = (strengths.get(pair) or {}).get(label, 1.0)
+                opportunities.append(Opportunity(pair, key, direction, value, strength, self.payout(pair), self.win_rate(pair, key)))
+
+        opportunities.sort(key=lambda o: o.rank, reverse=True)
+        self.scans += 1
+        self.found += len(opportunities)
+        self.scan_times.append(time.perf_counter() - start)
+        return opportunities
+
+    def select(self, opportunities: Sequence[Opportunity], capacity: Optional[int] = None) -> List[Opportunity]:
+        """
+        Las `top_k` mejores, una por par, con rank >= min_rank. `capacity` (operaciones
+        que aún admite el OrderManager) limita además cuántas se eligen, para que las
+        mejores no compitan por el último hueco.
+        """
+        limit = self.top_k if capacity is None else min(self.top_k, capacity)
+        selected, pairs = [], set()
+        for opportunity in opportunities:
+            if len(selected) >= limit or opportunity.rank < self.min_rank:
+                break
+            if opportunity.pair not in pairs:
+                selected.append(opportunity)
+                pairs.add(opportunity.pair)
+        return selected
+
+    def on_opened(self, opportunity: Opportunity, entry_time: float):
+        """La oportunidad se operó: pasa a last_signal de su estrategia en ese par."""
+        self.last_signals[opportunity.strategy_key][opportunity.pair] = opportunity.signal
+        self.trade_times.append(entry_time)
+        self.routed += 1
+
+    # ----------------- Métricas -----------------
+    def stats(self) -> Dict[str, float]:
+        """Duración de los escaneos (ms), presupuestos superados y oportunidades."""
+        scan = np.array(self.scan_times) * 1e3
+        stack = np.array(self.stack_times) * 1e3
+        return {
+            "scans": self.scans,
+            "scan_mean_ms": float(scan.mean()) if len(scan) else 0.0,
+            "scan_p95_ms": float(np.percentile(scan, 95)) if len(scan) else 0.0,
+            "scan_max_ms": float(scan.max()) if len(scan) else 0.0,
+            "stack_mean_ms": float(stack.mean()) if len(stack) else 0.0,
+            "overruns": self.overruns,
+            "found": self.found,
+            "routed": self.routed,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"🔭 Escáner: {s['scans']} escaneos | media {s['scan_mean_ms']:.1f}ms (apilado {s['stack_mean_ms']:.1f}ms), "
+            f"p95 {s['scan_p95_ms']:.1f}ms, máx {s['scan_max_ms']:.1f}ms | {s['overruns']} presupuestos superados | "
+            f"{s['found']} oportunidades, {s['routed']} enrutadas"
+        )
+
+
+class ScannerRuntime(AsyncTradingRuntime):
+    """Runtime asyncio en modo escáner: solo las `top_k` mejores señales de cada vela se operan."""
+
+    def __init__(self, *args, top_k: int = DEFAULT_TOP_K, budget_ms: float = DEFAULT_BUDGET_MS,
+                 default_payout: float = DEFAULT_PAYOUT, min_rank: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scanner = OpportunityScanner(self.market, self.strategy_keys, self.num_candles, top_k=top_k,
+                                          budget_ms=budget_ms, default_payout=default_payout, min_rank=min_rank)
+        self.payouts_updated = 0.0
+        self.payout_task: Optional[asyncio.Future] = None  # refresco de payouts en segundo plano
+        self.position_strategies: Dict[Position, str] = {}
+
+    async def start(self):
+        """Carga el histórico de todos los pares y los payouts (sin estrategias por par).
+
+        Como en AsyncTradingRuntime, MarketData serializa get_candles salvo con
+        `thread_safe_api=True`.
+        """
+        await asyncio.gather(*(self.calls.call(self.market.subscribe, pair) for pair in self.pairs))
+        await self._refresh_payouts()
+        logger.info(f"🔭 Escáner: {len(self.pairs)} pares × estrategias {', '.join(self.strategy_keys)}, "
+                    f"las {self.scanner.top_k} mejores por vela ({self.num_candles} velas por par)")
+
+    async def run(self, max_candles: Optional[int] = None):
+        try:
+            await super().run(max_candles)
+        finally:
+            await self._cancel_payouts()
+
+    def stop(self):
+        super().stop()
+        if self.payout_task is not None:
+            self.payout_task.cancel()
+
+    async def _cancel_payouts(self):
+        """Cancela el refresco de payouts pendiente y espera a que termine."""
+        task, self.payout_task = self.payout_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _refresh_payouts(self):
+        self.payouts_updated = time.time()
+        try:
+            self.scanner.update_payouts(await self.calls.call(self.api.get_all_profit))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron leer los payouts: {e}")
+
+    async def on_tick(self, tick) -> bool:
+        """Escanea la vela recién cerrada de todos los pares y opera las mejores señales."""
+        start = time.perf_counter()
+        for position in self.orders.settled():
+            strategy_key = self.position_strategies.pop(position, None)
+            if strategy_key is not None:
+                self.scanner.record_result(position.pair, strategy_key, position.result)
+
+        current_hour = datetime.fromtimestamp(tick.target).hour
+        if not await self._within_limits(current_hour):
+            return False
+        refreshing = self.payout_task is not None and not self.payout_task.done()
+        if not refreshing and time.time() - self.payouts_updated > PAYOUT_REFRESH:
+            # En segundo plano: no cuenta para la latencia
+            self.payout_task = asyncio.ensure_future(self._refresh_payouts())
+
+        events = await self.calls.call(self.market.poll)
+        # Solo los pares que acaban de cerrar esta vela (los demás están cerrados o atrasados)
+        fresh = sorted({pair for pair, bar in events if bar.time == tick.boundary - self.candle_duration})
+        opportunities = self.scanner.scan(fresh, current_hour)
+        # Las que los límites de exposición rechazarían dejan sitio a las siguientes
+        selected = self.scanner.select([o for o in opportunities if self.orders.can_open(o.pair, self.amount)[0]],
+                                       capacity=self.orders.capacity(self.amount))
+        for opportunity in selected:
+            logger.info(f"📊 Oportunidad: {opportunity}")
+        await self._settle_purchases(start, [asyncio.ensure_future(self._route(opportunity)) for opportunity in selected])
+        return True
+
+    async def _route(self, opportunity: Opportunity):
+        try:
+            position = await self.calls.call(self.orders.open, opportunity.pair, opportunity.direction,
+                                             self.amount, self.duration, signal=opportunity.signal)
+        except Exception as e:
+            logger.error(f"⚠️ Error al ejecutar orden en {opportunity.pair}: {e}")
+            return
+        if position:
+            self.position_strategies[position] = opportunity.strategy_key
+            self.scanner.on_opened(opportunity, position.entry_time)
+
+    def log_stats(self):
+        super().log_stats()
+        self.scanner.log_stats()
@@ -0,0 +1,237 @@
+# utils/order_manager.py
+"""
+Operaciones abiertas sin bloquear el bucle en vivo.
+
+Antes, tras `API.buy` el bot dormía `DURATION * 60 + 5` segundos y llamaba a
+`check_win_v3`: no veía ninguna vela durante el vencimiento y solo podía tener una
+operación en curso. `OrderManager` registra cada operación abierta y la resuelve en
+segundo plano:
+
+    orders = OrderManager(API, max_open=3, max_per_pair=1)
+    position = orders.open(PAIR, "call", AMOUNT, DURATION, signal=signal_res)
+    ...
+    for position in orders.settled():      # en el hilo del bucle, cada vela
+        strategy.on_trade_result(position.trade())
+
+- Un hilo del pool (uno por operación abierta como máximo) espera al vencimiento,
+  llama a `check_win_v3` y registra el resultado con `log_trade`.
+- `settled()` devuelve las operaciones ya resueltas desde la última llamada, para
+  que el estado de la estrategia solo se toque desde el bucle.
+- Límites de exposición: operaciones abiertas a la vez (`max_open`), por par
+  (`max_per_pair`) e importe total en juego (`max_exposure`). `open` no compra si
+  se superaría alguno.
+- `open` comprueba los límites y reserva el hueco con una Position pendiente bajo
+  el lock de estado, y compra fuera de él: una compra en vuelo no bloquea
+  `exposure`, `can_open` ni la resolución de otras operaciones, y nunca se pasan
+  los límites. Si la compra falla, se libera la reserva.
+- iqoptionapi comparte el estado de respuesta de `buy` entre hilos, así que por
+  defecto las llamadas al broker se hacen de una en una (`thread_safe_api=False`,
+  como en utils/history_downloader.py); solo con una API segura entre hilos van en
+  paralelo.
+"""
+import itertools
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import setup_logger
+from utils.trade_logger import log_trade
+
+logger = setup_logger()
+
+DEFAULT_MAX_OPEN = 3
+DEFAULT_MAX_PER_PAIR = 2
+RESOLVE_GRACE = 5  # segundos tras el vencimiento antes de pedir el resultado
+
+
+class Position:
+    """Operación abierta (o ya resuelta)."""
+
+    __slots__ = ("order_id", "pair", "direction", "amount", "duration", "signal", "entry_time", "expiry", "profit", "result")
+
+    def __init__(self, order_id, pair: str, direction: str, amount: float, duration: int, signal: Any, entry_time: float):
+        self.order_id = order_id
+        self.pair = pair
+        self.direction = direction
+        self.amount = amount
+        self.duration = duration  # minutos
+        self.signal = signal
+        self.entry_time = entry_time
+        self.expiry = entry_time + duration * 60
+        self.profit: Optional[float] = None
+        self.result: Optional[str] = None  # "win" / "loss" / "draw" / None si no se pudo resolver
+
+    def trade(self) -> Dict[str, Any]:
+        """Formato de Strategy.on_trade_result."""
+        return {"signal": self.signal, "result": self.result, "entry_time": self.entry_time}
+
+    def __repr__(self) -> str:
+        return f"Position({self.order_id}, {self.pair} {self.direction} {self.amount}, result={self.result})"
+
+
+def result_from_profit(profit: float) -> str:
+    """Resultado "win" / "loss" / "draw" según el profit de check_win_v3."""
+    if profit > 0:
+        return "win"
+    if profit < 0:
+        return "loss"
+    return "draw"
+
+
+class OrderManager:
+    """Abre operaciones y las resuelve en segundo plano con límites de exposición."""
+
+    def __init__(
+        self,
+        api,
+        max_open: int = DEFAULT_MAX_OPEN,
+        max_per_pair: int = DEFAULT_MAX_PER_PAIR,
+        max_exposure: Optional[float] = None,
+        resolve_grace: float = RESOLVE_GRACE,
+        trade_logger: Callable[[Dict[str, Any]], None] = log_trade,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        thread_safe_api: bool = False,
+    ):
+        """
+        Args:
+            api: IQ_Option (o FakeIQOption) con buy y check_win_v3.
+            max_open: operaciones abiertas a la vez como máximo.
+            max_per_pair: operaciones abiertas a la vez en un mismo par.
+            max_exposure: importe total en juego como máximo (None: sin límite).
+            trade_logger: función que registra cada operación resuelta (log_trade).
+            clock / sleep: reloj y espera de los hilos (inyectables para la simulación).
+            thread_safe_api: compras en paralelo; por defecto `buy` se serializa.
+        """
+        self.api = api
+        self.max_open = max_open
+        self.max_per_pair = max_per_pair
+        self.max_exposure = max_exposure
+        self.resolve_grace = resolve_grace
+        self.trade_logger = trade_logger
+        self.clock = clock
+        self.sleep = sleep
+        self.positions: Dict[Any, Position] = {}
+        self._lock = threading.Lock()
+        self._api_lock = None if thread_safe_api else threading.Lock()
+        self._settled: "queue.Queue[Position]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_open, thread_name_prefix="orders")
+        self._local_ids = itertools.count(1)
+
+    # ----------------- Exposición -----------------
+    @property
+    def open_count(self) -> int:
+        return len(self.positions)
+
+    @property
+    def exposure(self) -> float:
+        with self._lock:
+            return sum(p.amount for p in self.positions.values())
+
+    def can_open(self, pair: str, amount: float) -> Tuple[bool, str]:
+        """Si se puede abrir otra operación de `amount` en `pair` y, si no, por qué."""
+        with self._lock:
+            open_positions = list(self.positions.values())
+        return self._check_limits(open_positions, pair, amount)
+
+    def capacity(self, amount: float) -> int:
+        """Operaciones de `amount` que aún caben en `max_open` y `max_exposure` (sin el límite por par)."""
+        with self._lock:
+            open_positions = list(self.positions.values())
+        slots = self.max_open - len(open_positions)
+        if self.max_exposure is not None and amount > 0:
+            room = self.max_exposure - sum(p.amount for p in open_positions)
+            slots = min(slots, int(room // amount))
+        return max(slots, 0)
+
+    def _check_limits(self, open_positions: List[Position], pair: str, amount: float) -> Tuple[bool, str]:
+        if len(open_positions) >= self.max_open:
+            return False, f"{len(open_positions)} operaciones abiertas (máximo {self.max_open})"
+        in_pair = sum(1 for p in open_positions if p.pair == pair)
+        if in_pair >= self.max_per_pair:
+            return False, f"{in_pair} operaciones abiertas en {pair} (máximo {self.max_per_pair})"
+        exposure = sum(p.amount for p in open_positions)
+        if self.max_exposure is not None and exposure + amount > self.max_exposure:
+            return False, f"exposición {exposure + amount:.2f} > {self.max_exposure:.2f}"
+        return True, ""
+
+    # ----------------- Operaciones -----------------
+    def open(self, pair: str, direction: str, amount: float, duration: int, signal: Any = None) -> Optional[Position]:
+        """Compra y programa la resolución. Devuelve la Position o None si no se abrió."""
+        entry_time = self.clock()
+        position = Position(None, pair, direction, amount, duration, signal, entry_time)
+        with self._lock:
+            allowed, reason = self._check_limits(list(self.positions.values()), pair, amount)
+            if allowed:
+                # Reserva del hueco mientras la compra está en vuelo
+                pending = f"pending-{next(self._local_ids)}"
+                self.positions[pending] = position
+        if not allowed:
+            logger.info(f"🚧 Operación en {pair} omitida por límite de exposición: {reason}")
+            return None
+
+        try:
+            with self._api_lock or nullcontext():
+                status, order_id = self.api.buy(amount, pair, direction, duration)
+        except Exception:
+            with self._lock:
+                self.positions.pop(pending, None)
+            raise
+        with self._lock:
+            self.positions.pop(pending, None)
+            if not status:
+                position = None
+            else:
+                position.order_id = order_id
+                # Sin ID del broker se usa uno local para no pisar otra operación
+                key = order_id if order_id is not None else f"local-{next(self._local_ids)}"
+                self.positions[key] = position
+        if position is None:
+            logger.warning(f"❌ Falló la ejecución de la orden en {pair}: {order_id}")
+            return None
+        logger.info(f"✅ Orden ejecutada | ID: {order_id} | {pair} {direction.upper()} {amount} | "
+                    f"{self.open_count} abiertas, exposición {self.exposure:.2f}")
+        self._executor.submit(self._resolve, key, position)
+        return position
+
+    def _resolve(self, key, position: Position):
+        """Hilo del pool: espera al vencimiento y registra el resultado."""
+        try:
+            remaining = position.expiry + self.resolve_grace - self.clock()
+            while remaining > 0:
+                self.sleep(remaining)
+                remaining = position.expiry + self.resolve_grace - self.clock()
+            position.profit = self.api.check_win_v3(position.order_id)
+            position.result = result_from_profit(position.profit)
+            if position.result == "win":
+                logger.info(f"🏆 Operación GANADA | {position.pair} | Profit: +{position.profit:.2f}")
+            elif position.result == "loss":
+                logger.info(f"💀 Operación PERDIDA | {position.pair} | Pérdida: {position.profit:.2f}")
+            else:
+                logger.warning(f"⚠️ Resultado neutro | {position.pair} | Profit: {position.profit:.2f}")
+            signal = position.signal if isinstance(position.signal, dict) else {"signal": position.signal}
+            self.trade_logger({**signal, "result": position.result})
+        except Exception as e:
+            logger.error(f"⚠️ Error al resolver la operación {position.order_id}: {e}")
+        finally:
+            with self._lock:
+                self.positions.pop(key, None)
+            self._settled.put(position)
+
+    def settled(self) -> List[Position]:
+        """Operaciones resueltas desde la última llamada (result None si falló la resolución)."""
+        positions = []
+        while True:
+            try:
+                positions.append(self._settled.get_nowait())
+            except queue.Empty:
+                return positions
+
+    def close(self, wait: bool = True):
+        """Deja de aceptar operaciones; con `wait`, espera a que se resuelvan las abiertas."""
+        if wait and self.positions:
+            logger.info(f"⏳ Esperando el resultado de {self.open_count} operaciones abiertas...")
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,169 @@
+# utils/outcomes.py
+"""
+Resultado de las operaciones de opciones binarias al vencimiento real.
+
+Cada señal entra al cierre de su vela (precio 'close') y vence `duration_minutes`
+minutos después, igual que `API.buy(AMOUNT, PAIR, direction, DURATION)` en main.py.
+El precio de vencimiento es el cierre de la vela que termina en el vencimiento (o,
+si falta esa vela, la última cotización anterior). Todas las señales se resuelven
+a la vez con np.searchsorted sobre los timestamps de las velas, sin bucles de Python.
+
+Reglas de empate (precio de vencimiento == precio de entrada):
+    "refund": se devuelve la inversión (P&L 0), como hace IQ Option.
+    "loss":   cuenta como pérdida.
+    "win":    cuenta como acierto.
+"""
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+from utils.vectorized import BUY, SELL
+
+WIN = 1
+LOSS = -1
+DRAW = 0
+UNRESOLVED = 2  # El histórico termina antes del vencimiento
+
+RESULT_LABELS = {WIN: "win", LOSS: "loss", DRAW: "draw", UNRESOLVED: None}
+DRAW_RULES = ("refund", "loss", "win")
+
+DEFAULT_PAYOUT = 0.8  # Beneficio por unidad invertida en una operación ganada
+DEFAULT_DRAW_RULE = "refund"
+
+ArrayLike = Union[np.ndarray, List, float, int]
+
+
+def candle_open_times(df: pd.DataFrame) -> np.ndarray:
+    """Timestamps Unix (segundos) de apertura de cada vela."""
+    if 'from' in df.columns:
+        return df['from'].to_numpy(dtype=np.int64)
+    return pd.DatetimeIndex(df.index).asi8 // 10**9
+
+
+def infer_candle_duration(open_times: np.ndarray) -> int:
+    """Duración de vela más frecuente (en segundos) según la separación entre velas."""
+    steps = np.diff(open_times)
+    steps = steps[steps > 0]
+    if not len(steps):
+        return 60
+    values, counts = np.unique(steps, return_counts=True)
+    return int(values[np.argmax(counts)])
+
+
+def resolve_outcomes(
+    open_times: np.ndarray,
+    close: np.ndarray,
+    positions: ArrayLike,
+    directions: ArrayLike,
+    duration_minutes: ArrayLike = 1,
+    candle_duration: int = 60,
+    payout: ArrayLike = DEFAULT_PAYOUT,
+    amount: ArrayLike = 1.0,
+    draw_rule: str = DEFAULT_DRAW_RULE,
+) -> Dict[str, np.ndarray]:
+    """
+    Resuelve todas las operaciones de una vez.
+
+    Args:
+        open_times, close: columnas de las velas (ordenadas por tiempo).
+        positions: posición de la vela de la señal (entrada a su cierre).
+        directions: BUY (call) / SELL (put) por operación.
+        duration_minutes, payout, amount: escalar o un valor por operación.
+        draw_rule: "refund", "loss" o "win".
+
+    Returns:
+        dict de arrays: exit_position (-1 si no se resuelve), entry_price, exit_price,
+        expiry (timestamp de vencimiento), result (WIN/LOSS/DRAW/UNRESOLVED) y pnl
+        (NaN si no se resuelve).
+    """
+    if draw_rule not in DRAW_RULES:
+        raise ValueError(f"Regla de empate no válida: {draw_rule}. Opciones: {', '.join(DRAW_RULES)}")
+
+    open_times = np.asarray(open_times, dtype=np.int64)
+    close = np.asarray(close, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.int64)
+    directions = np.asarray(directions, dtype=np.int8)
+    durations = np.broadcast_to(np.asarray(duration_minutes, dtype=np.int64), positions.shape)
+    payout = np.broadcast_to(np.asarray(payout, dtype=np.float64), positions.shape)
+    amount = np.broadcast_to(np.asarray(amount, dtype=np.float64), positions.shape)
+
+    entry_price = close[positions]
+    expiry = open_times[positions] + candle_duration + durations * 60
+    # Vela que cierra en el vencimiento (o la última anterior si falta)
+    exit_position = np.searchsorted(open_times, expiry - candle_duration, side="right") - 1
+    last_open = open_times[-1] if len(open_times) else np.iinfo(np.int64).min
+    resolved = (expiry - candle_duration <= last_open) & (exit_position > positions)
+    exit_position = np.where(resolved, exit_position, -1)
+    exit_price = np.where(resolved, close[np.maximum(exit_position, 0)], np.nan)
+
+    move = (exit_price - entry_price) * np.where(directions == SELL, -1, 1)
+    draw_result = {"refund": DRAW, "loss": LOSS, "win": WIN}[draw_rule]
+    result = np.select([~resolved, move > 0, move < 0], [UNRESOLVED, WIN, LOSS], default=draw_result).astype(np.int8)
+
+    pnl = np.select([result == WIN, result == LOSS, result == DRAW], [amount * payout, -amount, 0.0], default=np.nan)
+    return {
+        'exit_position': exit_position,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'expiry': expiry,
+        'result': result,
+        'pnl': pnl,
+    }
+
+
+def summarize_outcomes(result: np.ndarray, pnl: np.ndarray) -> dict:
+    """Totales de un conjunto de operaciones resueltas."""
+    result = np.asarray(result)
+    wins = int(np.count_nonzero(result == WIN))
+    losses = int(np.count_nonzero(result == LOSS))
+    draws = int(np.count_nonzero(result == DRAW))
+    trades = wins + losses + draws
+    total_pnl = float(np.nansum(pnl))
+    return {
+        'trades': trades,
+        'wins': wins,
+        'losses': losses,
+        'draws': draws,
+        'unresolved': int(np.count_nonzero(result == UNRESOLVED)),
+        'win_rate': round(wins / trades * 100, 2) if trades else 0.0,
+        'pnl': round(total_pnl, 2),
+        'pnl_per_trade': round(total_pnl / trades, 4) if trades else 0.0,
+    }
+
+
+def score_signals(
+    signals: List[dict],
+    df: pd.DataFrame,
+    duration: int = 1,
+    payout: float = DEFAULT_PAYOUT,
+    amount: float = 1.0,
+    draw_rule: str = DEFAULT_DRAW_RULE,
+    candle_duration: Optional[int] = None,
+) -> dict:
+    """
+    Resuelve las señales del backtest (run_incremental / run_vectorized) a su vencimiento.
+
+    La duración de cada operación es `duration` salvo que la señal traiga su propia
+    'duration_minutes' (self_adjusting_v3). Añade a cada señal 'result'
+    ("win"/"loss"/"draw"/None), 'exit_price' y 'pnl', y devuelve el resumen.
+    """
+    open_times = candle_open_times(df)
+    candle_duration = candle_duration or infer_candle_duration(open_times)
+
+    positions = np.fromiter((s['position'] for s in signals), dtype=np.int64, count=len(signals))
+    directions = np.fromiter((BUY if s['signal'] == "CALL" else SELL for s in signals), dtype=np.int8, count=len(signals))
+    durations = np.fromiter(
+        (int((s['raw'] if isinstance(s['raw'], dict) else {}).get('duration_minutes') or duration) for s in signals),
+        dtype=np.int64,
+        count=len(signals),
+    )
+
+    outcomes = resolve_outcomes(
+        open_times, df['close'].to_numpy(), positions, directions, durations,
+        candle_duration=candle_duration, payout=payout, amount=amount, draw_rule=draw_rule,
+    )
+    for s, result, exit_price, pnl in zip(signals, outcomes['result'].tolist(), outcomes['exit_price'].tolist(), outcomes['pnl'].tolist()):
+        s['result'] = RESULT_LABELS[result]
+        s['exit_price'] = exit_price
+        s['pnl'] = pnl
+    return summarize_outcomes(outcomes['result'], outcomes['pnl'])
@@ -0,0 +1,122 @@
+# utils/risk_engine.py
+"""
+Motor de riesgo Monte Carlo / bootstrap.
+
+Remuestrea con reemplazo el P&L de operaciones reales (trade_history.csv) o de un
+backtest para generar decenas de miles de secuencias posibles y estimar:
+
+- la probabilidad de tocar STOP_LOSS antes que STOP_WIN,
+- la distribución del drawdown máximo,
+- el riesgo de ruina (saldo insuficiente para abrir otra operación de AMOUNT).
+
+Todas las trayectorias de un lote se simulan a la vez (matriz trayectorias ×
+operaciones + np.cumsum); los lotes limitan la memoria usada.
+"""
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from utils.outcomes import DEFAULT_PAYOUT
+
+DEFAULT_PATHS = 100_000
+DEFAULT_BATCH_SIZE = 20_000
+DRAWDOWN_PERCENTILES = (50, 90, 95, 99)
+
+
+def pnl_from_results(results, amount: float = 1.0, payout: float = DEFAULT_PAYOUT) -> np.ndarray:
+    """Convierte resultados "win"/"loss"/"draw" en P&L por operación."""
+    results = pd.Series(results).astype(str).str.lower()
+    return np.select([results == "win", results == "loss"], [amount * payout, -amount], default=0.0)
+
+
+def load_trade_history(path: str = "trade_history.csv", amount: float = 1.0, payout: float = DEFAULT_PAYOUT) -> np.ndarray:
+    """P&L de las operaciones registradas por utils/trade_logger.log_trade."""
+    df = pd.read_csv(path)
+    return pnl_from_results(df['result'], amount, payout)
+
+
+def pnl_from_signals(signals: List[dict]) -> np.ndarray:
+    """P&L de las señales de un backtest ya resueltas (outcomes.score_signals)."""
+    pnl = np.array([s.get('pnl', np.nan) for s in signals], dtype=np.float64)
+    return pnl[~np.isnan(pnl)]
+
+
+def _first_hit(mask: np.ndarray) -> np.ndarray:
+    """Primera columna True de cada fila (o el nº de columnas si no hay ninguna)."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+
+def simulate_risk(
+    pnl: np.ndarray,
+    stop_win: float,
+    stop_loss: float,
+    amount: float = 1.0,
+    balance: Optional[float] = None,
+    n_trades: Optional[int] = None,
+    n_paths: int = DEFAULT_PATHS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    seed: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    Simula `n_paths` secuencias de `n_trades` operaciones remuestreadas de `pnl`.
+
+    Args:
+        pnl: P&L de las operaciones observadas.
+        stop_win, stop_loss: objetivos de la sesión (como en settings.json).
+        amount: inversión por operación (para el riesgo de ruina).
+        balance: saldo inicial; por defecto STOP_LOSS (la sesión entera como capital).
+        n_trades: longitud de cada secuencia; por defecto el nº de operaciones observadas.
+
+    Returns:
+        dict con las probabilidades de cada stop, el riesgo de ruina y los
+        percentiles del drawdown máximo.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    pnl = pnl[~np.isnan(pnl)]
+    if not len(pnl):
+        raise ValueError("No hay operaciones para simular.")
+
+    balance = stop_loss if balance is None else balance
+    n_trades = n_trades or len(pnl)
+    rng = np.random.default_rng(seed)
+
+    counts = {"stop_loss_first": 0, "stop_win_first": 0, "ruin": 0}
+    max_drawdowns = np.empty(n_paths)
+    final_pnl = np.empty(n_paths)
+
+    for start in range(0, n_paths, batch_size):
+        rows = min(batch_size, n_paths - start)
+        paths = np.cumsum(pnl[rng.integers(0, len(pnl), size=(rows, n_trades))], axis=1)
+
+        loss_at = _first_hit(paths <= -stop_loss)
+        win_at = _first_hit(paths >= stop_win)
+        counts["stop_loss_first"] += int(np.count_nonzero(loss_at < win_at))
+        counts["stop_win_first"] += int(np.count_nonzero(win_at < loss_at))
+        counts["ruin"] += int(np.count_nonzero(balance + paths.min(axis=1) < amount))
+
+        peak = np.maximum(np.maximum.accumulate(paths, axis=1), 0.0)  # el saldo inicial cuenta como máximo
+        max_drawdowns[start:start + rows] = (peak - paths).max(axis=1)
+        final_pnl[start:start + rows] = paths[:, -1]
+
+    return {
+        "paths": n_paths,
+        "trades_per_path": n_trades,
+        "p_stop_loss_first": counts["stop_loss_first"] / n_paths,
+        "p_stop_win_first": counts["stop_win_first"] / n_paths,
+        "p_no_stop": 1 - (counts["stop_loss_first"] + counts["stop_win_first"]) / n_paths,
+        "risk_of_ruin": counts["ruin"] / n_paths,
+        "expected_pnl": float(final_pnl.mean()),
+        "max_drawdown_mean": float(max_drawdowns.mean()),
+        **{f"max_drawdown_p{p}": float(v) for p, v in zip(DRAWDOWN_PERCENTILES, np.percentile(max_drawdowns, DRAWDOWN_PERCENTILES))},
+    }
+
+
+def format_risk(risk: Dict[str, object]) -> str:
+    """Resumen legible del resultado de simulate_risk."""
+    return (
+        f"🎲 {risk['paths']:,} trayectorias de {risk['trades_per_path']} operaciones | "
+        f"P(Stop Loss antes que Stop Win): {risk['p_stop_loss_first']:.1%} | "
+        f"P(Stop Win primero): {risk['p_stop_win_first']:.1%} | "
+        f"Riesgo de ruina: {risk['risk_of_ruin']:.1%} | "
+        f"Drawdown máx. p95: {risk['max_drawdown_p95']:.2f}"
+    )
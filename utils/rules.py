@@ -0,0 +1,246 @@
+# utils/rules.py
+"""
+Lenguaje de reglas para las confirmaciones y scores de las estrategias.
+
+Las condiciones se escriben una sola vez como expresiones sobre columnas:
+
+    close, rsi = col('close'), col('rsi')
+    bullish = close > col('ema200') * (1 + EMA_NEUTRAL_MARGIN_PCT)
+
+    RULES = RuleSet(
+        groups={
+            "buy": [
+                Rule("pullback_buy", bullish & (rsi.prev() < 48) & (rsi >= 48), weight=1.3),
+                Rule("rsi_bull_zone", rsi > 50, weight=0.4, reason="rsi_in_bull_zone({rsi:.1f})"),
+            ],
+            "sell": [...],
+        },
+        values={"rsi": rsi, "bullish": bullish},
+    )
+
+y se evalúan con NumPy de dos formas a partir de la misma definición:
+
+- `RULES.evaluate(df)`: todas las velas (modo vectorizado / backtests).
+- `RULES.evaluate_last(df)`: solo las últimas filas que necesitan las expresiones
+  (`lookback`), para la versión vela a vela en vivo.
+
+`RULES.evaluate_arrays(columns)` evalúa arrays ya preparados; con arrays 2-D
+(pares × velas, utils/cross_section.py) las máscaras tienen una fila por par.
+
+Las dos devuelven un RuleResult con una matriz de máscaras por grupo (reglas × velas)
+y su vector de pesos: `score(grupo)` suma los pesos en el orden declarado (el mismo
+orden de sumas que tenían los scores escritos a mano), `count(grupo)` cuenta las
+confirmaciones y `fired` / `reasons` dicen qué reglas se cumplieron en una vela.
+"""
+import operator
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from utils.bar_view import column_arrays
+from utils.vectorized import shifted
+
+
+class _Env(dict):
+    """Columnas de la evaluación más los resultados ya calculados de cada expresión."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], shape: Tuple[int, ...]):
+        super().__init__(columns)
+        self.shape = shape
+        self.memo: Dict[int, Any] = {}
+
+
+class Expr:
+    """Expresión vectorial sobre las columnas de un DataFrame."""
+
+    __slots__ = ("func", "lookback", "columns")
+
+    def __init__(self, func: Callable[[_Env], Any], lookback: int = 0, columns: FrozenSet[str] = frozenset()):
+        self.func = func
+        self.lookback = lookback  # filas anteriores que necesita (por prev)
+        self.columns = columns
+
+    def __call__(self, env: _Env) -> Any:
+        key = id(self)
+        if key not in env.memo:
+            env.memo[key] = self.func(env)
+        return env.memo[key]
+
+    # ----------------- Construcción -----------------
+    def _apply(self, op: Callable, *others: Any) -> "Expr":
+        args = (self, *(as_expr(o) for o in others))
+        return Expr(
+            lambda env: op(*(a(env) for a in args)),
+            max(a.lookback for a in args),
+            frozenset().union(*(a.columns for a in args)),
+        )
+
+    def _reversed(self, op: Callable, other: Any) -> "Expr":
+        return as_expr(other)._apply(op, self)
+
+    def __add__(self, other): return self._apply(operator.add, other)
+    def __radd__(self, other): return self._reversed(operator.add, other)
+    def __sub__(self, other): return self._apply(operator.sub, other)
+    def __rsub__(self, other): return self._reversed(operator.sub, other)
+    def __mul__(self, other): return self._apply(operator.mul, other)
+    def __rmul__(self, other): return self._reversed(operator.mul, other)
+    def __truediv__(self, other): return self._apply(operator.truediv, other)
+    def __rtruediv__(self, other): return self._reversed(operator.truediv, other)
+    def __neg__(self): return self._apply(operator.neg)
+    def __abs__(self): return self._apply(np.abs)
+    def __lt__(self, other): return self._apply(operator.lt, other)
+    def __le__(self, other): return self._apply(operator.le, other)
+    def __gt__(self, other): return self._apply(operator.gt, other)
+    def __ge__(self, other): return self._apply(operator.ge, other)
+    def __and__(self, other): return self._apply(np.logical_and, other)
+    def __rand__(self, other): return self._reversed(np.logical_and, other)
+    def __or__(self, other): return self._apply(np.logical_or, other)
+    def __ror__(self, other): return self._reversed(np.logical_or, other)
+    def __invert__(self): return self._apply(np.logical_not)
+
+    def prev(self, periods: int = 1) -> "Expr":
+        """Valor de `periods` velas antes (NaN al principio), como Series.shift."""
+        return Expr(lambda env: shifted(np.asarray(self(env), dtype=np.float64), periods), self.lookback + periods, self.columns)
+
+    def fillna(self, other: Any) -> "Expr":
+        """`other` donde la expresión vale NaN."""
+        return self._apply(lambda a, b: np.where(np.isnan(a), b, a), other)
+
+
+def as_expr(value: Any) -> Expr:
+    """Convierte constantes en expresiones."""
+    if isinstance(value, Expr):
+        return value
+    return Expr(lambda env: value)
+
+
+def col(name: str, default: Any = None) -> Expr:
+    """Columna del DataFrame; `default` (expresión o constante) si no existe."""
+    if default is None:
+        return Expr(lambda env: env[name], columns=frozenset([name]))
+    fallback = as_expr(default)
+    return Expr(lambda env: env[name] if name in env else fallback(env), fallback.lookback, fallback.columns | {name})
+
+
+def maximum(a: Any, b: Any) -> Expr:
+    """Máximo elemento a elemento (como max() entre floats)."""
+    return as_expr(a)._apply(np.maximum, b)
+
+
+class Rule:
+    """
+    Condición con nombre dentro de un grupo.
+
+    `weight` es su aportación al score del grupo (negativo para penalizaciones) y
+    `reason` el texto que se registra cuando se cumple: por defecto el nombre; admite
+    campos de los `values` del RuleSet ("rsi_in_bull_zone({rsi:.1f})"); con
+    `report=False` la regla puntúa pero no aparece en las razones.
+    """
+
+    __slots__ = ("name", "condition", "weight", "reason", "report")
+
+    def __init__(self, name: str, condition: Expr, weight: float = 1.0, reason: Optional[str] = None, report: bool = True):
+        self.name = name
+        self.condition = condition
+        self.weight = weight
+        self.reason = reason or name
+        self.report = report
+
+
+class RuleSet:
+    """Grupos de reglas ("buy", "sell"...) y valores con nombre, evaluados juntos."""
+
+    def __init__(self, groups: Dict[str, Sequence[Rule]], values: Optional[Dict[str, Expr]] = None):
+        self.groups = {group: list(rules) for group, rules in groups.items()}
+        self.values = {name: as_expr(value) for name, value in (values or {}).items()}
+        self.weights = {group: np.array([rule.weight for rule in rules], dtype=np.float64) for group, rules in self.groups.items()}
+        expressions = [rule.condition for rules in self.groups.values() for rule in rules] + list(self.values.values())
+        self.lookback = max((e.lookback for e in expressions), default=0)
+        self.columns = sorted(frozenset().union(*(e.columns for e in expressions)))
+
+    def evaluate(self, df: pd.DataFrame) -> "RuleResult":
+        """Evalúa todas las velas de `df`."""
+        columns = {c: df[c].to_numpy(dtype=np.float64) for c in self.columns if c in df.columns}
+        return RuleResult(self, _Env(columns, (len(df),)))
+
+    def evaluate_last(self, df: pd.DataFrame) -> "RuleResult":
+        """Evalúa solo las últimas `lookback + 1` velas; el resultado de la última es el [-1]."""
+        arrays = column_arrays(df, self.lookback + 1)
+        columns = {c: np.asarray(arrays[c], dtype=np.float64) for c in self.columns if c in arrays}
+        return RuleResult(self, _Env(columns, (min(len(df), self.lookback + 1),)))
+
+    def evaluate_arrays(self, columns: Dict[str, np.ndarray], last: bool = False) -> "RuleResult":
+        """
+        Evalúa arrays con las velas en el último eje (1-D o pares × velas).
+        Con `last=True` solo las últimas `lookback + 1` velas, como evaluate_last.
+        """
+        span = slice(-(self.lookback + 1), None) if last else slice(None)
+        arrays = {c: np.asarray(columns[c], dtype=np.float64)[..., span] for c in self.columns if c in columns}
+        shape = next(iter(arrays.values())).shape
+        return RuleResult(self, _Env(arrays, shape))
+
+
+class _ValuesAt:
+    """Valores con nombre en una vela, para formatear las razones."""
+
+    def __init__(self, result: "RuleResult", i):
+        self.result = result
+        self.i = i
+
+    def __getitem__(self, name: str) -> Any:
+        return self.result[name][self.i]
+
+
+class RuleResult:
+    """Máscaras, scores y valores de un RuleSet evaluado."""
+
+    def __init__(self, ruleset: RuleSet, env: _Env):
+        self.ruleset = ruleset
+        self.shape = env.shape
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.masks = {
+                group: np.array([np.broadcast_to(rule.condition(env), env.shape) for rule in rules], dtype=bool)
+                .reshape((len(rules),) + env.shape)
+                for group, rules in ruleset.groups.items()
+            }
+            self.values = {name: np.broadcast_to(value(env), env.shape) for name, value in ruleset.values.items()}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.values[name]
+
+    def last(self) -> "RuleResult":
+        """Solo la última vela (en 2-D, la última vela de cada par)."""
+        result = RuleResult.__new__(RuleResult)
+        result.ruleset = self.ruleset
+        result.shape = self.shape[:-1]
+        result.masks = {group: masks[..., -1] for group, masks in self.masks.items()}
+        result.values = {name: values[..., -1] for name, values in self.values.items()}
+        return result
+
+    def mask(self, group: str, rule_name: str) -> np.ndarray:
+        names = [rule.name for rule in self.ruleset.groups[group]]
+        return self.masks[group][names.index(rule_name)]
+
+    def count(self, group: str) -> np.ndarray:
+        """Número de reglas del grupo que se cumplen en cada vela."""
+        return self.masks[group].sum(axis=0)
+
+    def score(self, group: str) -> np.ndarray:
+        """Suma de los pesos de las reglas cumplidas, en el orden en que se declararon."""
+        total = np.zeros(self.shape)
+        for weight, mask in zip(self.ruleset.weights[group], self.masks[group]):
+            total += np.where(mask, weight, 0.0)
+        return total
+
+    def fired(self, group: str, i) -> List[str]:
+        """Nombres de las reglas del grupo cumplidas en la vela `i` (o `(par, vela)` en 2-D)."""
+        return [rule.name for rule, mask in zip(self.ruleset.groups[group], self.masks[group]) if mask[i]]
+
+    def reasons(self, group: str, i) -> List[str]:
+        """Razones (formateadas) de las reglas cumplidas en la vela `i`."""
+        values = _ValuesAt(self, i)
+        return [
+            rule.reason.format_map(values)
+            for rule, mask in zip(self.ruleset.groups[group], self.masks[group])
+            if mask[i] and rule.report
+        ]
@@ -0,0 +1,156 @@
+# utils/session_simulator.py
+"""
+Simulación por sesiones diarias con las mismas reglas de parada que main.py.
+
+main.py opera hasta que el saldo llega a `saldo_inicial + STOP_WIN`, baja a
+`saldo_inicial - STOP_LOSS` o se alcanza END_HOUR. Aquí el histórico de operaciones
+del backtest se reparte en días y se aplican esas reglas a todos los días a la vez:
+
+    1. Se construye una matriz días × operaciones con el P&L de cada operación.
+    2. np.cumsum por filas da el saldo de la sesión tras cada operación.
+    3. La primera columna que toca STOP_WIN o STOP_LOSS marca el fin de la sesión;
+       las operaciones posteriores de ese día no se ejecutan.
+
+Las operaciones son las del backtest tal cual (una por señal, con el P&L de
+utils/outcomes.py, que ya incluye AMOUNT y el payout).
+"""
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+DEFAULT_END_HOUR = 20
+SECONDS_PER_DAY = 24 * 3600
+
+STOP_WIN = "stop_win"
+STOP_LOSS = "stop_loss"
+END_HOUR = "end_hour"
+
+
+def drawdown(equity: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Caída desde el máximo previo en cada punto de la curva de capital."""
+    return np.maximum.accumulate(equity, axis=axis) - equity
+
+
+def session_matrix(day_ids: np.ndarray, values: np.ndarray) -> tuple:
+    """
+    Reparte valores ordenados por tiempo en una matriz días × operaciones.
+
+    Returns:
+        tuple: (días únicos, matriz rellena con 0, máscara de celdas con operación).
+    """
+    days, first, counts = np.unique(day_ids, return_index=True, return_counts=True)
+    row = np.repeat(np.arange(len(days)), counts)
+    col = np.arange(len(day_ids)) - np.repeat(first, counts)
+
+    width = int(counts.max()) if len(counts) else 0
+    matrix = np.zeros((len(days), width))
+    mask = np.zeros((len(days), width), dtype=bool)
+    matrix[row, col] = values
+    mask[row, col] = True
+    return days, matrix, mask
+
+
+def simulate_sessions(
+    times: np.ndarray,
+    pnl: np.ndarray,
+    stop_win: float,
+    stop_loss: float,
+    end_hour: int = DEFAULT_END_HOUR,
+    start_hour: int = 0,
+    initial_balance: float = 0.0,
+) -> Dict[str, object]:
+    """
+    Aplica STOP_WIN / STOP_LOSS / END_HOUR a cada día de operaciones.
+
+    Args:
+        times: timestamps Unix (segundos) o datetime64 de entrada de cada operación.
+        pnl: resultado de cada operación (NaN = sin resolver, se descarta).
+        start_hour, end_hour: horario de la sesión [start_hour, end_hour).
+        initial_balance: saldo inicial de la curva de capital global.
+
+    Returns:
+        dict con:
+            'days': DataFrame por día (operaciones, P&L, motivo de cierre, drawdown).
+            'trades': DataFrame de las operaciones ejecutadas con el saldo de sesión.
+            'equity': Series del saldo acumulado al final de cada día.
+            'summary': resumen global.
+    """
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        times = times.astype("datetime64[s]").astype(np.int64)
+    times = times.astype(np.int64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+
+    order = np.argsort(times, kind="stable")
+    times, pnl = times[order], pnl[order]
+    hours = (times % SECONDS_PER_DAY) // 3600
+    in_session = (hours >= start_hour) & (hours < end_hour) & ~np.isnan(pnl)
+    times, pnl = times[in_session], pnl[in_session]
+
+    days, matrix, mask = session_matrix(times // SECONDS_PER_DAY, pnl)
+    balance = np.cumsum(matrix, axis=1)
+
+    # main.py comprueba el saldo antes de cada operación: la que toca el stop se
+    # ejecuta y las siguientes del día ya no
+    hit = mask & ((balance >= stop_win) | (balance <= -stop_loss))
+    has_stop = hit.any(axis=1)
+    last_col = np.where(has_stop, hit.argmax(axis=1), mask.sum(axis=1) - 1)
+    taken = mask & (np.arange(matrix.shape[1]) <= last_col[:, None])
+
+    day_pnl = np.where(taken, matrix, 0.0).sum(axis=1)
+    closing = balance[np.arange(len(days)), np.maximum(last_col, 0)] if matrix.size else np.zeros(len(days))
+    reason = np.where(has_stop, np.where(closing > 0, STOP_WIN, STOP_LOSS), END_HOUR)
+    # Drawdown dentro de la sesión, contando el saldo inicial (0) como primer máximo
+    session_curve = np.where(taken, balance, np.nan)
+    peak = np.fmax.accumulate(np.column_stack([np.zeros(len(days)), session_curve]), axis=1)[:, 1:]
+    day_drawdown = np.where(taken, peak - balance, 0.0).max(axis=1, initial=0.0)
+
+    day_index = pd.to_datetime(days * SECONDS_PER_DAY, unit="s")
+    days_df = pd.DataFrame({
+        "trades": taken.sum(axis=1),
+        "skipped": (mask & ~taken).sum(axis=1),
+        "wins": (taken & (matrix > 0)).sum(axis=1),
+        "losses": (taken & (matrix < 0)).sum(axis=1),
+        "pnl": day_pnl,
+        "max_drawdown": day_drawdown,
+        "reason": reason,
+    }, index=pd.DatetimeIndex(day_index, name="day"))
+
+    flat_taken = taken[mask]  # mismo orden que times/pnl
+    trades_df = pd.DataFrame({
+        "pnl": pnl[flat_taken],
+        "session_balance": balance[taken],
+    }, index=pd.DatetimeIndex(pd.to_datetime(times[flat_taken], unit="s"), name="time"))
+
+    equity = pd.Series(initial_balance + np.cumsum(day_pnl), index=days_df.index, name="equity")
+    trade_equity = np.r_[initial_balance, initial_balance + np.cumsum(trades_df["pnl"].to_numpy())]
+
+    summary = {
+        "days": len(days),
+        "stop_win_days": int(np.count_nonzero(reason == STOP_WIN)),
+        "stop_loss_days": int(np.count_nonzero(reason == STOP_LOSS)),
+        "end_hour_days": int(np.count_nonzero(reason == END_HOUR)),
+        "winning_days": int(np.count_nonzero(day_pnl > 0)),
+        "pnl": round(float(day_pnl.sum()), 2),
+        "avg_daily_pnl": round(float(day_pnl.mean()), 4) if len(days) else 0.0,
+        "max_drawdown": round(float(drawdown(trade_equity).max()), 2),
+        "max_daily_drawdown": round(float(day_drawdown.max()), 2) if len(days) else 0.0,
+        "skipped_trades": int(days_df["skipped"].sum()),
+    }
+    return {"days": days_df, "trades": trades_df, "equity": equity, "summary": summary}
+
+
+def simulate_signals(
+    signals: List[dict],
+    stop_win: float,
+    stop_loss: float,
+    end_hour: int = DEFAULT_END_HOUR,
+    start_hour: int = 0,
+    initial_balance: float = 0.0,
+) -> Optional[Dict[str, object]]:
+    """Atajo para las señales del backtest ya resueltas por outcomes.score_signals."""
+    if not signals:
+        return None
+    times = np.array([s['time'] for s in signals], dtype="datetime64[s]")
+    pnl = np.array([s['pnl'] for s in signals], dtype=np.float64)
+    return simulate_sessions(times, pnl, stop_win, stop_loss, end_hour, start_hour, initial_balance)
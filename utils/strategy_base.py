@@ -0,0 +1,183 @@
+# utils/strategy_base.py
+"""
+Estrategias con estado.
+
+Las estrategias del repositorio son funciones `(df, last_signal, current_hour)` que
+no recuerdan nada entre llamadas. `Strategy` guarda entre vela y vela lo que antes
+se reconstruía en cada vuelta:
+
+- las velas (utils/candle_buffer.py) y sus indicadores / temporalidades superiores,
+  actualizados en O(1) por vela (StreamingIndicators, TimeframeStream);
+- la última señal operada y las horas de entrada de las operaciones recientes.
+
+Ganchos:
+    warmup(history)         carga el histórico inicial (sin evaluar)
+    on_candle(bar)          incorpora una vela (nueva o en curso) y evalúa la estrategia
+    on_order_opened(trade)  registra una operación abierta (pasa a ser last_signal)
+    on_trade_result(trade)  registra una operación ya resuelta
+
+`FunctionStrategy` adapta las funciones existentes: pasa `last_trade_timestamp` y
+`trades_in_last_hour` a las que los aceptan (bb_rsi_otc_2). El backtest incremental
+(utils/backtest_engine.py) llama directamente a `evaluate` con ventanas del
+histórico ya calculado.
+
+Las estrategias con modo transversal (clave 'cross_section', sin TIMEFRAMES) se
+evalúan en `on_candle` sobre vistas de los arrays de velas e indicadores
+(`columns` → `evaluate_columns`), sin construir DataFrame: el coste por vela
+depende de `window` (las filas que usa la estrategia), no de `history`. Las demás
+reciben `frame()`, un DataFrame de todas las velas guardadas (O(history) por vela).
+"""
+import importlib
+import inspect
+import time
+from collections import deque
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from utils.candle_buffer import Bar, CandleBuffer
+from utils.cross_section import PRICE_COLUMNS, evaluate_columns
+from utils.lookback import strategy_window
+from utils.streaming_indicators import StreamingIndicators
+from utils.timeframes import TimeframeStream
+
+# Argumentos opcionales que algunas estrategias aceptan para limitar la frecuencia
+TRADE_CONTEXT = ("last_trade_timestamp", "trades_in_last_hour")
+
+
+class Strategy:
+    """Estrategia con estado: subclases implementan `evaluate`."""
+
+    name = "Estrategia"
+    INDICATORS: List[tuple] = []
+    TIMEFRAMES: Dict[int, List[tuple]] = {}
+    window = 300  # velas que recibe evaluate
+    columnar = False  # on_candle evalúa con evaluate_columns en lugar de evaluate
+
+    def __init__(self, history: Optional[int] = None, base_duration: int = 60, dtype=np.float64):
+        self.history = history or self.window
+        self.base_duration = base_duration
+        self.dtype = dtype
+        self.last_signal = None
+        self.trade_times = deque()  # hora de entrada de las operaciones de la última hora
+        self.reset()
+
+    def reset(self):
+        """Olvida las velas y los indicadores (no las operaciones)."""
+        self.candles = CandleBuffer(self.history, self.dtype, self.base_duration)
+        self.streaming_indicators = StreamingIndicators(self.INDICATORS, history=self.history)
+        self.timeframe_stream = TimeframeStream(self.TIMEFRAMES, history=self.history, base_duration=self.base_duration)
+
+    @property
+    def ready(self) -> bool:
+        return len(self.candles) > 0
+
+    # ----------------- Ganchos -----------------
+    def warmup(self, history: pd.DataFrame):
+        """Carga el histórico inicial y calcula sus indicadores."""
+        self.reset()
+        self.candles.load_frame(history)
+        self.frame()
+
+    def update(self, bar: Bar):
+        """Incorpora una vela sin evaluar la estrategia."""
+        self.candles.append(bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+    def on_candle(self, bar: Bar, current_hour: Optional[int] = None) -> Any:
+        """Incorpora una vela y devuelve la señal de la estrategia (o None)."""
+        self.update(bar)
+        if self.columnar:
+            return self.evaluate_columns(self.columns(), current_hour)
+        return self.evaluate(self.frame(), current_hour)
+
+    def on_order_opened(self, trade: Dict[str, Any]):
+        """Registra una operación abierta: {'signal', 'entry_time'}."""
+        self.last_signal = trade.get("signal")
+        self.trade_times.append(trade.get("entry_time", time.time()))
+        while self.trade_times and self.trade_times[0] < time.time() - 3600:
+            self.trade_times.popleft()
+
+    def on_trade_result(self, trade: Dict[str, Any]):
+        """
+        Registra una operación resuelta: {'signal', 'result', 'entry_time'}. Si no se
+        registró al abrirla, cuenta ahora como la última operación.
+        """
+        if trade.get("entry_time") not in self.trade_times:
+            self.on_order_opened(trade)
+
+    # ----------------- Evaluación -----------------
+    def frame(self) -> pd.DataFrame:
+        """DataFrame de las velas guardadas con indicadores y temporalidades superiores."""
+        df = self.streaming_indicators.sync(self.candles.to_frame())
+        return self.timeframe_stream.sync(df)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Últimas `window` velas (OHLC e indicadores) como vistas de los arrays, sin copiar."""
+        candles = self.candles
+        indicators = self.streaming_indicators.sync_arrays(*(candles.array(c) for c in ("from", "high", "low", "close")))
+        n = min(self.window, len(candles))
+        columns = {c: candles.array(c, n) for c in PRICE_COLUMNS}
+        columns.update((c, values[-n:]) for c, values in indicators.items())
+        return columns
+
+    def trade_context(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "last_trade_timestamp": self.trade_times[-1] if self.trade_times else None,
+            "trades_in_last_hour": sum(1 for t in self.trade_times if t >= now - 3600),
+        }
+
+    def evaluate(self, df: pd.DataFrame, current_hour: Optional[int] = None) -> Any:
+        """Señal para la última vela de `df` (con indicadores ya calculados)."""
+        raise NotImplementedError
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], current_hour: Optional[int] = None) -> Any:
+        """Como `evaluate`, con las columnas de `columns()` (estrategias con `columnar`)."""
+        raise NotImplementedError
+
+
+class FunctionStrategy(Strategy):
+    """Adaptador de una estrategia función `(df, last_signal, current_hour)`."""
+
+    def __init__(self, module: ModuleType, function: str, name: Optional[str] = None,
+                 cross_section_key: Optional[str] = None, **options):
+        """`cross_section_key`: clave de AVAILABLE_STRATEGIES con modo transversal (evaluate_columns)."""
+        self.module = module
+        self.function = getattr(module, function)
+        self.name = name or function
+        self.INDICATORS = getattr(module, "INDICATORS", [])
+        self.TIMEFRAMES = getattr(module, "TIMEFRAMES", {})
+        self.window = strategy_window(module)
+        parameters = inspect.signature(self.function).parameters
+        self.context_args = [arg for arg in TRADE_CONTEXT if arg in parameters]
+        self.cross_section_key = cross_section_key
+        self.columnar = cross_section_key is not None and not self.TIMEFRAMES
+        super().__init__(**options)
+
+    def _context(self) -> Dict[str, Any]:
+        context = self.trade_context() if self.context_args else {}
+        return {arg: context[arg] for arg in self.context_args}
+
+    def evaluate(self, df: pd.DataFrame, current_hour: Optional[int] = None) -> Any:
+        return self.function(df, self.last_signal, current_hour=current_hour, **self._context())
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], current_hour: Optional[int] = None) -> Any:
+        # Una fila (1 × velas): la misma decisión que la función, vía su modo transversal
+        rows = {c: values[np.newaxis] for c, values in columns.items()}
+        return evaluate_columns(self.cross_section_key, rows, [self.last_signal], current_hour, **self._context())[0]
+
+
+def load_strategy(strategy_key: str, **options) -> Strategy:
+    """
+    Instancia la estrategia registrada en AVAILABLE_STRATEGIES. Las entradas con
+    'class' usan esa clase del módulo; el resto se adapta con FunctionStrategy.
+    """
+    from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+    if "class" in strategy_info:
+        return getattr(module, strategy_info["class"])(**options)
+    cross_section_key = strategy_key if "cross_section" in strategy_info else None
+    return FunctionStrategy(module, strategy_info["function"], strategy_info["name"], cross_section_key, **options)
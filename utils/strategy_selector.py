@@ -3,46 +3,68 @@ import importlib
 # ----------------- ESTRATEGIAS DISPONIBLES -----------------
 # Centralizamos aquí todas las estrategias para que sean fáciles de gestionar.
 # La clave es la opción del menú, y el valor contiene el nombre, módulo y función.
+# 'vectorized' es la versión que evalúa todo el histórico de una vez (backtests).
+# 'class' (opcional) es una subclase de utils.strategy_base.Strategy; sin ella la
+# función se adapta con FunctionStrategy (ver load_strategy).
+# 'cross_section' (opcional) evalúa la última vela de muchos pares a la vez en arrays
+# pares × velas (ver utils/cross_section.py); 'strength' (opcional) da la fuerza de su
+# señal para ordenar oportunidades entre pares (utils/opportunity_scanner.py).
 AVAILABLE_STRATEGIES = {
     "1": {
         "name": "OTC1 (Original)",
         "module": "strategies.bb_rsi_otc",
         "function": "bb_rsi_otc_trend",
+        "vectorized": "bb_rsi_otc_trend_vectorized",
+        "cross_section": "bb_rsi_otc_trend_cross_section",
+        "strength": "bb_rsi_otc_trend_strength",
     },
     "2": {
         "name": "OTC Balanced (Focus 9-11h)",
         "module": "strategies.bb_rsi_otc_balanced",
         "function": "strategy_bb_rsi_otc_balanced_v2_focus",
+        "vectorized": "strategy_bb_rsi_otc_balanced_v2_focus_vectorized",
     },
     "3": {
         "name": "OTC2 (Más Entradas)",
         "module": "strategies.bb_rsi_otc_2",
         "function": "bb_rsi_otc_trend",
+        "vectorized": "bb_rsi_otc_trend_vectorized",
+        "cross_section": "bb_rsi_otc_trend_cross_section",
+        "strength": "bb_rsi_otc_trend_strength",
     },
     "4": {
         "name": "Real Trend v2 (Score-based)",
         "module": "strategies.bb_rsi_real_trend_v2",
         "function": "bb_rsi_real_trend_v2",
+        "vectorized": "bb_rsi_real_trend_v2_vectorized",
+        "cross_section": "bb_rsi_real_trend_v2_cross_section",
+        "strength": "bb_rsi_real_trend_v2_strength",
     },
     "5": {
         "name": "Normal Trend (Pullback)",
         "module": "strategies.bb_rsi_normal_trend",
         "function": "bb_rsi_normal_trend",
+        "vectorized": "bb_rsi_normal_trend_vectorized",
+        "cross_section": "bb_rsi_normal_trend_cross_section",
+        "strength": "bb_rsi_normal_trend_strength",
     },
     "6": {
         "name": "BOT v1 (Auto-Ajustable)",
         "module": "strategies.bot.self_adjusting_v1",
         "function": "self_adjusting_strategy_v1",
+        "vectorized": "self_adjusting_strategy_v1_vectorized",
     },
     "7": {
         "name": "BOT v2 (Ajustable Mejorado)",
         "module": "strategies.bot.self_adjusting_v2",
         "function": "self_adjusting_strategy_v2",
+        "vectorized": "self_adjusting_strategy_v2_vectorized",
     },
     "8": {
         "name": "BOT v3 (Duración Dinámica)",
         "module": "strategies.bot.self_adjusting_v3",
         "function": "self_adjusting_strategy_v3",
+        "vectorized": "self_adjusting_strategy_v3_vectorized",
     }
 }
 
@@ -0,0 +1,334 @@
+# utils/streaming_indicators.py
+"""
+Indicadores incrementales para el bucle en vivo (O(1) por vela).
+
+Cada indicador guarda su estado y se actualiza con una vela nueva sin recorrer la
+ventana completa. Sembrado con un histórico, da los mismos valores que las funciones
+de utils/indicators.py aplicadas a toda la serie desde la siembra:
+
+    EMA:          ewm(span=window, adjust=False)
+    WilderRSI:    ta RSIIndicator (medias ewm con alpha=1/window, min_periods=window)
+    Bollinger:    media y desviación (ddof=0) de las últimas `window` velas
+                  (diferencias de redondeo del orden de 1e-14)
+    ATR:          media de las últimas `window` True Range (min_periods=1)
+
+`update(...)` consolida una vela cerrada; `peek(...)` calcula el valor de la vela en
+curso sin modificar el estado (su cierre todavía cambia).
+
+`StreamingIndicators` mantiene los indicadores que declara una estrategia en su
+lista INDICATORS y rellena esas columnas en el DataFrame de velas de main.py, de
+modo que add_indicators de la estrategia ya no las recalcula. Los valores se guardan
+en arrays circulares como los de CandleBuffer (cada valor escrito dos veces), con un
+hueco más para el valor de la vela en curso: `sync_arrays` devuelve vistas sin
+copiar, así que el coste por vela no depende de `history`.
+"""
+import math
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+NAN = float("nan")
+
+
+class EMA:
+    """Media móvil exponencial (mismo cálculo que pandas ewm con adjust=False)."""
+
+    def __init__(self, window: int = None, alpha: float = None, min_periods: int = 0):
+        self.alpha = alpha if alpha is not None else 2 / (window + 1)
+        self.min_periods = min_periods
+        self.mean = NAN
+        self.count = 0
+
+    def _next(self, value: float) -> float:
+        if self.count == 0:
+            return value
+        # Mismo orden de operaciones que pandas para obtener cifras idénticas
+        old_weight = 1 - self.alpha
+        return (old_weight * self.mean + self.alpha * value) / (old_weight + self.alpha)
+
+    def _output(self, mean: float, count: int) -> float:
+        return mean if count >= max(self.min_periods, 1) else NAN
+
+    def peek(self, value: float) -> float:
+        return self._output(self._next(value), self.count + 1)
+
+    def update(self, value: float) -> float:
+        self.mean = self._next(value)
+        self.count += 1
+        return self._output(self.mean, self.count)
+
+    def seed(self, values: Sequence[float]) -> float:
+        result = NAN
+        for value in values:
+            result = self.update(value)
+        return result
+
+
+class WilderRSI:
+    """RSI de Wilder, equivalente a ta.momentum.RSIIndicator (fillna=False)."""
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.up = EMA(alpha=1 / window, min_periods=window)
+        self.down = EMA(alpha=1 / window, min_periods=window)
+        self.prev_close = None
+
+    def _moves(self, close: float) -> Tuple[float, float]:
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        return max(diff, 0.0), max(-diff, 0.0)
+
+    @staticmethod
+    def _rsi(up: float, down: float) -> float:
+        if math.isnan(up) or math.isnan(down):
+            return NAN
+        if down == 0:
+            return 100.0
+        return 100 - 100 / (1 + up / down)
+
+    def peek(self, close: float) -> float:
+        up, down = self._moves(close)
+        return self._rsi(self.up.peek(up), self.down.peek(down))
+
+    def update(self, close: float) -> float:
+        up, down = self._moves(close)
+        self.prev_close = close
+        return self._rsi(self.up.update(up), self.down.update(down))
+
+    def seed(self, closes: Sequence[float]) -> float:
+        result = NAN
+        for close in closes:
+            result = self.update(close)
+        return result
+
+
+class RollingMean:
+    """Media de las últimas `window` observaciones con suma compensada (Kahan)."""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+
+    @staticmethod
+    def _add(total: float, compensation: float, value: float) -> Tuple[float, float]:
+        y = value - compensation
+        t = total + y
+        return t, (t - total) - y
+
+    def _next(self, value: float) -> Tuple[float, float, int]:
+        # Como pandas: primero sale la observación más antigua y luego entra la nueva
+        total, compensation, count = self.total, self.compensation, len(self.values)
+        if count == self.window:
+            total, compensation = self._add(total, compensation, -self.values[0])
+            count -= 1
+        total, compensation = self._add(total, compensation, value)
+        return total, compensation, count + 1
+
+    def _output(self, total: float, count: int) -> float:
+        return total / count if count >= self.min_periods else NAN
+
+    def peek(self, value: float) -> float:
+        total, _, count = self._next(value)
+        return self._output(total, count)
+
+    def update(self, value: float) -> float:
+        self.total, self.compensation, count = self._next(value)
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self.values.popleft()
+        return self._output(self.total, count)
+
+
+class RollingVariance:
+    """Varianza poblacional (ddof=0) de las últimas `window` observaciones (Welford)."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.ssqdm = 0.0  # suma de cuadrados de las diferencias con la media
+
+    def _next(self, value: float) -> Tuple[float, float, int]:
+        mean, ssqdm, count = self.mean, self.ssqdm, len(self.values)
+        if count == self.window:
+            old = self.values[0]
+            count -= 1
+            if count:
+                delta = old - mean
+                mean -= delta / count
+                ssqdm -= (count + 1) * delta * delta / count
+            else:
+                mean, ssqdm = 0.0, 0.0
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        ssqdm += (count - 1) * delta * delta / count
+        return mean, max(ssqdm, 0.0), count
+
+    def _output(self, ssqdm: float, count: int) -> float:
+        return ssqdm / count if count >= self.window else NAN
+
+    def peek(self, value: float) -> float:
+        _, ssqdm, count = self._next(value)
+        return self._output(ssqdm, count)
+
+    def update(self, value: float) -> float:
+        self.mean, self.ssqdm, count = self._next(value)
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self.values.popleft()
+        return self._output(self.ssqdm, count)
+
+
+class BollingerBands:
+    """Bandas de Bollinger (media ± std_dev · desviación ddof=0), como ta.volatility."""
+
+    def __init__(self, window: int = 20, std_dev: float = 2):
+        self.std_dev = std_dev
+        self.mean = RollingMean(window)
+        self.variance = RollingVariance(window)
+
+    def _bands(self, mean: float, variance: float) -> Tuple[float, float]:
+        width = self.std_dev * math.sqrt(variance)
+        return mean + width, mean - width
+
+    def peek(self, close: float) -> Tuple[float, float]:
+        return self._bands(self.mean.peek(close), self.variance.peek(close))
+
+    def update(self, close: float) -> Tuple[float, float]:
+        return self._bands(self.mean.update(close), self.variance.update(close))
+
+
+class ATR:
+    """Average True Range: media simple de las últimas `window` True Range (min_periods=1)."""
+
+    def __init__(self, window: int = 14):
+        self.mean = RollingMean(window, min_periods=1)
+        self.prev_close = None
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        return self.mean.peek(self._true_range(high, low))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        value = self.mean.update(self._true_range(high, low))
+        self.prev_close = close
+        return value
+
+
+# Tipo de indicador → (clase, columnas de entrada)
+INDICATOR_TYPES = {
+    "ema": (EMA, ("close",)),
+    "rsi": (WilderRSI, ("close",)),
+    "bollinger": (BollingerBands, ("close",)),
+    "atr": (ATR, ("high", "low", "close")),
+}
+
+
+class StreamingIndicators:
+    """
+    Mantiene en streaming los indicadores declarados por una estrategia.
+
+    `specs` es la lista INDICATORS del módulo de la estrategia:
+        [("rsi", {"window": 14}, ("rsi",)),
+         ("bollinger", {"window": 20, "std_dev": 2}, ("bb_high", "bb_low")), ...]
+    """
+
+    def __init__(self, specs: List[tuple], history: int = 1000):
+        self.specs = specs
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.indicators = [(INDICATOR_TYPES[kind][0](**params), INDICATOR_TYPES[kind][1], columns) for kind, params, columns in self.specs]
+        # `history` velas consolidadas + el hueco de la vela en curso (peek)
+        self.capacity = self.history + 1
+        self.times = np.zeros(2 * self.capacity, dtype=np.int64)
+        self.values: Dict[str, np.ndarray] = {
+            c: np.full(2 * self.capacity, np.nan) for *_, columns in self.specs for c in columns
+        }
+        self.size = 0
+        self.head = 0  # hueco de la próxima vela consolidada (y de la vela en curso)
+        self.last_time = None      # última vela consolidada
+        self.pending_time = None   # vela en curso calculada con peek
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.values)
+
+    def _write(self, time: int, row: Dict[str, float]):
+        for position in (self.head, self.head + self.capacity):
+            self.times[position] = time
+            for column, value in row.items():
+                self.values[column][position] = value
+
+    def _commit(self, time: int, row: Dict[str, float]):
+        out = {}
+        for indicator, inputs, columns in self.indicators:
+            result = indicator.update(*(row[name] for name in inputs))
+            out.update(zip(columns, result if len(columns) > 1 else (result,)))
+        self._write(time, out)
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.history)
+        self.last_time = time
+        self.pending_time = None
+
+    def _peek(self, time: int, row: Dict[str, float]):
+        out = {}
+        for indicator, inputs, columns in self.indicators:
+            result = indicator.peek(*(row[name] for name in inputs))
+            out.update(zip(columns, result if len(columns) > 1 else (result,)))
+        self._write(time, out)  # en el hueco siguiente: no pisa ninguna vela consolidada
+        self.pending_time = time
+
+    def _view(self, n: int) -> Dict[str, np.ndarray]:
+        """Las últimas `n` velas (consolidadas y, si la hay, la en curso) como vistas."""
+        end = self.head + self.capacity + (self.pending_time is not None)
+        available = self.size + (self.pending_time is not None)
+        span = slice(end - min(n, available), end)
+        views = {column: values[span] for column, values in self.values.items()}
+        if n > available:
+            # Menos velas guardadas que pedidas (solo justo tras volver a sembrar)
+            views = {column: np.r_[np.full(n - available, np.nan), values] for column, values in views.items()}
+        return views
+
+    def sync_arrays(self, times: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Incorpora las velas nuevas (`times` y precios de las últimas velas, en orden) y
+        devuelve las columnas de indicadores alineadas con ellas. Todas las velas salvo
+        la última se consolidan; la última (en curso) se calcula con peek. En cada vela
+        solo se procesan las nuevas: el resultado son vistas de los arrays circulares.
+        """
+        n = len(times)
+        if self.last_time is not None and (times[0] > self.last_time or self.last_time > times[-1]):
+            # Hueco mayor que la ventana de velas o reinicio del histórico: volver a sembrar
+            self.reset()
+
+        inputs = {"high": high, "low": low, "close": close}
+        start = 0 if self.last_time is None else int(np.searchsorted(times, self.last_time, side="right"))
+        for i in range(start, n - 1):
+            self._commit(int(times[i]), {name: float(values[i]) for name, values in inputs.items()})
+        last_time = int(times[-1])
+        if last_time != self.last_time:
+            self._peek(last_time, {name: float(values[-1]) for name, values in inputs.items()})
+        return self._view(n)
+
+    def sync(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Incorpora las velas nuevas de `df` y devuelve una copia con las columnas de
+        indicadores rellenas (ver `sync_arrays`).
+        """
+        if not self.specs or df.empty:
+            return df.copy()
+        columns = self.sync_arrays(
+            df['from'].to_numpy(dtype=np.int64),
+            *(df[name].to_numpy(dtype=np.float64) for name in ("high", "low", "close")),
+        )
+        return df.assign(**columns)
@@ -0,0 +1,250 @@
+# utils/timeframes.py
+"""
+Velas de temporalidad superior (5m, 15m, 1h...) construidas a partir de las de 1 minuto.
+
+Las estrategias declaran en TIMEFRAMES qué temporalidades e indicadores necesitan:
+
+    TIMEFRAMES = {
+        5: [("ema", {"window": 20}, ("ema20",))],
+        15: [],
+    }
+
+y reciben, junto a cada vela base, las columnas de la última vela superior cerrada:
+`m5_open`, `m5_high`, `m5_low`, `m5_close`, `m5_volume`, `m5_ema20`, ... Una vela
+superior se considera cerrada cuando la vela base que la completa se ha cerrado (o
+cuando llega una vela de la siguiente); así el valor de cada fila solo depende de
+las velas hasta esa fila y el backtest no ve el futuro.
+
+- `add_timeframes` calcula las columnas sobre todo un histórico (backtests, almacén).
+- `TimeframeAggregator` / `TimeframeStream` las mantienen en el bucle en vivo con
+  coste O(1) por vela base (los indicadores se actualizan con
+  utils/streaming_indicators.py al cerrar cada vela superior).
+"""
+import copy
+from collections import deque
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from utils.indicator_planner import KERNELS
+from utils.streaming_indicators import INDICATOR_TYPES
+from utils.historical_data import load_historical_data
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+def timeframe_prefix(minutes: int) -> str:
+    return f"m{minutes}_"
+
+
+def timeframe_columns(minutes: int, specs: List[tuple]) -> List[str]:
+    """Columnas que añade una temporalidad: OHLCV más los indicadores declarados."""
+    prefix = timeframe_prefix(minutes)
+    return [prefix + c for c in OHLCV] + [prefix + c for *_, columns in specs for c in columns]
+
+
+def all_timeframe_columns(timeframes: Dict[int, List[tuple]]) -> List[str]:
+    """Todas las columnas que añade un diccionario TIMEFRAMES."""
+    return [c for minutes, specs in timeframes.items() for c in timeframe_columns(minutes, specs)]
+
+
+def _base_times(df: pd.DataFrame) -> np.ndarray:
+    """Timestamp Unix (segundos) de apertura de cada vela base."""
+    if 'from' in df.columns:
+        return df['from'].to_numpy(dtype=np.int64)
+    index = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.DatetimeIndex(df['time'])
+    return index.asi8 // 10**9
+
+
+def aggregate_candles(df: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    """
+    Agrupa velas base en velas de `minutes` minutos (alineadas al reloj, como IQ Option).
+    Devuelve todas las velas, incluida la última aunque esté incompleta.
+    """
+    period = minutes * 60
+    times = _base_times(df)
+    if len(times) == 0:
+        return pd.DataFrame(columns=['from', *OHLCV])
+    buckets = times // period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+    volume = df['volume'].to_numpy(dtype=np.float64) if 'volume' in df.columns else np.zeros(len(times))
+    bars = pd.DataFrame({
+        'from': buckets[starts] * period,
+        'open': df['open'].to_numpy(dtype=np.float64)[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(dtype=np.float64), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(dtype=np.float64), starts),
+        'close': df['close'].to_numpy(dtype=np.float64)[ends],
+        'volume': np.add.reduceat(volume, starts),
+    })
+    bars.index = pd.DatetimeIndex(pd.to_datetime(bars['from'], unit='s'), name='time')
+    return bars
+
+
+def load_timeframe(pair: str, minutes: int, num_candles: Optional[int] = None, base_duration: int = 60) -> Optional[pd.DataFrame]:
+    """Velas de `minutes` minutos de un par, agregadas desde el almacén de velas base."""
+    base = load_historical_data(pair, base_duration)
+    if base is None:
+        return None
+    bars = aggregate_candles(base, minutes)
+    return bars if num_candles is None else bars.tail(num_candles)
+
+
+def add_timeframes(df: pd.DataFrame, timeframes: Dict[int, List[tuple]], base_duration: int = 60) -> pd.DataFrame:
+    """Copia de `df` con las columnas de cada temporalidad superior (última vela cerrada)."""
+    times = _base_times(df)
+    positions = np.arange(len(times))
+    columns = {}
+    for minutes, specs in timeframes.items():
+        period = minutes * 60
+        buckets = times // period
+        bars = aggregate_candles(df, minutes)
+        # Fila en la que se cierra cada vela superior: su última vela base si completa el
+        # periodo; si no (faltan velas), la siguiente vela base, que ya es de otro grupo
+        last_rows = np.flatnonzero(np.r_[buckets[1:] != buckets[:-1], True]) if len(times) else np.array([], dtype=int)
+        completes = times[last_rows] + base_duration >= (buckets[last_rows] + 1) * period
+        close_rows = np.where(completes, last_rows, last_rows + 1)
+        is_closed = close_rows < len(times)
+        bars, close_rows = bars[is_closed], close_rows[is_closed]
+        # Índice de la última vela superior cerrada en cada fila (-1 si todavía ninguna)
+        latest = np.searchsorted(close_rows, positions, side="right") - 1
+        has_bar = latest >= 0
+
+        values = {c: bars[c].to_numpy(dtype=np.float64) for c in OHLCV}
+        for kind, params, names in specs:
+            values.update(zip(names, KERNELS[kind](values['high'], values['low'], values['close'], **params)))
+
+        prefix = timeframe_prefix(minutes)
+        for name, series in values.items():
+            out = np.full(len(times), np.nan)
+            out[has_bar] = series[latest[has_bar]]
+            columns[prefix + name] = out
+    return df.assign(**columns)
+
+
+class TimeframeAggregator:
+    """
+    Construye velas de `minutes` minutos vela a vela y mantiene sus indicadores.
+
+    `update` recibe cada vela base cerrada (O(1)); `values` contiene las columnas de
+    la última vela superior cerrada (mismos nombres sin prefijo que add_timeframes).
+    """
+
+    def __init__(self, minutes: int, specs: List[tuple] = (), base_duration: int = 60):
+        self.minutes = minutes
+        self.period = minutes * 60
+        self.base_duration = base_duration
+        self.specs = list(specs)
+        self.indicators = [(INDICATOR_TYPES[kind][0](**params), INDICATOR_TYPES[kind][1], names) for kind, params, names in self.specs]
+        self.bar: Optional[Dict[str, float]] = None  # vela superior en construcción
+        self.values: Dict[str, float] = dict.fromkeys([*OHLCV, *(c for *_, names in self.specs for c in names)], np.nan)
+
+    def _bar_values(self, bar: Dict[str, float], peek: bool = False) -> Dict[str, float]:
+        """Columnas de `bar` cerrada; con `peek`, sin consolidar los indicadores."""
+        values = {c: bar[c] for c in OHLCV}
+        for indicator, inputs, names in self.indicators:
+            step = indicator.peek if peek else indicator.update
+            result = step(*(bar[name] for name in inputs))
+            values.update(zip(names, result if len(names) > 1 else (result,)))
+        return values
+
+    def _close_bar(self):
+        bar, self.bar = self.bar, None
+        self.values = self._bar_values(bar)
+        return self.values
+
+    def _merge(self, bucket: int, open: float, high: float, low: float, close: float, volume: float) -> Dict[str, float]:
+        """Vela superior en construcción con la vela base añadida (nueva si cambia el grupo)."""
+        bar = self.bar
+        if bar is None or bucket != bar['bucket']:
+            return {'bucket': bucket, 'from': bucket * self.period, 'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume}
+        return dict(bar, high=max(bar['high'], high), low=min(bar['low'], low), close=close, volume=bar['volume'] + volume)
+
+    def _completes(self, time: int, bucket: int) -> bool:
+        return time + self.base_duration >= (bucket + 1) * self.period
+
+    def update(self, time: int, open: float, high: float, low: float, close: float, volume: float = 0.0) -> Optional[Dict[str, float]]:
+        """Incorpora una vela base cerrada. Devuelve la vela superior si se ha cerrado."""
+        closed = None
+        bucket = time // self.period
+        if self.bar is not None and bucket != self.bar['bucket']:
+            closed = self._close_bar()
+        self.bar = self._merge(bucket, open, high, low, close, volume)
+        if self._completes(time, bucket):
+            closed = self._close_bar()
+        return closed
+
+    def peek(self, time: int, open: float, high: float, low: float, close: float, volume: float = 0.0) -> Dict[str, float]:
+        """Valores que tendría `values` si la vela base (aún abierta) se cerrara ahora, sin modificar nada."""
+        bucket = time // self.period
+        closes_previous = self.bar is not None and bucket != self.bar['bucket']
+        if not self._completes(time, bucket):
+            return self._bar_values(self.bar, peek=True) if closes_previous else self.values
+        if closes_previous:
+            # Se cerrarían dos velas superiores (faltaba el final de la anterior): dos pasos
+            # de los indicadores, que peek no cubre. Solo ocurre con huecos en las velas base.
+            preview = copy.deepcopy(self)
+            preview.update(time, open, high, low, close, volume)
+            return preview.values
+        return self._bar_values(self._merge(bucket, open, high, low, close, volume), peek=True)
+
+
+class TimeframeStream:
+    """
+    Mantiene en el bucle en vivo las temporalidades declaradas por una estrategia
+    (su diccionario TIMEFRAMES) y rellena sus columnas en el DataFrame de velas.
+    Igual que StreamingIndicators: las velas salvo la última se consolidan y la
+    última (en curso) se calcula con peek.
+    """
+
+    def __init__(self, timeframes: Dict[int, List[tuple]], history: int = 1000, base_duration: int = 60):
+        self.timeframes = timeframes
+        self.history = history
+        self.base_duration = base_duration
+        self.reset()
+
+    def reset(self):
+        self.aggregators = {minutes: TimeframeAggregator(minutes, specs, self.base_duration) for minutes, specs in self.timeframes.items()}
+        self.times = deque(maxlen=self.history)
+        self.values: Dict[str, deque] = {c: deque(maxlen=self.history) for c in all_timeframe_columns(self.timeframes)}
+        self.last_time = None
+
+    def _row(self, values_by_timeframe: Dict[int, Dict[str, float]]) -> Dict[str, float]:
+        return {timeframe_prefix(minutes) + name: value for minutes, values in values_by_timeframe.items() for name, value in values.items()}
+
+    def sync(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Incorpora las velas nuevas de `df` y devuelve una copia con las columnas de cada temporalidad."""
+        if not self.timeframes or df.empty:
+            return df.copy()
+
+        times = _base_times(df)
+        candles = np.column_stack([df[c].to_numpy(dtype=np.float64) if c in df.columns else np.zeros(len(df)) for c in OHLCV])
+        if self.last_time is not None and (times[0] > self.last_time or self.last_time > times[-1]):
+            # Hueco mayor que la ventana de velas o reinicio del histórico: volver a empezar
+            self.reset()
+
+        start = 0 if self.last_time is None else int(np.searchsorted(times, self.last_time, side="right"))
+        for i in range(start, len(times) - 1):
+            for aggregator in self.aggregators.values():
+                aggregator.update(int(times[i]), *candles[i])
+            for column, value in self._row({m: a.values for m, a in self.aggregators.items()}).items():
+                self.values[column].append(value)
+            self.times.append(int(times[i]))
+            self.last_time = int(times[i])
+
+        stored_times = np.fromiter(self.times, dtype=np.int64, count=len(self.times))
+        pos = np.minimum(np.searchsorted(stored_times, times), max(len(stored_times) - 1, 0))
+        found = stored_times[pos] == times if len(stored_times) else np.zeros(len(times), dtype=bool)
+        last = {}
+        if times[-1] != self.last_time:
+            last = self._row({m: a.peek(int(times[-1]), *candles[-1]) for m, a in self.aggregators.items()})
+
+        columns = {}
+        for column, values in self.values.items():
+            stored = np.fromiter(values, dtype=np.float64, count=len(values))
+            out = np.full(len(times), np.nan)
+            out[found] = stored[pos[found]]
+            if column in last:
+                out[-1] = last[column]
+            columns[column] = out
+        return df.assign(**columns)
@@ -0,0 +1,126 @@
+# utils/vectorized.py
+"""
+Utilidades para el modo vectorizado de las estrategias.
+
+Cada estrategia calcula con máscaras de NumPy la señal "candidata" de todas las velas
+a la vez. Como algunas estrategias dependen de `last_signal` (no repetir la misma
+señal), la secuencia final se resuelve con `resolve_signals`, que solo itera sobre
+las velas con señal, no sobre todo el histórico.
+"""
+from typing import Callable, Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+
+BUY = 1
+SELL = -1
+NO_SIGNAL = 0
+
+SIGNAL_LABELS = {BUY: "BUY", SELL: "SELL"}
+DIRECTION_LABELS = {BUY: "call", SELL: "put"}
+
+
+def bar_times(df: pd.DataFrame) -> pd.DatetimeIndex:
+    """Devuelve la hora de apertura de cada vela (índice 'time' o columna 'time')."""
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index
+    if 'time' in df.columns:
+        return pd.DatetimeIndex(df['time'])
+    return pd.DatetimeIndex(pd.to_datetime(df['from'], unit='s'))
+
+
+def shifted(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Equivalente a Series.shift(periods) sobre un array float (rellena con NaN), en el último eje."""
+    n = values.shape[-1]
+    out = np.full(values.shape, np.nan)
+    if periods < n:
+        out[..., periods:] = values[..., :n - periods]
+    return out
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Media de las últimas `window` posiciones (como .tail(window).mean() en cada vela)."""
+    if values.ndim == 2:  # pares × velas: una columna por par, mismo cálculo que con una Series
+        return pd.DataFrame(values.T).rolling(window, min_periods=1).mean().to_numpy().T
+    return pd.Series(values).rolling(window, min_periods=1).mean().to_numpy()
+
+
+def select_codes(conditions: Iterable[np.ndarray], codes: Iterable[int]) -> np.ndarray:
+    """Primer código cuya condición se cumple (emula una cadena de if/elif/return)."""
+    return np.select(list(conditions), list(codes), default=NO_SIGNAL).astype(np.int8)
+
+
+def resolve_signals(
+    candidates: Dict[Optional[str], np.ndarray],
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Reproduce la secuencia de señales del bucle vela a vela.
+
+    Args:
+        candidates: código de señal por vela según el último valor de `last_signal`
+            (claves None, "BUY", "SELL"). Si la estrategia ignora `last_signal`
+            basta con la clave None.
+        start, stop: rango de velas evaluado (igual que en el backtest).
+
+    Returns:
+        np.ndarray: códigos BUY / SELL / NO_SIGNAL por vela.
+    """
+    base = candidates[None]
+    n = len(base)
+    stop = n if stop is None else min(stop, n)
+    codes = np.zeros(n, dtype=np.int8)
+
+    if len(candidates) == 1:
+        codes[start:stop] = base[start:stop]
+        return codes
+
+    positions = {state: np.flatnonzero(c) for state, c in candidates.items()}
+    state = None
+    i = start
+    while i < stop:
+        idx = positions.get(state, positions[None])
+        k = np.searchsorted(idx, i)
+        if k == len(idx) or idx[k] >= stop:
+            break
+        j = idx[k]
+        code = candidates.get(state, base)[j]
+        codes[j] = code
+        state = SIGNAL_LABELS[int(code)]
+        i = j + 1
+    return codes
+
+
+def signal_frame(
+    df: pd.DataFrame,
+    codes: np.ndarray,
+    reasons: Optional[Callable[[int, int], list]] = None,
+    extra: Optional[Dict[str, np.ndarray]] = None,
+    target_index: Optional[pd.Index] = None,
+) -> pd.DataFrame:
+    """
+    Construye el resultado del modo vectorizado.
+
+    Columnas: 'signal' (bool), 'direction' ("call"/"put"), 'reasons' (lista de razones)
+    y las columnas adicionales de la estrategia. Si se indica `target_index`, el
+    resultado se alinea con el DataFrame original (las velas descartadas por NaN
+    quedan sin señal).
+    """
+    codes = np.asarray(codes, dtype=np.int8)
+    direction = np.full(len(codes), None, dtype=object)
+    direction[codes == BUY] = DIRECTION_LABELS[BUY]
+    direction[codes == SELL] = DIRECTION_LABELS[SELL]
+
+    reasons_col = np.full(len(codes), None, dtype=object)
+    if reasons is not None:
+        for pos in np.flatnonzero(codes):
+            reasons_col[pos] = reasons(int(pos), int(codes[pos]))
+
+    out = pd.DataFrame({'signal': codes != NO_SIGNAL, 'direction': direction, 'reasons': reasons_col}, index=df.index)
+    for name, values in (extra or {}).items():
+        out[name] = values
+
+    if target_index is not None and not out.index.equals(target_index):
+        out = out.reindex(target_index)
+        out['signal'] = out['signal'].fillna(False).astype(bool)
+    return out
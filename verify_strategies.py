@@ -0,0 +1,71 @@
+# verify_strategies.py
+"""
+Comprueba que el modo vectorizado de cada estrategia produce exactamente las mismas
+señales que la versión vela a vela sobre un histórico guardado.
+
+Uso: python verify_strategies.py [strategy_key] [ruta_csv]
+"""
+import importlib
+import inspect
+import logging
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.backtest_engine import compare_signals, run_incremental, run_vectorized
+from utils.indicator_planner import IndicatorPlan
+from utils.strategy_selector import AVAILABLE_STRATEGIES
+
+DEFAULT_DATA_FILE = "historical_data/AUDCAD_60s_1000c.csv"
+
+
+def verify_strategy(strategy_key: str, historical_df: pd.DataFrame) -> bool:
+    """Ejecuta ambos modos de una estrategia y muestra las diferencias."""
+    strategy_info = AVAILABLE_STRATEGIES[strategy_key]
+    module = importlib.import_module(strategy_info["module"])
+    strategy_func = getattr(module, strategy_info["function"])
+    if "vectorized" not in strategy_info:
+        print(f"⚠️  {strategy_info['name']}: sin modo vectorizado.")
+        return True
+    vectorized_func = getattr(module, strategy_info["vectorized"])
+
+    df = module.add_indicators(historical_df.copy())
+
+    # Las estrategias que leen el minuto del reloj reciben el mismo minuto en ambos modos
+    options = {}
+    if "current_minute" in inspect.signature(vectorized_func).parameters:
+        options["current_minute"] = datetime.now().minute
+
+    start = time.perf_counter()
+    expected = run_incremental(strategy_func, df)
+    incremental_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = run_vectorized(vectorized_func, df, **options)
+    vectorized_time = time.perf_counter() - start
+
+    differences = compare_signals(expected, actual)
+    status = "✅" if not differences else "❌"
+    print(f"{status} {strategy_info['name']}: {len(expected)} señales vela a vela, {len(actual)} vectorizadas "
+          f"({incremental_time:.2f}s vs {vectorized_time:.3f}s)")
+    for diff in differences[:10]:
+        print(f"     {diff}")
+    return not differences
+
+
+if __name__ == "__main__":
+    keys = [sys.argv[1]] if len(sys.argv) > 1 else list(AVAILABLE_STRATEGIES)
+    data_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DATA_FILE
+
+    # El modo vela a vela registra cada vela; solo interesan los avisos
+    logging.getLogger("TradingBot").setLevel(logging.WARNING)
+
+    print(f"Cargando datos desde {data_file}...")
+    historical_df = pd.read_csv(data_file, index_col='time', parse_dates=True)
+
+    # Los indicadores comunes se calculan una vez para todas las estrategias
+    frames = IndicatorPlan.for_strategies(keys).frames(historical_df)
+    results = [verify_strategy(key, frames[key]) for key in keys]
+    sys.exit(0 if all(results) else 1)